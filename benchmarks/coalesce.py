@@ -0,0 +1,93 @@
+"""
+Database queries behind 1,000 concurrent requests, with and without @coalesce.
+
+Every authenticated request looks up its user (get_current_user -> users_db.get_user),
+and character routes look up the character too. When the cache is cold or a row has
+just been invalidated, a burst of requests all miss at once. Without coalescing, each
+miss runs its own query; with it, concurrent lookups of the same row share one.
+
+The 1,000 lookups are spread over 1, 10, 100 and 1,000 distinct users, from a burst
+all for one user to no overlap at all. The cache is off, so every lookup reaches
+@coalesce. PGPOOL is a stand-in with [postgresql] max_size connections, each query
+taking 2 ms, so the numbers are queries and pool waits rather than PostgreSQL.
+
+    PYTHONPATH=. python benchmarks/coalesce.py [requests]
+"""
+
+import asyncio
+import contextlib
+import sys
+import time
+import uuid
+
+import mudforge
+from mudforge.db import users as users_db
+from mudforge.db.cache import CACHE
+from mudforge.models.users import UserModel
+
+POOL_SIZE = 10
+QUERY_TIME = 0.002
+
+
+class FakePool:
+    def __init__(self, size: int):
+        self.slots = asyncio.Semaphore(size)
+        self.queries = 0
+
+    @contextlib.asynccontextmanager
+    async def acquire(self):
+        async with self.slots:
+            yield self
+
+    async def fetchrow(self, sql, user_id):
+        self.queries += 1
+        await asyncio.sleep(QUERY_TIME)
+        return {
+            "id": user_id,
+            "email": "bench@example.com",
+            "email_confirmed_at": None,
+            "display_name": None,
+            "admin_level": 0,
+            "created_at": None,
+            "updated_at": None,
+            "deleted_at": None,
+        }
+
+
+async def measure(lookup, requests: int, users: int) -> str:
+    pool = mudforge.PGPOOL = FakePool(POOL_SIZE)
+    ids = [uuid.uuid4() for _ in range(users)]
+    timings = list()
+
+    async def request(user_id):
+        started = time.perf_counter()
+        user = await lookup(user_id)
+        assert isinstance(user, UserModel) and user.id == user_id
+        timings.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(request(ids[i % users]) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    timings.sort()
+    p50 = timings[len(timings) // 2] * 1000
+    p99 = timings[int(len(timings) * 0.99)] * 1000
+    return f"{pool.queries:>9}{elapsed * 1000:>10.1f}{p50:>9.1f}{p99:>9.1f}"
+
+
+async def main(requests: int):
+    CACHE.enabled = False
+    coalesced = users_db.get_user.__wrapped__  # @cached removed
+    uncoalesced = coalesced.__wrapped__  # @coalesce removed too
+    print(
+        f"{requests} concurrent get_user lookups, cache off, "
+        f"{POOL_SIZE} connections, {QUERY_TIME * 1000:g} ms per query"
+    )
+    print(f"{'':<30}{'queries':>9}{'total ms':>10}{'p50 ms':>9}{'p99 ms':>9}")
+    for users in (1, 10, 100, 1000):
+        for name, lookup in (("without", uncoalesced), ("with", coalesced)):
+            result = await measure(lookup, requests, users)
+            print(f"{f'{users} users, {name} coalesce':<30}{result}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000))
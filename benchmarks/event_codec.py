@@ -0,0 +1,110 @@
+"""
+Per-event cost of getting an event from the game to the portal, by codec:
+
+- json: the game's model_dump_json(), and the portal's model_validate_json(), which
+  is what portal.networking.event_codec = "json" does.
+- json (before the compact codec): orjson.loads() then event_class(**data), as
+  CharacterParser.handle_event did.
+- compact: CompactCodec.encode() and CompactCodec.decode(), which validates.
+- compact, trusted: the same payload, but decoded with model_construct() after
+  converting UUIDs and datetimes in Python, skipping validation. This is the path
+  CompactCodec deliberately doesn't take.
+
+    PYTHONPATH=. python benchmarks/event_codec.py [events]
+"""
+
+import datetime
+import sys
+import timeit
+import typing
+import uuid
+
+import orjson
+
+import mudforge
+from mudforge.events.characters import CharacterCreated, CharacterDeleted
+from mudforge.events.codec import CompactCodec
+
+
+def trusted_decoder(codec: CompactCodec, type_id: int):
+    cls = codec.classes[type_id]
+    converters = list()
+    for name in codec.fields[type_id]:
+        annotation = cls.model_fields[name].annotation
+        if annotation is uuid.UUID:
+            converters.append((name, uuid.UUID))
+        elif annotation is datetime.datetime:
+            converters.append((name, datetime.datetime.fromisoformat))
+        else:
+            converters.append((name, None))
+
+    def decode(data: bytes):
+        values = orjson.loads(data)
+        return cls.model_construct(
+            **{
+                name: convert(value) if convert else value
+                for (name, convert), value in zip(converters, values)
+            }
+        )
+
+    return decode
+
+
+def per_event(func: typing.Callable, count: int) -> float:
+    runs = timeit.repeat(func, number=count, repeat=7)
+    return min(runs) / count * 1e6
+
+
+def main(count: int):
+    mudforge.EVENTS.update(
+        {"CharacterCreated": CharacterCreated, "CharacterDeleted": CharacterDeleted}
+    )
+    codec = CompactCodec.from_events()
+    event = CharacterCreated(
+        user_id=uuid.uuid4(),
+        user_name="someone@example.com",
+        character_id=uuid.uuid4(),
+        character_name="Bob",
+    )
+    json_data = event.model_dump_json()
+    type_id, compact_data = codec.encode(event)
+    trusted = trusted_decoder(codec, type_id)
+    assert trusted(compact_data) == codec.decode(type_id, compact_data) == event
+
+    rows = [
+        (
+            "json",
+            lambda: event.model_dump_json(),
+            lambda: CharacterCreated.model_validate_json(json_data),
+            len(json_data),
+        ),
+        (
+            "json (before)",
+            lambda: event.model_dump_json(),
+            lambda: CharacterCreated(**orjson.loads(json_data)),
+            len(json_data),
+        ),
+        (
+            "compact",
+            lambda: codec.encode(event),
+            lambda: codec.decode(type_id, compact_data),
+            len(compact_data),
+        ),
+        (
+            "compact, trusted",
+            lambda: codec.encode(event),
+            lambda: trusted(compact_data),
+            len(compact_data),
+        ),
+    ]
+    print(f"CharacterCreated, best of 7 x {count} events (microseconds per event)")
+    print(f"{'codec':<18}{'encode':>8}{'decode':>8}{'bytes':>7}")
+    for name, encode, decode, size in rows:
+        print(
+            f"{name:<18}{per_event(encode, count):>8.2f}"
+            f"{per_event(decode, count):>8.2f}{size:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
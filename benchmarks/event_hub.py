@@ -0,0 +1,108 @@
+"""
+EventHub work at 5,000 subscribers, before and after per-stream heartbeats and event
+filters:
+
+- Heartbeats. Before, the game broadcast a SystemPing into every queue every 15
+  seconds, and every stream serialized it as an SSE frame. Now a stream that has been
+  idle for game.events.heartbeat seconds writes an ": ping" comment itself, without
+  going through the hub. Counted over one minute with every stream idle, the case
+  where heartbeats matter most.
+- Filters. One broadcast that a tenth of the subscribers asked for. Before, every queue
+  got it and every stream sent it; now only the queues that want it do.
+
+Queue operations and bytes are counted; times are the hub's share (putting into the
+queues, and draining and framing them as the streams would).
+
+    PYTHONPATH=. python benchmarks/event_hub.py [subscribers]
+"""
+
+import sys
+import time
+import uuid
+
+from mudforge.events.characters import CharacterCreated
+from mudforge.events.system import SystemPing
+from mudforge.rest.characters import sse_frame
+from mudforge.utils import EventHub
+
+MINUTE_OF_PINGS = 60 // 15
+WANTED = 10
+
+
+def drain(hub: EventHub) -> tuple[int, int]:
+    """
+    Empties every queue as its stream would, returning (frames, bytes).
+    """
+    frames = size = 0
+    for queues in hub.subscriptions.values():
+        for queue in queues:
+            while not queue.empty():
+                event_id, item = queue.get_nowait()
+                frames += 1
+                size += len(sse_frame(event_id, item).encode())
+    return frames, size
+
+
+def subscribe(hub: EventHub, subscribers: int, filtered: bool):
+    for i in range(subscribers):
+        events = None
+        if filtered:
+            events = ["CharacterCreated"] if i % WANTED == 0 else ["CharacterDeleted"]
+        hub.subscribe(uuid.uuid4(), events=events)
+
+
+def heartbeats(subscribers: int) -> list[tuple]:
+    hub = EventHub()
+    subscribe(hub, subscribers, filtered=False)
+    started = time.perf_counter()
+    frames = size = 0
+    for _ in range(MINUTE_OF_PINGS):
+        hub.broadcast_nowait(SystemPing())
+        sent, written = drain(hub)
+        frames += sent
+        size += written
+    before = time.perf_counter() - started
+
+    started = time.perf_counter()
+    comments = [": ping\n\n".encode() for _ in range(subscribers * MINUTE_OF_PINGS)]
+    after = time.perf_counter() - started
+    return [
+        ("SystemPing broadcast", frames, frames, size, before),
+        ("idle-stream comment", 0, len(comments), sum(map(len, comments)), after),
+    ]
+
+
+def filters(subscribers: int) -> list[tuple]:
+    rows = list()
+    event = CharacterCreated(
+        user_id=uuid.uuid4(),
+        user_name="someone@example.com",
+        character_id=uuid.uuid4(),
+        character_name="Bob",
+    )
+    for label, filtered in (("unfiltered", False), ("filtered", True)):
+        hub = EventHub()
+        subscribe(hub, subscribers, filtered)
+        started = time.perf_counter()
+        hub.broadcast_nowait(event)
+        frames, size = drain(hub)
+        rows.append((label, frames, frames, size, time.perf_counter() - started))
+    return rows
+
+
+def main(subscribers: int):
+    print(f"{subscribers} subscribers")
+    header = f"{'':<24}{'queue puts':>12}{'writes':>10}{'bytes':>11}{'ms':>9}"
+    for title, rows in (
+        (f"heartbeats, one idle minute ({MINUTE_OF_PINGS} x 15 s)", heartbeats),
+        (f"one broadcast wanted by 1 in {WANTED}", filters),
+    ):
+        print()
+        print(title)
+        print(header)
+        for label, puts, writes, size, elapsed in rows(subscribers):
+            print(f"{label:<24}{puts:>12}{writes:>10}{size:>11}{elapsed * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,157 @@
+"""
+Latency of a pool connection's first use of each query, by how the connection was
+warmed up as it opened ([game.database] prepare_queries):
+
+- none: prepare_queries = false. The first request runs each query cold.
+- prepare(): prepare_queries = true, which prepares every registered query with
+  Connection.prepare (mudforge.db.base.prepare_queries).
+- statement cache: every query put in asyncpg's statement cache, as running it once
+  would; the best a warm-up could do.
+
+Each mode gets a fresh single-connection pool, as after a boot, on a database with
+every migration applied and a few rows. The cache is off, so every call reaches
+PostgreSQL. Reported: how long the pool took to open, then per query the first call
+and the median of the next 50.
+
+Needs PostgreSQL: pass a DSN for a role that can create databases, or set
+MUDFORGE_BENCH_DSN. A scratch database is created and dropped.
+
+    PYTHONPATH=. python benchmarks/first_request.py [dsn]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import asyncpg
+
+import mudforge
+from mudforge.db import characters as characters_db, users as users_db
+from mudforge.db.base import QUERIES, prepare_queries
+from mudforge.db.cache import CACHE
+from mudforge.game.application import init_connection
+from mudforge.models.users import UserModel
+from mudforge.utils import get_config
+
+MIGRATIONS = Path(mudforge.__file__).parent / "migrations"
+REPEAT = 50
+
+
+async def create_database(dsn: str, name: str) -> tuple[uuid.UUID, uuid.UUID]:
+    conn = await asyncpg.connect(dsn)
+    try:
+        await conn.execute(f'CREATE DATABASE "{name}"')
+    finally:
+        await conn.close()
+    conn = await asyncpg.connect(dsn, database=name)
+    try:
+        for migration in sorted(MIGRATIONS.glob("*.sql")):
+            await conn.execute(migration.read_text())
+        user_id = await conn.fetchval(
+            "INSERT INTO users (email) VALUES ('bench@example.com') RETURNING id"
+        )
+        character_id = await conn.fetchval(
+            "INSERT INTO characters (name, user_id) VALUES ('Bob', $1) RETURNING id",
+            user_id,
+        )
+        await conn.executemany(
+            "INSERT INTO characters (name, user_id) VALUES ($1, $2)",
+            [(f"Bob{i}", user_id) for i in range(100)],
+        )
+    finally:
+        await conn.close()
+    return user_id, character_id
+
+
+async def drop_database(dsn: str, name: str):
+    conn = await asyncpg.connect(dsn)
+    try:
+        await conn.execute(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)')
+    finally:
+        await conn.close()
+
+
+async def fill_statement_cache(conn: asyncpg.Connection):
+    # What a query's first fetch() leaves behind, through the private call fetch()
+    # makes: the statement in the connection's cache, ready to execute.
+    for sql in QUERIES.values():
+        await conn._get_statement(sql, None)
+
+
+async def first_of(rows):
+    async for row in rows:
+        await rows.aclose()
+        return row
+
+
+async def measure(dsn: str, database: str, warm_up, calls: dict) -> list[str]:
+    async def init(conn):
+        mudforge.SETTINGS["GAME"]["database"]["prepare_queries"] = False
+        await init_connection(conn)
+        if warm_up:
+            await warm_up(conn)
+
+    started = time.perf_counter()
+    mudforge.PGPOOL = await asyncpg.create_pool(
+        dsn, database=database, init=init, min_size=1, max_size=1
+    )
+    opened = (time.perf_counter() - started) * 1000
+    cells = [f"{opened:>8.1f}"]
+    try:
+        for call in calls.values():
+            started = time.perf_counter()
+            await call()
+            first = (time.perf_counter() - started) * 1000
+            timings = list()
+            for _ in range(REPEAT):
+                started = time.perf_counter()
+                await call()
+                timings.append((time.perf_counter() - started) * 1000)
+            cells.append(f"{first:>10.2f}{statistics.median(timings):>8.2f}")
+    finally:
+        await mudforge.PGPOOL.close()
+    return cells
+
+
+async def main(dsn: str):
+    mudforge.SETTINGS = get_config("game")
+    CACHE.enabled = False
+    database = f"mudforge_bench_{uuid.uuid4().hex[:12]}"
+    user_id, character_id = await create_database(dsn, database)
+    user = UserModel.model_construct(id=user_id)
+    try:
+        calls = {
+            "get_user": lambda: users_db.get_user(user_id),
+            "find_character_id": lambda: characters_db.find_character_id(
+                character_id
+            ),
+            "search": lambda: characters_db.search_characters("bob", 20),
+            "list_user": lambda: first_of(
+                characters_db.list_characters_user(user)
+            ),
+        }
+        modes = {
+            "none": None,
+            "prepare()": prepare_queries,
+            "statement cache": fill_statement_cache,
+        }
+        print(
+            f"first call and median of the next {REPEAT}, ms, on a fresh connection"
+        )
+        print(f"{'':<16}{'pool':>8}" + "".join(f"{name:>18}" for name in calls))
+        print(f"{'':<16}{'open':>8}" + f"{'first':>10}{'then':>8}" * len(calls))
+        for name, warm_up in modes.items():
+            cells = await measure(dsn, database, warm_up, calls)
+            print(f"{name:<16}" + "".join(cells))
+    finally:
+        await drop_database(dsn, database)
+
+
+if __name__ == "__main__":
+    asyncio.run(
+        main(sys.argv[1] if len(sys.argv) > 1 else os.environ["MUDFORGE_BENCH_DSN"])
+    )
@@ -0,0 +1,159 @@
+"""
+Portal-to-game calls over HTTP against the same calls over the game link (see
+mudforge.portal.link and mudforge.rest.link).
+
+Two calls are measured:
+
+- GET /users/{id}, which the link answers with a fast route, skipping FastAPI.
+- GET /system/events, which the link forwards to the game's FastAPI app in-process.
+
+For each, latency is taken from sequential calls by one session, and throughput from
+50 sessions calling at once. Both paths run the way the portal runs them: HTTP/2 over
+TLS on one shared client, and wss:// for the link, to 127.0.0.1 (with a throwaway
+certificate; without openssl, both are plaintext). users_db.get_user is answered from
+memory, so the numbers are the transport and the framework, not PostgreSQL. The
+server shares the benchmark's process and event loop, as a portal and game on one
+small host share its CPUs.
+
+    PYTHONPATH=. python benchmarks/link_throughput.py [calls]
+"""
+
+import asyncio
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import types
+import uuid
+from pathlib import Path
+
+import httpx
+from hypercorn.asyncio import serve
+
+import mudforge
+from mudforge.db import users as users_db
+from mudforge.events.characters import CharacterCreated, CharacterDeleted
+from mudforge.events.codec import CompactCodec
+from mudforge.game.application import Application
+from mudforge.models.auth import TokenResponse
+from mudforge.models.users import UserModel
+from mudforge.portal.link import LinkService
+from mudforge.utils import get_config
+from transport_latency import make_certificate
+
+PORT = 8766
+SESSIONS = 50
+
+
+def summarize(timings: list[float], elapsed: float) -> str:
+    timings.sort()
+    p50 = timings[len(timings) // 2] * 1000
+    p99 = timings[int(len(timings) * 0.99)] * 1000
+    mean = statistics.fmean(timings) * 1000
+    return f"{len(timings) / elapsed:>10.0f}{mean:>8.3f}{p50:>8.3f}{p99:>8.3f}"
+
+
+async def run(call, sessions: list, calls: int, concurrent: bool) -> str:
+    for session in sessions:
+        await call(session)
+    timings = list()
+
+    async def worker(session, count: int):
+        for _ in range(count):
+            started = time.perf_counter()
+            await call(session)
+            timings.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    if concurrent:
+        per_session = calls // len(sessions)
+        await asyncio.gather(*(worker(s, per_session) for s in sessions))
+    else:
+        await worker(sessions[0], calls)
+    return summarize(timings, time.perf_counter() - started)
+
+
+async def main(calls: int):
+    mudforge.SETTINGS = get_config("game")
+    mudforge.SETTINGS["GAME"]["networking"]["port"] = PORT
+    mudforge.SETTINGS["SHARED"]["external"] = "127.0.0.1"
+    directory = Path(tempfile.mkdtemp())
+    if certificate := make_certificate(directory):
+        mudforge.SETTINGS["TLS"]["certificate"], mudforge.SETTINGS["TLS"]["key"] = (
+            certificate
+        )
+    scheme = "https" if certificate else "http"
+    game_url = f"{scheme}://127.0.0.1:{PORT}"
+    mudforge.SETTINGS["PORTAL"]["networking"]["game_url"] = game_url
+
+    user = UserModel.model_construct(
+        id=uuid.uuid4(), email="bench@example.com", admin_level=1, created_at=None
+    )
+
+    async def get_user(user_id):
+        return user
+
+    users_db.get_user = get_user
+    mudforge.EVENTS.update(
+        {"CharacterCreated": CharacterCreated, "CharacterDeleted": CharacterDeleted}
+    )
+    mudforge.EVENT_CODEC = CompactCodec.from_events()
+
+    app = Application()
+    await app.setup_fastapi()
+    # Hypercorn closes a connection after 1000 requests by default, and calls in flight
+    # on the shared HTTP/2 connection then fail with ConnectionTerminated. Lift that, so
+    # the HTTP rows measure calls rather than reconnects.
+    app.fastapi_config.keep_alive_max_requests = 2**31
+    stop = asyncio.Event()
+    server = asyncio.create_task(
+        serve(app.fastapi_instance, app.fastapi_config, shutdown_trigger=stop.wait)
+    )
+    await asyncio.sleep(1.0)
+
+    token = TokenResponse.from_uuid(user.id).access_token
+    sessions = [
+        types.SimpleNamespace(jwt=token, session_name=f"bench_{i}")
+        for i in range(SESSIONS)
+    ]
+    http = httpx.AsyncClient(
+        base_url=game_url,
+        http2=True,
+        verify=False,
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    link = LinkService()
+    linking = asyncio.create_task(link.run())
+    await link.connected.wait()
+
+    paths = {"fast route": f"/users/{user.id}", "forwarded": "/system/events"}
+    print(
+        f"{calls} calls per row; concurrent rows spread them over {SESSIONS} sessions"
+    )
+    print(f"{'call':<38}{'calls/s':>10}{'mean':>8}{'p50':>8}{'p99':>8}  (ms)")
+    for kind, path in paths.items():
+
+        async def over_http(session, path=path):
+            (await http.get(path)).raise_for_status()
+
+        async def over_link(session, path=path):
+            await link.call(session, "GET", path)
+
+        for name, call in (("http", over_http), ("link", over_link)):
+            for concurrent in (False, True):
+                label = f"{path.split('/')[1]} {kind}, {name}, " + (
+                    f"{SESSIONS} sessions" if concurrent else "sequential"
+                )
+                result = await run(call, sessions, calls, concurrent)
+                print(f"{label:<38}{result}")
+
+    linking.cancel()
+    await http.aclose()
+    stop.set()
+    await server
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
@@ -0,0 +1,99 @@
+"""
+Cost of turning database rows into models, and into JSON, per model and path:
+
+- validated: Model(**row), which every db function did before from_record.
+- from_record: model_construct(), skipping validation (mudforge.db.base.from_record).
+- JSON via validated / from_record: the model built either way, then serialized the way
+  streaming_list does it.
+- JSON, raw row: orjson.dumps(dict(row)), which is what list_characters(raw=True)
+  rows take through streaming_list, with no model at all.
+
+Rows are dicts holding what asyncpg returns for the model's columns (UUIDs,
+datetimes, strings), standing in for asyncpg Records, which can only come from a
+server. Both are mappings, and from_record and the raw path only use them as such.
+
+    PYTHONPATH=. python benchmarks/model_construction.py [rows]
+"""
+
+import datetime
+import sys
+import time
+import uuid
+
+import orjson
+
+from mudforge.db.base import from_record
+from mudforge.models.characters import CharacterModel
+from mudforge.models.users import UserModel
+
+
+def user_rows(count: int) -> list[dict]:
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return [
+        {
+            "id": uuid.uuid4(),
+            "email": f"user{i}@example.com",
+            "email_confirmed_at": now,
+            "display_name": f"User {i}",
+            "admin_level": 0,
+            "created_at": now,
+            "updated_at": now,
+            "deleted_at": None,
+        }
+        for i in range(count)
+    ]
+
+
+def character_rows(count: int) -> list[dict]:
+    now = datetime.datetime.now(datetime.timezone.utc)
+    user_id = uuid.uuid4()
+    return [
+        {
+            "id": uuid.uuid4(),
+            "user_id": user_id,
+            "name": f"Character{i}",
+            "created_at": now,
+            "last_active_at": now,
+            "updated_at": now,
+            "deleted_at": None,
+        }
+        for i in range(count)
+    ]
+
+
+def best_of(func, repeat: int = 3) -> float:
+    timings = list()
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main(count: int):
+    print(f"{count} rows, best of 3 (ms total, microseconds per row)")
+    print(f"{'':<34}{'ms':>9}{'us/row':>9}")
+    for model, rows in (
+        (UserModel, user_rows(count)),
+        (CharacterModel, character_rows(count)),
+    ):
+        # Both columns() and the test rows hold exactly the model's fields.
+        assert set(rows[0]) == set(model.model_fields)
+        to_json = model.__pydantic_serializer__.to_json
+        paths = {
+            "validated": lambda: [model(**row) for row in rows],
+            "from_record": lambda: [from_record(model, row) for row in rows],
+            "JSON via validated": lambda: [to_json(model(**row)) for row in rows],
+            "JSON via from_record": lambda: [
+                to_json(from_record(model, row)) for row in rows
+            ],
+            "JSON, raw row": lambda: [orjson.dumps(dict(row)) for row in rows],
+        }
+        print(model.__name__)
+        for name, path in paths.items():
+            elapsed = best_of(path)
+            print(f"  {name:<32}{elapsed * 1000:>9.1f}{elapsed / count * 1e6:>9.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,170 @@
+"""
+Requests/sec for the hot REST routes, before and after serializing their bodies with
+pydantic-core's to_json (mudforge.rest.utils._dump_json):
+
+- before: model_dump_json().encode(), a str built and then encoded.
+- after: __pydantic_serializer__.to_json(), bytes directly.
+
+Routes: GET /characters/{id}, GET /characters/{id}/active and GET /users/{id}, all
+answered by conditional_response. The game app is served by Hypercorn over plaintext
+HTTP/1.1 on 127.0.0.1, and CONCURRENCY httpx connections call it at once, in this
+process; each row is the best of ROUNDS rounds. users_db.get_user and
+characters_db.find_character_id are answered from memory, so the numbers are the
+framework and serialization, not PostgreSQL.
+
+The serialization alone is also timed, per body, since it's a small part of a request.
+
+    PYTHONPATH=. python benchmarks/rest_routes.py [requests]
+"""
+
+import asyncio
+import datetime
+import statistics
+import sys
+import time
+import timeit
+import uuid
+
+import httpx
+import pydantic
+from hypercorn.asyncio import serve
+
+import mudforge
+from mudforge.db import characters as characters_db, users as users_db
+from mudforge.game.application import Application
+from mudforge.models.auth import TokenResponse
+from mudforge.models.characters import ActiveAs, CharacterModel
+from mudforge.models.users import UserModel
+from mudforge.rest import utils
+from mudforge.utils import get_config
+
+PORT = 8769
+CONCURRENCY = 20
+ROUNDS = 3
+
+
+def dump_json_before(data: pydantic.BaseModel | list[pydantic.BaseModel]) -> bytes:
+    # _dump_json as it was.
+    if isinstance(data, pydantic.BaseModel):
+        return data.model_dump_json().encode()
+    return b"[" + b",".join(e.model_dump_json().encode() for e in data) + b"]"
+
+
+SERIALIZERS = {"before": dump_json_before, "after": utils._dump_json}
+
+
+async def run(client: httpx.AsyncClient, path: str, requests: int) -> tuple:
+    timings = list()
+
+    async def worker(count: int):
+        for _ in range(count):
+            started = time.perf_counter()
+            (await client.get(path)).raise_for_status()
+            timings.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(worker(10) for _ in range(CONCURRENCY)))
+    timings.clear()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(requests // CONCURRENCY) for _ in range(CONCURRENCY)))
+    elapsed = time.perf_counter() - started
+    timings.sort()
+    p99 = timings[int(len(timings) * 0.99)] * 1000
+    return len(timings) / elapsed, statistics.fmean(timings) * 1000, p99
+
+
+async def main(requests: int):
+    mudforge.SETTINGS = get_config("game")
+    mudforge.SETTINGS["GAME"]["networking"]["port"] = PORT
+    mudforge.SETTINGS["SHARED"]["external"] = "127.0.0.1"
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    user = UserModel.model_construct(
+        id=uuid.uuid4(),
+        email="bench@example.com",
+        email_confirmed_at=now,
+        display_name="Bench",
+        admin_level=0,
+        created_at=now,
+        updated_at=now,
+        deleted_at=None,
+    )
+    character = CharacterModel.model_construct(
+        id=uuid.uuid4(),
+        user_id=user.id,
+        name="Bench",
+        created_at=now,
+        last_active_at=now,
+        updated_at=now,
+        deleted_at=None,
+    )
+
+    async def get_user(user_id, primary=False):
+        return user
+
+    async def find_character_id(character_id, primary=False):
+        return character
+
+    users_db.get_user = get_user
+    characters_db.find_character_id = find_character_id
+
+    print("serialization only, microseconds per body")
+    print(f"{'':<28}{'before':>9}{'after':>9}")
+    bodies = {
+        "CharacterModel": character,
+        "ActiveAs": ActiveAs(user=user, character=character),
+        "UserModel": user,
+    }
+    for name, body in bodies.items():
+        cells = list()
+        for serialize in SERIALIZERS.values():
+            best = min(timeit.repeat(lambda: serialize(body), number=20000, repeat=5))
+            cells.append(f"{best / 20000 * 1e6:>9.2f}")
+        print(f"{name:<28}" + "".join(cells))
+
+    app = Application()
+    await app.setup_fastapi()
+    # Plaintext, so that TLS doesn't hide the difference.
+    app.fastapi_config.certfile = app.fastapi_config.keyfile = None
+    app.fastapi_config.keep_alive_max_requests = 2**31
+    app.fastapi_config.accesslog = None
+    stop = asyncio.Event()
+    server = asyncio.create_task(
+        serve(app.fastapi_instance, app.fastapi_config, shutdown_trigger=stop.wait)
+    )
+    await asyncio.sleep(1.0)
+
+    token = TokenResponse.from_uuid(user.id).access_token
+    paths = {
+        "/characters/{id}": f"/characters/{character.id}",
+        "/characters/{id}/active": f"/characters/{character.id}/active",
+        "/users/{id}": f"/users/{user.id}",
+    }
+    print()
+    print(
+        f"{requests} requests per round, {CONCURRENCY} connections, HTTP/1.1; "
+        f"best of {ROUNDS} rounds"
+    )
+    print(f"{'':<34}{'req/s':>9}{'mean':>8}{'p99':>8}  (ms)")
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{PORT}",
+        headers={"Authorization": f"Bearer {token}"},
+        limits=httpx.Limits(max_connections=CONCURRENCY),
+    ) as client:
+        for route, path in paths.items():
+            # Before and after take turns, so drift on the host hits both alike.
+            results = {name: list() for name in SERIALIZERS}
+            for _ in range(ROUNDS):
+                for name, serialize in SERIALIZERS.items():
+                    utils._dump_json = serialize
+                    results[name].append(await run(client, path, requests))
+            for name, rounds in results.items():
+                rate, mean, p99 = max(rounds)
+                print(f"{f'{route}, {name}':<34}{rate:>9.0f}{mean:>8.2f}{p99:>8.2f}")
+    utils._dump_json = SERIALIZERS["after"]
+
+    stop.set()
+    await server
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 4000))
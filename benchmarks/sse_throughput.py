@@ -0,0 +1,213 @@
+"""
+Event stream throughput at 100 events/sec per stream, by [game.events] setting:
+
+- one frame per write: batch_window = 0, which writes as streams did before batching.
+- batched, 20 ms window: batch_window = 0.02 (the default).
+- batched, 20 ms, gzip: the same, compressed for a client sending Accept-Encoding.
+
+Each run holds STREAMS event streams open against GET /characters/{id}/events, served
+by Hypercorn over HTTP/2 and TLS (plaintext HTTP/1.1 without openssl), read the way
+BaseConnection.api_stream reads them. Every 10 ms, one CharacterCreated is sent to each
+character. Reported: events sent and received, the DATA chunks the client received
+and their bytes on the wire, CPU time per 1,000 events (server and client share the
+process), and how long events took to arrive.
+
+    PYTHONPATH=. python benchmarks/sse_throughput.py [streams] [seconds]
+"""
+
+import asyncio
+import datetime
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+import orjson
+from hypercorn.asyncio import serve
+
+import mudforge
+from mudforge.db import characters as characters_db, users as users_db
+from mudforge.events.characters import CharacterCreated
+from mudforge.game.application import Application
+from mudforge.models.auth import TokenResponse
+from mudforge.models.characters import CharacterModel
+from mudforge.models.users import UserModel
+from mudforge.utils import EventHub, get_config
+from transport_latency import make_certificate
+
+PORT = 8767
+RATE = 100
+
+CONFIGURATIONS = {
+    "one frame per write": {"batch_max": 64, "batch_window": 0.0},
+    "batched, 20 ms window": {"batch_max": 64, "batch_window": 0.02},
+    "batched, 20 ms, gzip": {
+        "batch_max": 64,
+        "batch_window": 0.02,
+        "compression": True,
+    },
+}
+
+
+class Reader:
+    def __init__(self):
+        self.chunks = 0
+        self.wire = 0
+        self.events = 0
+        self.delays: list[float] = list()
+
+
+async def read(client, character_id, token: str, reader: Reader, ready):
+    headers = {"Authorization": f"Bearer {token}", "Accept-Encoding": "gzip"}
+    async with client.stream(
+        "GET", f"/characters/{character_id}/events", headers=headers
+    ) as response:
+        ready.set()
+        buffer = b""
+        decoder = response._get_content_decoder()
+        async for raw in response.aiter_raw():
+            reader.chunks += 1
+            reader.wire += len(raw)
+            buffer += decoder.decode(raw)
+            *frames, buffer = buffer.split(b"\n\n")
+            now = datetime.datetime.now()
+            for frame in frames:
+                if not frame.startswith(b"id:"):
+                    continue
+                data = orjson.loads(frame.rpartition(b"data: ")[2])
+                happened = datetime.datetime.fromisoformat(data["happened_at"])
+                reader.delays.append((now - happened).total_seconds())
+                reader.events += 1
+
+
+async def produce(characters: list, seconds: float):
+    hub = mudforge.EVENT_HUB
+    started = time.perf_counter()
+    tick = 0
+    while (elapsed := time.perf_counter() - started) < seconds:
+        for character in characters:
+            hub.send_nowait(
+                character.id,
+                CharacterCreated(
+                    user_id=character.user_id,
+                    user_name="someone@example.com",
+                    character_id=character.id,
+                    character_name=character.name,
+                ),
+            )
+        tick += 1
+        await asyncio.sleep(max(0.0, tick / RATE - elapsed))
+    return tick * len(characters)
+
+
+async def measure(client, characters, token: str, seconds: float) -> str:
+    reader = Reader()
+    ready = [asyncio.Event() for _ in characters]
+    readers = [
+        asyncio.create_task(read(client, c.id, token, reader, r))
+        for c, r in zip(characters, ready)
+    ]
+    for event in ready:
+        await event.wait()
+    await asyncio.sleep(0.2)
+
+    cpu = time.process_time()
+    sent = await produce(characters, seconds)
+    await asyncio.sleep(0.5)
+    cpu = time.process_time() - cpu
+    for task in readers:
+        task.cancel()
+    await asyncio.gather(*readers, return_exceptions=True)
+
+    delays = sorted(reader.delays)
+    p99 = delays[int(len(delays) * 0.99)] * 1000 if delays else 0.0
+    mean = statistics.fmean(delays) * 1000 if delays else 0.0
+    per_thousand = cpu / max(reader.events, 1) * 1000 * 1000
+    return (
+        f"{sent:>8}{reader.events:>9}{reader.chunks:>8}{reader.wire:>10}"
+        f"{per_thousand:>9.1f}{mean:>8.1f}{p99:>8.1f}"
+    )
+
+
+async def main(streams: int, seconds: float):
+    mudforge.SETTINGS = get_config("game")
+    mudforge.SETTINGS["GAME"]["networking"]["port"] = PORT
+    mudforge.SETTINGS["SHARED"]["external"] = "127.0.0.1"
+    directory = Path(tempfile.mkdtemp())
+    if certificate := make_certificate(directory):
+        mudforge.SETTINGS["TLS"]["certificate"], mudforge.SETTINGS["TLS"]["key"] = (
+            certificate
+        )
+    mudforge.EVENT_HUB = EventHub()
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    user = UserModel.model_construct(
+        id=uuid.uuid4(),
+        email="bench@example.com",
+        display_name=None,
+        admin_level=0,
+        created_at=None,
+    )
+    characters = {
+        c.id: c
+        for c in (
+            CharacterModel.model_construct(
+                id=uuid.uuid4(), user_id=user.id, name=f"Bench{i}", last_active_at=now
+            )
+            for i in range(streams)
+        )
+    }
+
+    async def get_user(user_id):
+        return user
+
+    async def find_character_id(character_id):
+        return characters[character_id]
+
+    users_db.get_user = get_user
+    characters_db.find_character_id = find_character_id
+
+    app = Application()
+    await app.setup_fastapi()
+    stop = asyncio.Event()
+    server = asyncio.create_task(
+        serve(app.fastapi_instance, app.fastapi_config, shutdown_trigger=stop.wait)
+    )
+    await asyncio.sleep(1.0)
+
+    token = TokenResponse.from_uuid(user.id).access_token
+    scheme = "https" if certificate else "http"
+    print(f"{streams} streams x {RATE} events/s for {seconds:g} s")
+    print(
+        f"{'':<24}{'sent':>8}{'received':>9}{'chunks':>8}{'bytes':>10}"
+        f"{'cpu ms':>9}{'mean ms':>8}{'p99 ms':>8}"
+    )
+    print(f"{'':<57}{'/1k ev':>9}{'delay':>8}{'delay':>8}")
+    events = mudforge.SETTINGS["GAME"]["events"]
+    for name, settings in CONFIGURATIONS.items():
+        events.update({"compression": False, **settings})
+        async with httpx.AsyncClient(
+            base_url=f"{scheme}://127.0.0.1:{PORT}",
+            http2=bool(certificate),
+            verify=False,
+            timeout=None,
+        ) as client:
+            result = await measure(client, list(characters.values()), token, seconds)
+        print(f"{name:<24}{result}")
+
+    stop.set()
+    await server
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(
+        main(
+            int(sys.argv[1]) if len(sys.argv) > 1 else 50,
+            float(sys.argv[2]) if len(sys.argv) > 2 else 5.0,
+        )
+    )
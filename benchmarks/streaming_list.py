@@ -0,0 +1,164 @@
+"""
+Streaming a 100,000-row list response, before and after batching:
+
+- per-row chunks: the old json_array_generator, which yielded "[", then every comma
+  and every model_dump_json() as its own chunk.
+- batched array: streaming_list as it is now, with [fastapi.streaming] defaults.
+- batched NDJSON: the same, for a client sending Accept: application/x-ndjson.
+
+Each runs for CharacterModel models (built with CharacterModel(**row), as
+list_characters does) and for raw rows (list_characters(raw=True)). Rows come from
+memory; they're dicts standing in for asyncpg Records, so the numbers are the
+response, not PostgreSQL.
+
+Responses are served by Hypercorn over plaintext HTTP/1.1 on 127.0.0.1 and read in
+full by httpx, both in this process. Reported: rows/sec from request to last byte,
+the chunks the generator yielded (each is one ASGI send), and the server's socket
+send calls, counted by wrapping socket.socket.send (the syscalls the response cost).
+
+    PYTHONPATH=. python benchmarks/streaming_list.py [rows]
+"""
+
+import asyncio
+import socket
+import sys
+import time
+import typing
+
+import httpx
+import orjson
+import pydantic
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from hypercorn.asyncio import serve
+from hypercorn.config import Config
+
+import mudforge
+from mudforge.models.characters import CharacterModel
+from mudforge.rest.utils import streaming_list
+from mudforge.utils import get_config
+from model_construction import character_rows
+
+PORT = 8768
+
+
+class Counter:
+    def __init__(self):
+        self.chunks = 0
+        self.sends = 0
+
+
+COUNTER = Counter()
+
+
+async def old_json_array_generator(
+    data: typing.AsyncGenerator[pydantic.BaseModel, None],
+) -> typing.AsyncGenerator[str | bytes, None]:
+    # json_array_generator before batching, as it was.
+    yield "["
+    first = True
+    async for element in data:
+        if not first:
+            yield ","
+        else:
+            first = False
+        if isinstance(element, pydantic.BaseModel):
+            yield element.model_dump_json()
+        else:
+            yield orjson.dumps(dict(element))
+    yield "]"
+
+
+async def counted(body: typing.AsyncIterator) -> typing.AsyncIterator:
+    async for chunk in body:
+        COUNTER.chunks += 1
+        yield chunk
+
+
+def count_sends():
+    send, sendmsg = socket.socket.send, socket.socket.sendmsg
+
+    def counted_send(self, *args, **kwargs):
+        COUNTER.sends += 1
+        return send(self, *args, **kwargs)
+
+    def counted_sendmsg(self, *args, **kwargs):
+        COUNTER.sends += 1
+        return sendmsg(self, *args, **kwargs)
+
+    socket.socket.send = counted_send
+    socket.socket.sendmsg = counted_sendmsg
+
+
+def make_app(rows: list[dict]) -> FastAPI:
+    app = FastAPI()
+
+    async def source(raw: bool):
+        for row in rows:
+            yield row if raw else CharacterModel(**row)
+
+    @app.get("/old")
+    async def old(raw: bool = False):
+        return StreamingResponse(
+            counted(old_json_array_generator(source(raw))),
+            media_type="application/json",
+        )
+
+    @app.get("/new")
+    async def new(request: Request, raw: bool = False):
+        response = streaming_list(source(raw), request)
+        response.body_iterator = counted(response.body_iterator)
+        return response
+
+    return app
+
+
+async def measure(client, path: str, count: int, headers: dict) -> str:
+    COUNTER.chunks = COUNTER.sends = 0
+    size = 0
+    started = time.perf_counter()
+    async with client.stream("GET", path, headers=headers) as response:
+        async for data in response.aiter_raw():
+            size += len(data)
+    elapsed = time.perf_counter() - started
+    return (
+        f"{count / elapsed:>10.0f}{COUNTER.chunks:>9}{COUNTER.sends:>9}"
+        f"{size / 1e6:>8.1f}"
+    )
+
+
+async def main(count: int):
+    mudforge.SETTINGS = get_config("game")
+    rows = character_rows(count)
+    config = Config()
+    config.bind = [f"127.0.0.1:{PORT}"]
+    config.accesslog = None
+    stop = asyncio.Event()
+    server = asyncio.create_task(
+        serve(make_app(rows), config, shutdown_trigger=stop.wait)
+    )
+    await asyncio.sleep(1.0)
+    count_sends()
+
+    cases = {
+        "per-row chunks": ("/old", {}),
+        "batched array": ("/new", {}),
+        "batched NDJSON": ("/new", {"Accept": "application/x-ndjson"}),
+    }
+    print(f"{count} rows per response, HTTP/1.1")
+    print(f"{'':<32}{'rows/s':>10}{'chunks':>9}{'sends':>9}{'MB':>8}")
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{PORT}", timeout=None
+    ) as client:
+        for kind, raw in (("models", False), ("raw rows", True)):
+            for name, (path, headers) in cases.items():
+                await measure(client, f"{path}?raw={raw}", count, headers)
+                result = await measure(client, f"{path}?raw={raw}", count, headers)
+                print(f"{f'{kind}, {name}':<32}{result}")
+
+    stop.set()
+    await server
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000))
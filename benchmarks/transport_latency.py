@@ -0,0 +1,131 @@
+"""
+Latency of one portal-to-game API call over each portal.networking.game_transport:
+"tcp" (HTTP/2 over TLS to game_url), "unix" (HTTP/1.1 over the Unix socket) and
+"asgi" (in-process). The clients are built the way BaseConnection.create_client
+builds them.
+
+The call is GET /users/{id} with a bearer token: JWT decoding, get_current_user and
+the route's serialization all run. users_db.get_user is answered from memory, so the
+numbers are the transport and the framework, not PostgreSQL.
+
+    PYTHONPATH=. python benchmarks/transport_latency.py [calls]
+"""
+
+import asyncio
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+from hypercorn.asyncio import serve
+
+import mudforge
+from mudforge.db import users as users_db
+from mudforge.game.application import Application
+from mudforge.models.auth import TokenResponse
+from mudforge.models.users import UserModel
+from mudforge.utils import get_config
+
+
+def make_certificate(directory: Path) -> tuple[str, str] | None:
+    if not shutil.which("openssl"):
+        return None
+    cert, key = str(directory / "cert.pem"), str(directory / "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1"]
+        + ["-subj", "/CN=127.0.0.1", "-keyout", key, "-out", cert],
+        check=True,
+        capture_output=True,
+    )
+    return cert, key
+
+
+async def measure(client: httpx.AsyncClient, path: str, headers: dict, calls: int):
+    for _ in range(50):
+        (await client.get(path, headers=headers)).raise_for_status()
+    timings = list()
+    for _ in range(calls):
+        started = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        timings.append(time.perf_counter() - started)
+        response.raise_for_status()
+    timings.sort()
+    return {
+        "mean": statistics.fmean(timings) * 1000,
+        "p50": timings[len(timings) // 2] * 1000,
+        "p99": timings[int(len(timings) * 0.99)] * 1000,
+    }
+
+
+async def main(calls: int):
+    mudforge.SETTINGS = get_config("game")
+    directory = Path(tempfile.mkdtemp())
+    socket_path = str(directory / "game.sock")
+    networking = mudforge.SETTINGS["GAME"]["networking"]
+    networking["unix_socket"] = socket_path
+    networking["port"] = 8765
+    mudforge.SETTINGS["SHARED"]["external"] = "127.0.0.1"
+    if certificate := make_certificate(directory):
+        mudforge.SETTINGS["TLS"]["certificate"], mudforge.SETTINGS["TLS"]["key"] = (
+            certificate
+        )
+
+    user = UserModel.model_construct(
+        id=uuid.uuid4(), email="bench@example.com", admin_level=1, created_at=None
+    )
+
+    async def get_user(user_id):
+        return user
+
+    users_db.get_user = get_user
+
+    app = Application()
+    await app.setup_fastapi()
+    stop = asyncio.Event()
+    server = asyncio.create_task(
+        serve(app.fastapi_instance, app.fastapi_config, shutdown_trigger=stop.wait)
+    )
+    await asyncio.sleep(1.0)
+
+    scheme = "https" if certificate else "http"
+    limits = httpx.Limits(max_connections=10, max_keepalive_connections=10)
+    clients = {
+        f"tcp ({'h2+TLS' if certificate else 'http/1.1'})": httpx.AsyncClient(
+            base_url=f"{scheme}://127.0.0.1:8765",
+            http2=True,
+            limits=limits,
+            verify=False,
+        ),
+        "unix": httpx.AsyncClient(
+            base_url="http://game",
+            transport=httpx.AsyncHTTPTransport(uds=socket_path, limits=limits),
+        ),
+        "asgi": httpx.AsyncClient(
+            base_url="http://game",
+            transport=httpx.ASGITransport(app=app.fastapi_instance),
+        ),
+    }
+    token = TokenResponse.from_uuid(user.id).access_token
+    headers = {"Authorization": f"Bearer {token}"}
+
+    print(f"GET /users/{{id}}, {calls} sequential calls per transport (ms)")
+    print(f"{'transport':<16}{'mean':>8}{'p50':>8}{'p99':>8}")
+    for name, client in clients.items():
+        async with client:
+            result = await measure(client, f"/users/{user.id}", headers, calls)
+        print(
+            f"{name:<16}{result['mean']:>8.3f}{result['p50']:>8.3f}{result['p99']:>8.3f}"
+        )
+
+    stop.set()
+    await server
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
@@ -23,6 +23,7 @@ LISTENERS_TABLE = defaultdict(list)
 BROADCASTERS: dict[str, Broadcaster] = defaultdict(Broadcaster)
 EVENT_HUB: EventHub = None
 EVENTS: dict[str, typing.Type] = dict()
+EVENT_CODEC: "CompactCodec" = None
 
 COMMANDS: dict[str, "Command"] = dict()
 
@@ -80,13 +81,16 @@ class Application:
         for srv in self.valid_services:
             await srv.setup()
 
-    async def run(self):
+    def start_services(self, task_group: asyncio.TaskGroup):
         self.valid_services.sort(key=lambda x: x.start_priority)
+        for srv in self.valid_services:
+            task_group.create_task(srv.run())
+
+    async def run(self):
         logger.info("Starting services...")
         async with asyncio.TaskGroup() as tg:
             self.task_group = tg
-            for srv in self.valid_services:
-                tg.create_task(srv.run())
+            self.start_services(tg)
             await self.start()
 
             await self.shutdown_event.wait()
@@ -0,0 +1,85 @@
+import asyncio
+import datetime
+import uuid
+
+from loguru import logger
+
+import mudforge
+from mudforge import Service
+
+from .base import register_query
+
+UPDATE_LAST_ACTIVE = register_query(
+    "activity.update_last_active",
+    """
+    UPDATE characters AS c
+    SET last_active_at = t.seen_at
+    FROM unnest($1::uuid[], $2::timestamptz[]) AS t(id, seen_at)
+    WHERE c.id = t.id AND c.last_active_at < t.seen_at
+    """,
+)
+
+
+class ActivityTracker(Service):
+    """
+    Keeps characters.last_active_at current without a write per command.
+
+    Activity is noted in memory with touch(), and every flush_interval seconds all of it
+    is written with a single UPDATE. Characters with an open event stream count as
+    active too. Anything still pending is written on shutdown.
+
+    With 006_activity_notify.sql applied, these updates send no table_changes, so a
+    cached character keeps its older last_active_at until its cache entry expires.
+    """
+
+    def __init__(self):
+        settings = mudforge.SETTINGS["GAME"].get("activity", dict())
+        self.flush_interval = settings.get("flush_interval", 60.0)
+        self.pending: dict[uuid.UUID, datetime.datetime] = dict()
+        self.running = False
+
+    def touch(self, character_id: uuid.UUID):
+        self.pending[character_id] = datetime.datetime.now(datetime.timezone.utc)
+
+    async def flush(self):
+        now = datetime.datetime.now(datetime.timezone.utc)
+        if mudforge.EVENT_HUB:
+            for character_id in mudforge.EVENT_HUB.online():
+                self.pending.setdefault(character_id, now)
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, dict()
+        try:
+            async with mudforge.PGPOOL.acquire() as conn:
+                await conn.execute(
+                    UPDATE_LAST_ACTIVE, list(pending.keys()), list(pending.values())
+                )
+        except Exception as err:
+            logger.error(f"Could not update last_active_at for {len(pending)}: {err}")
+            # Keep whatever is newer for the next attempt.
+            for character_id, seen_at in pending.items():
+                if self.pending.get(character_id, seen_at) <= seen_at:
+                    self.pending[character_id] = seen_at
+
+    async def run(self):
+        self.running = True
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                await self.flush()
+        except asyncio.CancelledError:
+            self.running = False
+            await self.flush()
+            raise
+        finally:
+            self.running = False
+
+
+def touch(character_id: uuid.UUID):
+    """
+    Notes that a character did something just now. Does nothing if the ActivityTracker
+    isn't running.
+    """
+    tracker: ActivityTracker | None = mudforge.SERVICES.get("activity", None)
+    if tracker and tracker.running:
+        tracker.touch(character_id)
@@ -1,12 +1,43 @@
 from asyncpg import Connection
 from asyncpg.exceptions import UniqueViolationError
 from fastapi import HTTPException, status
-from .base import transaction, from_pool, stream
+from .base import transaction, from_pool, stream, from_record, register_query
 
 from mudforge.models.users import UserModel
 from mudforge.utils import crypt_context
 
-from mudforge.models.users import UserModel
+from .users import USER_COLUMNS
+from .loginrecords import record_login
+
+ANY_USER = register_query("auth.any_user", "SELECT id FROM users LIMIT 1")
+REGISTER_USER = register_query(
+    "auth.register",
+    f"""
+    INSERT INTO users (email, admin_level)
+    VALUES ($1, $2)
+    RETURNING {USER_COLUMNS}
+    """,
+)
+INSERT_PASSWORD = register_query(
+    "auth.insert_password",
+    """
+    INSERT INTO passwords (user_id, password)
+    VALUES ($1, $2)
+    RETURNING id
+    """,
+)
+SET_CURRENT_PASSWORD = register_query(
+    "auth.set_current_password",
+    "UPDATE users SET current_password_id=$1 WHERE id=$2",
+)
+FIND_USER_PASSWORD = register_query(
+    "auth.find_user_password",
+    f"""
+    SELECT {USER_COLUMNS}, password
+    FROM user_passwords
+    WHERE email = $1 LIMIT 1
+    """,
+)
 
 
 @transaction
@@ -16,45 +47,25 @@ async def register_user(
     admin_level = 0
 
     # if there are no users, make this user an admin.
-    if not (await conn.fetchrow("SELECT id FROM users")):
+    if not (await conn.fetchrow(ANY_USER)):
         admin_level = 10
 
     try:
         # Insert the new user.
-        user_row = await conn.fetchrow(
-            """
-            INSERT INTO users (email, admin_level)
-            VALUES ($1, $2)
-            RETURNING *
-            """,
-            email,
-            admin_level,
-        )
+        user_row = await conn.fetchrow(REGISTER_USER, email, admin_level)
     except UniqueViolationError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User already exists.",
         )
-    user = UserModel(**user_row)
+    user = from_record(UserModel, user_row)
 
     # Insert the password record.
-    password_row = await conn.fetchrow(
-        """
-        INSERT INTO passwords (user_id, password)
-        VALUES ($1, $2)
-        RETURNING id
-        """,
-        user.id,
-        hashed_password,
-    )
+    password_row = await conn.fetchrow(INSERT_PASSWORD, user.id, hashed_password)
     password_id = password_row["id"]
 
     # Update the user to set the current password.
-    await conn.execute(
-        "UPDATE users SET current_password_id=$1 WHERE id=$2",
-        password_id,
-        user.id,
-    )
+    await conn.execute(SET_CURRENT_PASSWORD, password_id, user.id)
     return user
 
 
@@ -63,41 +74,18 @@ async def authenticate_user(
     conn: Connection, email: str, password: str, ip: str, user_agent: str | None
 ) -> UserModel:
     # Retrieve the latest password row for this user.
-    retrieved_user = await conn.fetchrow(
-        """
-        SELECT *
-        FROM user_passwords
-        WHERE email = $1 LIMIT 1
-        """,
-        email,
-    )
+    retrieved_user = await conn.fetchrow(FIND_USER_PASSWORD, email)
+    if not retrieved_user:
+        # Nothing to record against; loginrecords.user_id can't be NULL.
+        raise HTTPException(status_code=400, detail="Invalid credentials.")
     if not (
-        retrieved_user
-        and retrieved_user["password"]
+        retrieved_user["password"]
         and crypt_context.verify(password, retrieved_user["password"])
     ):
-        await conn.execute(
-            """
-            INSERT INTO loginrecords (user_id, ip_address, success, user_agent)
-            VALUES ($1, $2, $3, $4)
-            """,
-            retrieved_user["id"],
-            ip,
-            False,
-            user_agent,
-        )
+        await record_login(conn, retrieved_user["id"], ip, False, user_agent)
         raise HTTPException(status_code=400, detail="Invalid credentials.")
 
     # Record successful login.
-    await conn.execute(
-        """
-        INSERT INTO loginrecords (user_id, ip_address, success, user_agent)
-        VALUES ($1, $2, $3, $4)
-        """,
-        retrieved_user["id"],
-        ip,
-        True,
-        user_agent,
-    )
+    await record_login(conn, retrieved_user["id"], ip, True, user_agent)
 
-    return UserModel(**retrieved_user)
+    return from_record(UserModel, retrieved_user)
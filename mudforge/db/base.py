@@ -1,21 +1,105 @@
+import asyncio
 from functools import wraps
 import typing
+import asyncpg
+import pydantic
+from loguru import logger
 import mudforge  # assuming this is where PGPOOL is defined
+from . import metrics
+from .replicas import REPLICAS, ReplicaLost
+
+M = typing.TypeVar("M", bound=pydantic.BaseModel)
+
+
+QUERIES: dict[str, str] = dict()
+
+
+def register_query(name: str, sql: str) -> str:
+    """
+    Names one of the project's queries so that it's prepared on every pool connection
+    as the connection is opened (see prepare_queries), rather than by whichever request
+    happens to run it first. Returns sql unchanged. Use the returned string as-is:
+    asyncpg's statement cache is keyed by the exact query text.
+    """
+    QUERIES[name] = sql
+    return sql
+
+
+# Queries that failed to prepare. Each is logged once, not once per pool connection,
+# and not tried again: it's prepared on first use, as any query would be.
+UNPREPARED: set[str] = set()
+
+
+async def prepare_queries(conn: asyncpg.Connection) -> int:
+    """
+    Prepares every registered query on conn. Returns how many were.
+
+    Preparing is what makes a connection's first use of a query slow: asyncpg
+    introspects any types it hasn't seen (citext, inet, ...) and the server loads the
+    catalog entries for the tables involved. Both stay with the connection, so
+    requests don't pay for them (see benchmarks/first_request.py).
+    """
+    prepared = 0
+    for name, sql in QUERIES.items():
+        if name in UNPREPARED:
+            continue
+        try:
+            await conn.prepare(sql)
+            prepared += 1
+        except asyncpg.PostgresError as err:
+            # Most often a migration that hasn't been applied yet.
+            UNPREPARED.add(name)
+            logger.error(f"Could not prepare query {name}: {err}")
+    return prepared
+
+
+def columns(model: type[pydantic.BaseModel], prefix: str = "") -> str:
+    """
+    The model's fields as a SELECT list, so rows carry exactly what the model does.
+    Columns the model doesn't have (like users.current_password_id) never leave the database.
+    """
+    return ", ".join(f"{prefix}{name}" for name in model.model_fields)
+
+
+def from_record(model: type[M], record) -> M:
+    """
+    Builds a model from a row without validating it.
+
+    Rows have already passed the table's types and constraints, and asyncpg returns
+    UUIDs and datetimes as such. Re-validating them is expensive: EmailStr alone makes
+    UserModel(**row) roughly 15x slower. Use this only for rows selected with
+    columns(model). Anything coming from a client must still go through validation.
+
+    The saving is in Python-side validators like EmailStr's. model_construct itself
+    runs in Python, so a model of plain fields, like CharacterModel, builds about twice
+    as slowly this way as pydantic-core validates it (see
+    benchmarks/model_construction.py). Build those with Model(**row) instead.
+    """
+    return model.model_construct(**record)
 
 
 def transaction(func):
     """
-    Executes the function within a transaction.
+    Executes the function within a transaction, always on the primary.
 
     For streaming a select, use @stream not @transaction.
     """
 
+    name = metrics.query_name(func)
+
     @wraps(func)
     async def wrapper(*args, **kwargs):
-        async with mudforge.PGPOOL.acquire() as conn:
-            async with conn.transaction():
-                # Pass the connection as the first parameter to the function.
-                return await func(conn, *args, **kwargs)
+        with metrics.measure(name) as measurement:
+            async with mudforge.PGPOOL.acquire() as conn:
+                measurement.connected()
+                try:
+                    async with conn.transaction():
+                        # Pass the connection as the first parameter to the function.
+                        result = await func(conn, *args, **kwargs)
+                finally:
+                    REPLICAS.wrote()
+            measurement.rows = metrics.count_rows(result)
+            return result
 
     return wrapper
 
@@ -23,16 +107,24 @@ def transaction(func):
 def stream(func):
     """
     Streams results asynchronously from a query. Don't use @transaction for that, use this.
+    It may be served by a replica (see mudforge.db.replicas), so don't write with it.
+
+    Its recorded latency covers the whole stream, however slowly it's read. A stream
+    can't be restarted partway, so if its replica fails, the reader gets ReplicaLost.
     """
+    name = metrics.query_name(func)
 
     @wraps(func)
     def wrapper(*args, **kwargs) -> typing.AsyncIterator[typing.Any]:
         async def generator():
-            async with mudforge.PGPOOL.acquire() as conn:
-                async with conn.transaction():
-                    # If `func` is an async generator, we must iterate over it:
-                    async for item in func(conn, *args, **kwargs):
-                        yield item
+            with metrics.measure(name) as measurement:
+                async with REPLICAS.acquire() as conn:
+                    measurement.connected()
+                    async with conn.transaction():
+                        # If `func` is an async generator, we must iterate over it:
+                        async for item in func(conn, *args, **kwargs):
+                            measurement.rows += 1
+                            yield item
 
         # Return the async generator object
         return generator()
@@ -40,14 +132,127 @@ def stream(func):
     return wrapper
 
 
-def from_pool(func):
+def keyset(
+    model: type[pydantic.BaseModel], batch_size: int = 500, validate: bool = False
+):
+    """
+    Streams a table in keyset-paginated batches, holding a pooled (possibly replica)
+    connection only while each batch is fetched. Unlike @stream, a slow reader can't pin
+    a connection for the life of a response.
+
+    The wrapped function is called as func(conn, after, size, *args, **kwargs) and must
+    return at most size rows with id > after (or from the start, if after is None),
+    ordered by id.
+
+    The wrapper takes after=, limit= and raw=, and returns an async generator of models,
+    or of the rows themselves if raw. Models are built with from_record, or with
+    model(**row) if validate is set (see from_record for which is faster).
+    """
+
+    def decorator(func):
+        name = metrics.query_name(func)
+
+        @wraps(func)
+        def wrapper(
+            *args, after=None, limit: int | None = None, raw: bool = False, **kwargs
+        ) -> typing.AsyncIterator[typing.Any]:
+            async def generator():
+                cursor = after
+                remaining = limit
+                while remaining is None or remaining > 0:
+                    size = batch_size if remaining is None else min(batch_size, remaining)
+                    # Each batch is measured on its own.
+                    with metrics.measure(name) as measurement:
+                        try:
+                            async with REPLICAS.acquire() as conn:
+                                measurement.connected()
+                                rows = await func(conn, cursor, size, *args, **kwargs)
+                        except ReplicaLost:
+                            # That replica is out now; the batch is fetched elsewhere.
+                            async with REPLICAS.acquire() as conn:
+                                rows = await func(conn, cursor, size, *args, **kwargs)
+                        measurement.rows = len(rows)
+                    for row in rows:
+                        if raw:
+                            yield row
+                        elif validate:
+                            yield model(**row)
+                        else:
+                            yield from_record(model, row)
+                    if len(rows) < size:
+                        return
+                    cursor = rows[-1]["id"]
+                    if remaining is not None:
+                        remaining -= len(rows)
+
+            return generator()
+
+        return wrapper
+
+    return decorator
+
+
+def _copy_exception(exc: Exception) -> Exception:
+    # Skips __init__, which copy.copy() would call with exc.args: that fails for an
+    # exception built from keyword arguments, like HTTPException(status_code=404).
+    own = exc.__class__.__new__(exc.__class__, *exc.args)
+    own.__dict__.update(exc.__dict__)
+    return own
+
+
+def coalesce(func):
     """
-    Wraps simple functions that just need a connection but not a transaction.
+    Single-flight: concurrent calls with the same arguments share one call of func and
+    its result (or exception), rather than each running the same query. Put it above
+    @from_pool or @transaction so that only the one call takes a connection.
+
+    Callers get the same object back, so treat the result as read-only. If the call
+    raises, each caller gets its own copy of the exception (chained to the original),
+    so that tracebacks and request state aren't shared between them. A caller being
+    cancelled doesn't cancel the shared call for the others.
     """
+    name = metrics.query_name(func)
+    in_flight: dict[typing.Hashable, asyncio.Future] = dict()
 
     @wraps(func)
     async def wrapper(*args, **kwargs):
-        async with mudforge.PGPOOL.acquire() as conn:
-            return await func(conn, *args, **kwargs)
+        key = (args, tuple(sorted(kwargs.items()))) if kwargs else args
+        if (task := in_flight.get(key, None)) is None:
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            in_flight[key] = task
+            task.add_done_callback(lambda _: in_flight.pop(key, None))
+        elif metrics.ENABLED:
+            metrics.METRICS[name].coalesced += 1
+        try:
+            return await asyncio.shield(task)
+        except Exception as exc:
+            raise _copy_exception(exc) from exc
+
+    return wrapper
+
+
+def from_pool(func):
+    """
+    Wraps simple functions that just need a connection but not a transaction. The
+    connection may be to a replica (see mudforge.db.replicas), so use @transaction for
+    anything that writes. Pass primary=True to read from the primary regardless.
+    """
+
+    name = metrics.query_name(func)
+
+    @wraps(func)
+    async def wrapper(*args, primary: bool = False, **kwargs):
+        with metrics.measure(name) as measurement:
+            try:
+                async with REPLICAS.acquire(primary) as conn:
+                    measurement.connected()
+                    result = await func(conn, *args, **kwargs)
+            except ReplicaLost:
+                # A replica went away mid-read and is out of rotation now. Nothing here
+                # writes, so the call gets one more go elsewhere.
+                async with REPLICAS.acquire() as conn:
+                    result = await func(conn, *args, **kwargs)
+            measurement.rows = metrics.count_rows(result)
+            return result
 
     return wrapper
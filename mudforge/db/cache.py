@@ -0,0 +1,163 @@
+"""
+A read-through cache for db lookups, invalidated by the table_changes notifications
+that the users and characters triggers already send.
+
+Entries are indexed by the table and id of the row they hold, so
+mudforge.game.listeners.CacheListener can drop every cached lookup of a row (by id,
+by name, ...) as soon as it changes. Entries also expire after a TTL, in case a
+notification is ever missed, and the least recently used are evicted past max_entries.
+
+When reads can be served by a lagging replica (see mudforge.db.replicas), a row that
+changed within the last max_lag seconds isn't cached, since the lookup may have read
+the version from before the change.
+"""
+
+import time
+import typing
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from functools import wraps
+
+from . import metrics
+from .replicas import REPLICAS
+
+
+@dataclass(slots=True)
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+    evictions: int = 0
+
+    def snapshot(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+        }
+
+
+class RowCache:
+    def __init__(self, ttl: float = 60.0, max_entries: int = 10000):
+        self.enabled = True
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # key -> (table, row_id, expires_at, value)
+        self.entries: OrderedDict[typing.Hashable, tuple] = OrderedDict()
+        # (table, row_id) -> keys holding that row
+        self.rows: dict[tuple[str, str], set] = defaultdict(set)
+        self.stats: dict[str, CacheStats] = defaultdict(CacheStats)
+        # Bumped on every invalidation. A lookup that started before one doesn't get
+        # stored, since what it read may already be stale.
+        self.generation = 0
+        # (table, row_id) -> monotonic time it last changed, for the last settle seconds.
+        self.changed: OrderedDict[tuple[str, str], float] = OrderedDict()
+
+    def configure(self, settings: dict):
+        self.enabled = bool(settings.get("enabled", True))
+        self.ttl = settings.get("ttl", 60.0)
+        self.max_entries = settings.get("max_entries", 10000)
+        self.clear()
+
+    def get(self, table: str, key) -> tuple[bool, typing.Any]:
+        if (entry := self.entries.get(key, None)) is None:
+            self.stats[table].misses += 1
+            return False, None
+        if entry[2] <= time.monotonic():
+            self.discard(key)
+            self.stats[table].misses += 1
+            return False, None
+        self.entries.move_to_end(key)
+        self.stats[table].hits += 1
+        return True, entry[3]
+
+    def store(self, table: str, row_id, key, value, started: float = 0.0):
+        row_id = str(row_id)
+        if (changed := self.changed.get((table, row_id), None)) is not None:
+            if changed > started - REPLICAS.settle():
+                return
+        self.discard(key)
+        self.entries[key] = (table, row_id, time.monotonic() + self.ttl, value)
+        self.rows[(table, row_id)].add(key)
+        while len(self.entries) > self.max_entries:
+            oldest = next(iter(self.entries))
+            self.stats[self.entries[oldest][0]].evictions += 1
+            self.discard(oldest)
+
+    def discard(self, key):
+        if (entry := self.entries.pop(key, None)) is None:
+            return
+        row = (entry[0], entry[1])
+        if keys := self.rows.get(row, None):
+            keys.discard(key)
+            if not keys:
+                del self.rows[row]
+
+    def invalidate(self, table: str, row_id):
+        self.generation += 1
+        row = (table, str(row_id))
+        for key in self.rows.pop(row, set()):
+            self.entries.pop(key, None)
+            self.stats[table].invalidations += 1
+        if settle := REPLICAS.settle():
+            now = time.monotonic()
+            self.changed[row] = now
+            self.changed.move_to_end(row)
+            while self.changed and next(iter(self.changed.values())) <= now - settle:
+                self.changed.popitem(last=False)
+
+    def clear(self):
+        self.generation += 1
+        self.entries.clear()
+        self.rows.clear()
+
+    def snapshot(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "entries": len(self.entries),
+            "tables": {table: s.snapshot() for table, s in sorted(self.stats.items())},
+        }
+
+
+CACHE = RowCache()
+
+
+def cached(table: str):
+    """
+    Caches a lookup that returns one row of table as a model with an id. Put it above
+    @coalesce. Lookups that raise (like a 404) aren't cached.
+
+    Callers share the cached object, so treat it as read-only. A lookup called with
+    primary=True (see @from_pool) skips the cache, reading the row from the primary.
+    Other keyword arguments are part of the key, as they are for @coalesce.
+    """
+
+    def decorator(func):
+        name = metrics.query_name(func)
+
+        @wraps(func)
+        async def wrapper(*args, primary: bool = False, **kwargs):
+            if primary:
+                return await func(*args, primary=True, **kwargs)
+            if not CACHE.enabled:
+                return await func(*args, **kwargs)
+            key = (name, args)
+            if kwargs:
+                key += (tuple(sorted(kwargs.items())),)
+            found, value = CACHE.get(table, key)
+            if found:
+                return value
+            generation = CACHE.generation
+            started = time.monotonic()
+            value = await func(*args, **kwargs)
+            if CACHE.generation == generation:
+                CACHE.store(table, value.id, key, value, started)
+            return value
+
+        return wrapper
+
+    return decorator
+
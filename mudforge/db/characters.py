@@ -1,20 +1,108 @@
 import typing
 import uuid
 
-from asyncpg import Connection
+from asyncpg import Connection, Record
 from asyncpg.exceptions import UniqueViolationError
 from fastapi import HTTPException, status
-from .base import transaction, from_pool, stream
+from .base import (
+    transaction,
+    from_pool,
+    stream,
+    keyset,
+    columns,
+    register_query,
+    coalesce,
+)
+from .cache import cached
 
 import mudforge
 from mudforge.models.users import UserModel
-from mudforge.models.characters import CharacterModel, ActiveAs
-
-
+from mudforge.models.characters import CharacterModel, Presence
+
+CHARACTER_COLUMNS = columns(CharacterModel)
+
+FIND_CHARACTER_NAME = register_query(
+    "characters.find_name",
+    f"""
+    SELECT {CHARACTER_COLUMNS} FROM characters WHERE name = $1 AND deleted_at IS NULL
+    """,
+)
+FIND_CHARACTER_ID = register_query(
+    "characters.find_id", f"SELECT {CHARACTER_COLUMNS} FROM characters WHERE id = $1"
+)
+# Keyset pages. The first page gets its own query: "$1 IS NULL OR id > $1" would
+# keep a generic plan from using the primary key as a range, so every page would
+# scan from the start.
+LIST_CHARACTERS_FIRST = register_query(
+    "characters.list_first",
+    f"SELECT {CHARACTER_COLUMNS} FROM characters ORDER BY id LIMIT $1",
+)
+LIST_CHARACTERS_AFTER = register_query(
+    "characters.list_after",
+    f"SELECT {CHARACTER_COLUMNS} FROM characters WHERE id > $1 ORDER BY id LIMIT $2",
+)
+LIST_CHARACTERS_USER = register_query(
+    "characters.list_user",
+    f"""
+    SELECT {CHARACTER_COLUMNS} FROM characters WHERE user_id = $1 AND deleted_at IS NULL
+    """,
+)
+
+
+def _search_query(mine: bool, fuzzy: bool) -> str:
+    """
+    characters.search, in one variant per owner and fuzzy setting, so each gets a
+    plan that can use its indexes. $1 is the prefix, $2 the limit, $3 the owner.
+
+    Prefix matches are a byte-wise range from lower($1) to lower($1) followed by the
+    highest code point, which characters_name_prefix serves even under a generic plan
+    (LIKE with a parameter pattern can't use it). It also means %, _ and backslash in
+    the prefix are just characters.
+    """
+    name = "lower(name::text)"
+    prefix = f"({name} ~>=~ lower($1) AND {name} ~<~ (lower($1) || chr(1114111)))"
+    match = f"({prefix} OR {name} % lower($1))" if fuzzy else prefix
+    owner = "AND user_id = $3" if mine else ""
+    # Within a tier, names sort the way partial_match() sorts them, so a limit of 1
+    # picks the same character the portal would from the full list.
+    similarity = (
+        f"CASE WHEN NOT {prefix} THEN similarity({name}, lower($1)) END DESC,"
+        if fuzzy
+        else ""
+    )
+    return f"""
+    SELECT {CHARACTER_COLUMNS} FROM characters
+    WHERE deleted_at IS NULL {owner} AND {match}
+    ORDER BY
+      CASE WHEN {name} = lower($1) THEN 0 WHEN {prefix} THEN 1 ELSE 2 END,
+      {similarity}
+      {name} COLLATE "C"
+    LIMIT $2
+    """
+
+
+# Needs 005_character_search.sql, for pg_trgm and the indexes.
+SEARCH_CHARACTERS = {
+    (mine, fuzzy): register_query(
+        "characters.search" + ("_mine" if mine else "") + ("_fuzzy" if fuzzy else ""),
+        _search_query(mine, fuzzy),
+    )
+    for mine in (False, True)
+    for fuzzy in (False, True)
+}
+CREATE_CHARACTER = register_query(
+    "characters.create",
+    f"""
+    INSERT INTO characters (name, user_id) VALUES ($1, $2) RETURNING {CHARACTER_COLUMNS}
+    """,
+)
+
+
+@cached("characters")
+@coalesce
 @from_pool
 async def find_character_name(conn: Connection, name: str) -> CharacterModel:
-    query = "SELECT * FROM characters WHERE name = $1 AND deleted_at IS NULL"
-    row = await conn.fetchrow(query, name)
+    row = await conn.fetchrow(FIND_CHARACTER_NAME, name)
     if row is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Character not found"
@@ -22,12 +110,13 @@ async def find_character_name(conn: Connection, name: str) -> CharacterModel:
     return CharacterModel(**row)
 
 
+@cached("characters")
+@coalesce
 @from_pool
 async def find_character_id(
     conn: Connection, character_id: uuid.UUID
 ) -> CharacterModel:
-    query = "SELECT * FROM characters WHERE id = $1"
-    row = await conn.fetchrow(query, character_id)
+    row = await conn.fetchrow(FIND_CHARACTER_ID, character_id)
     if row is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Character not found"
@@ -35,52 +124,60 @@ async def find_character_id(
     return CharacterModel(**row)
 
 
-@stream
+@keyset(CharacterModel, validate=True)
 async def list_characters(
-    conn: Connection,
-) -> typing.AsyncGenerator[CharacterModel, None]:
-    query = "SELECT * FROM characters"
-    # Use a cursor to stream results rather than loading everything into memory at once.
-    async for row in conn.cursor(query):
-        yield CharacterModel(**row)
+    conn: Connection, after: uuid.UUID | None, size: int
+) -> list[Record]:
+    if after is None:
+        return await conn.fetch(LIST_CHARACTERS_FIRST, size)
+    return await conn.fetch(LIST_CHARACTERS_AFTER, after, size)
 
 
 @stream
 async def list_characters_user(
     conn: Connection, user: UserModel
 ) -> typing.AsyncGenerator[CharacterModel, None]:
-    query = "SELECT * FROM characters WHERE user_id = $1 AND deleted_at IS NULL"
-    async for row in conn.cursor(query, user.id):
+    async for row in conn.cursor(LIST_CHARACTERS_USER, user.id):
         yield CharacterModel(**row)
 
 
 @from_pool
+async def search_characters(
+    conn: Connection,
+    prefix: str,
+    limit: int,
+    user_id: uuid.UUID | None = None,
+    fuzzy: bool = True,
+) -> list[CharacterModel]:
+    """
+    Characters whose names match prefix: exact matches first, then those starting
+    with it, then (if fuzzy, and prefix is long enough to have trigrams worth
+    comparing) similar names, most similar first.
+    """
+    fuzzy = fuzzy and len(prefix) >= 3
+    query = SEARCH_CHARACTERS[(user_id is not None, fuzzy)]
+    args = (prefix, limit) if user_id is None else (prefix, limit, user_id)
+    rows = await conn.fetch(query, *args)
+    return [CharacterModel(**row) for row in rows]
+
+
+@transaction
 async def create_character(
     conn: Connection, user: UserModel, name: str
 ) -> CharacterModel:
-    query = "INSERT INTO characters (name, user_id) VALUES ($1, $2) RETURNING *"
     try:
-        row = await conn.fetchrow(query, name, user.id)
+        row = await conn.fetchrow(CREATE_CHARACTER, name, user.id)
     except UniqueViolationError:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT, detail="Character name already in use"
         )
+    # The name came from the client, so this one is validated.
     return CharacterModel(**row)
 
 
-@transaction
-async def list_online(conn: Connection) -> list[ActiveAs]:
-    active_ids = mudforge.EVENT_HUB.online()
-    query = "SELECT * FROM characters WHERE id = ANY($1)"
-    character_rows = await conn.fetch(query, active_ids)
-    characters = [CharacterModel(**row) for row in character_rows]
-    user_ids = {c.user_id for c in characters}
-    query = "SELECT * FROM users WHERE id = ANY($1)"
-    user_rows = await conn.fetch(query, user_ids)
-
-    user_dict = {u["id"]: UserModel(**u) for u in user_rows}
-
-    return [
-        ActiveAs(character=character, user=user_dict[character.user_id])
-        for character in characters
-    ]
+async def list_online() -> list[Presence]:
+    """
+    Everyone with an open event stream. Served from EventHub's presence index, so it
+    never touches the database.
+    """
+    return mudforge.EVENT_HUB.who()
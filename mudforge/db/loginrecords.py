@@ -0,0 +1,240 @@
+import asyncio
+import datetime
+import typing
+import uuid
+from collections import deque
+
+import asyncpg
+from asyncpg import Connection
+from loguru import logger
+
+import mudforge
+from mudforge import Service
+
+from .base import register_query
+
+# Errors that mean something in the records themselves is wrong, so retrying the same
+# records will never work.
+DATA_ERRORS = (
+    asyncpg.DataError,
+    asyncpg.IntegrityConstraintViolationError,
+    ValueError,
+    TypeError,
+)
+
+COLUMNS = ("user_id", "ip_address", "success", "user_agent", "created_at")
+
+INSERT_LOGIN_RECORD = register_query(
+    "loginrecords.insert",
+    """
+    INSERT INTO loginrecords (user_id, ip_address, success, user_agent, created_at)
+    VALUES ($1, $2, $3, $4, $5)
+    """,
+)
+
+# Whether 003_partition_loginrecords.sql has been applied.
+PARTITIONED = """
+SELECT EXISTS (
+    SELECT 1 FROM pg_class WHERE oid = to_regclass('loginrecords') AND relkind = 'p'
+)
+AND to_regprocedure('ensure_loginrecords_partitions(timestamptz, integer)') IS NOT NULL
+"""
+
+
+class LoginRecordWriter(Service):
+    """
+    Buffers login records in memory and writes them in batches with COPY, so that a
+    flood of login attempts doesn't become one INSERT per attempt on the request path.
+
+    The buffer is flushed once it holds batch_size records, every flush_interval seconds,
+    and on shutdown. It never holds more than max_buffer records; if the database falls
+    that far behind, the oldest are dropped and counted.
+    """
+
+    def __init__(self):
+        settings = mudforge.SETTINGS["GAME"].get("login_records", dict())
+        self.batch_size = settings.get("batch_size", 500)
+        self.flush_interval = settings.get("flush_interval", 1.0)
+        self.buffer: deque[tuple] = deque(maxlen=settings.get("max_buffer", 10000))
+        self.wake = asyncio.Event()
+        self.running = False
+        self.dropped = 0
+        self.rejected = 0
+
+    def add(
+        self, user_id: uuid.UUID, ip: str, success: bool, user_agent: str | None
+    ):
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+        self.buffer.append(
+            (
+                user_id,
+                ip,
+                success,
+                user_agent or "",
+                datetime.datetime.now(datetime.timezone.utc),
+            )
+        )
+        if len(self.buffer) >= self.batch_size:
+            self.wake.set()
+
+    def requeue(self, records: list[tuple]):
+        """
+        Puts unwritten records back at the front, oldest first. They're older than
+        anything buffered since, so if there isn't room for all of them, it's the
+        oldest of them that are dropped.
+        """
+        room = self.buffer.maxlen - len(self.buffer)
+        if overflow := max(0, len(records) - room):
+            self.dropped += overflow
+            records = records[overflow:]
+        self.buffer.extendleft(reversed(records))
+
+    async def write(self, batch: list[tuple]) -> bool:
+        """
+        Writes batch with COPY. If the database rejects it because of the data (a
+        user that has since been deleted, an ip_address that isn't one, ...), it's
+        bisected until the rows at fault are found, and those are dropped. Any other
+        error leaves whatever wasn't written yet in the buffer for the next flush.
+        """
+        pending = [batch]
+        while pending:
+            chunk = pending.pop()
+            try:
+                async with mudforge.PGPOOL.acquire() as conn:
+                    await conn.copy_records_to_table(
+                        "loginrecords", records=chunk, columns=COLUMNS
+                    )
+            except DATA_ERRORS as err:
+                if len(chunk) == 1:
+                    self.rejected += 1
+                    logger.error(f"Dropped a login record the database rejected: {err}")
+                    continue
+                middle = len(chunk) // 2
+                pending.append(chunk[middle:])
+                pending.append(chunk[:middle])
+            except Exception as err:
+                unwritten = [record for c in reversed(pending) for record in c]
+                logger.error(
+                    f"Could not write {len(chunk) + len(unwritten)} login records: {err}"
+                )
+                self.requeue(chunk + unwritten)
+                return False
+        return True
+
+    async def flush(self):
+        while self.buffer:
+            batch = [
+                self.buffer.popleft()
+                for _ in range(min(self.batch_size, len(self.buffer)))
+            ]
+            if not await self.write(batch):
+                # Try again next time.
+                break
+        if self.dropped:
+            logger.warning(f"Dropped {self.dropped} login records; the buffer was full.")
+            self.dropped = 0
+
+    async def run(self):
+        self.running = True
+        try:
+            while True:
+                try:
+                    async with asyncio.timeout(self.flush_interval):
+                        await self.wake.wait()
+                except TimeoutError:
+                    pass
+                self.wake.clear()
+                await self.flush()
+        except asyncio.CancelledError:
+            self.running = False
+            await self.flush()
+            raise
+        finally:
+            self.running = False
+
+
+async def record_login(
+    conn: Connection,
+    user_id: uuid.UUID,
+    ip: str,
+    success: bool,
+    user_agent: str | None,
+):
+    """
+    Hands a login record to the LoginRecordWriter if it's running. Otherwise it's
+    inserted right away on conn.
+    """
+    writer: typing.Optional[LoginRecordWriter] = mudforge.SERVICES.get(
+        "loginrecords", None
+    )
+    if writer and writer.running:
+        writer.add(user_id, ip, success, user_agent)
+        return
+    await conn.execute(
+        INSERT_LOGIN_RECORD,
+        user_id,
+        ip,
+        success,
+        user_agent or "",
+        datetime.datetime.now(datetime.timezone.utc),
+    )
+
+
+class LoginRecordMaintenance(Service):
+    """
+    Keeps loginrecords' monthly partitions (see 003_partition_loginrecords.sql) created
+    ahead of time, and expires those older than the retention setting.
+
+    Until 003 is applied, loginrecords isn't partitioned and each run is skipped, with
+    one warning rather than an error every interval.
+    """
+
+    def __init__(self):
+        settings = mudforge.SETTINGS["GAME"].get("login_records", dict())
+        self.months_ahead = settings.get("partitions_ahead", 3)
+        self.retention_months = settings.get("retention_months", 0)
+        self.archive = settings.get("archive_expired", False)
+        self.interval = settings.get("maintenance_interval", 3600)
+        self.warned = False
+
+    async def partitioned(self, conn: Connection) -> bool:
+        ready = await conn.fetchval(PARTITIONED)
+        if not ready and not self.warned:
+            logger.warning(
+                "loginrecords isn't partitioned; skipping partition maintenance until "
+                "003_partition_loginrecords.sql is applied."
+            )
+            self.warned = True
+        return bool(ready)
+
+    async def maintain(self):
+        async with mudforge.PGPOOL.acquire() as conn:
+            if not await self.partitioned(conn):
+                return
+            created = await conn.fetchval(
+                "SELECT ensure_loginrecords_partitions(CURRENT_TIMESTAMP, $1)",
+                self.months_ahead,
+            )
+            if created:
+                logger.info(f"Created {created} loginrecords partitions.")
+            if not self.retention_months:
+                return
+            expired = await conn.fetch(
+                "SELECT expire_loginrecords_partitions(make_interval(months => $1), $2)",
+                self.retention_months,
+                self.archive,
+            )
+            for row in expired:
+                action = "Detached" if self.archive else "Dropped"
+                logger.info(f"{action} expired loginrecords partition {row[0]}.")
+
+    async def run(self):
+        while True:
+            try:
+                await self.maintain()
+            except asyncio.CancelledError:
+                raise
+            except Exception as err:
+                logger.error(f"loginrecords partition maintenance failed: {err}")
+            await asyncio.sleep(self.interval)
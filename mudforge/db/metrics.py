@@ -0,0 +1,189 @@
+"""
+Query instrumentation for the decorators in mudforge.db.base.
+
+While ENABLED is False, the decorators check that one flag and skip everything else.
+While it's True, each decorated function records its latency, the time spent waiting
+for a pooled connection, and how many rows it returned. Calls slower than
+SLOW_QUERY_SECONDS are logged.
+"""
+
+import bisect
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from loguru import logger
+
+ENABLED = False
+SLOW_QUERY_SECONDS = 0.25
+
+# Upper bounds, in milliseconds. The last bucket catches everything slower.
+BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+@dataclass(slots=True)
+class Histogram:
+    counts: list[int] = field(default_factory=lambda: [0] * (len(BUCKETS) + 1))
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    def observe(self, seconds: float):
+        ms = seconds * 1000
+        self.counts[bisect.bisect_left(BUCKETS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimates the q-th quantile, in ms, as the upper bound of the bucket it falls
+        in (or the slowest call seen, if that's lower or it's in the last bucket).
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, round(q * self.count))
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self) -> dict:
+        buckets = {f"le_{b}": c for b, c in zip(BUCKETS, self.counts)}
+        buckets["inf"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count if self.count else 0.0,
+            "p50_ms": self.quantile(0.5),
+            "p99_ms": self.quantile(0.99),
+            "max_ms": self.max,
+            "buckets": buckets,
+        }
+
+
+@dataclass(slots=True)
+class QueryMetrics:
+    calls: int = 0
+    errors: int = 0
+    slow: int = 0
+    rows: int = 0
+    # Calls that shared another's in-flight result (see db.base.coalesce).
+    coalesced: int = 0
+    latency: Histogram = field(default_factory=Histogram)
+    acquire: Histogram = field(default_factory=Histogram)
+
+    def snapshot(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "slow": self.slow,
+            "rows": self.rows,
+            "coalesced": self.coalesced,
+            "latency": self.latency.snapshot(),
+            "acquire": self.acquire.snapshot(),
+        }
+
+
+METRICS: dict[str, QueryMetrics] = defaultdict(QueryMetrics)
+
+
+def configure(settings: dict):
+    global ENABLED, SLOW_QUERY_SECONDS
+    ENABLED = bool(settings.get("enabled", False))
+    SLOW_QUERY_SECONDS = settings.get("slow_query_ms", 250) / 1000
+
+
+def count_rows(result) -> int:
+    if result is None:
+        return 0
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    return 1
+
+
+def record(name: str, started: float, acquired: float, rows: int, error: bool = False):
+    """
+    started and acquired are time.perf_counter() readings from before the pool was
+    asked for a connection and from once it handed one over.
+    """
+    elapsed = time.perf_counter() - started
+    metrics = METRICS[name]
+    metrics.calls += 1
+    metrics.rows += rows
+    metrics.acquire.observe(acquired - started)
+    metrics.latency.observe(elapsed)
+    if error:
+        metrics.errors += 1
+    if elapsed >= SLOW_QUERY_SECONDS:
+        metrics.slow += 1
+        logger.warning(
+            f"Slow query: {name} took {elapsed * 1000:.1f}ms "
+            f"({(acquired - started) * 1000:.1f}ms waiting for a connection)"
+        )
+
+
+class Measurement:
+    """
+    Times one decorated call. Call connected() once the pool has handed over a
+    connection, and add to rows as they come back.
+    """
+
+    __slots__ = ("name", "started", "acquired", "rows")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = self.acquired = time.perf_counter()
+        self.rows = 0
+
+    def connected(self):
+        self.acquired = time.perf_counter()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # A stream closed early by its reader (GeneratorExit) isn't an error.
+        error = exc_type is not None and exc_type is not GeneratorExit
+        record(self.name, self.started, self.acquired, self.rows, error)
+
+
+class _NullMeasurement:
+    __slots__ = ("rows",)
+
+    def __init__(self):
+        self.rows = 0
+
+    def connected(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+
+_NULL = _NullMeasurement()
+
+
+def measure(name: str) -> Measurement | _NullMeasurement:
+    """
+    Returns a Measurement, or a shared do-nothing stand-in while metrics are disabled.
+    """
+    return Measurement(name) if ENABLED else _NULL
+
+
+def query_name(func) -> str:
+    # "mudforge.db.characters" + "find_character_id" -> "characters.find_character_id"
+    return f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+
+def snapshot() -> dict:
+    return {name: metrics.snapshot() for name, metrics in sorted(METRICS.items())}
+
+
+def reset():
+    METRICS.clear()
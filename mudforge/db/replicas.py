@@ -0,0 +1,217 @@
+"""
+Routes reads to streaming replicas of the primary, when [game.replicas] lists any.
+
+@from_pool, @stream and @keyset take their connection from REPLICAS.acquire(), which
+hands out a replica connection when one is healthy and caught up enough, and a PGPOOL
+one otherwise. @transaction always uses PGPOOL.
+
+How far behind a replica is, is measured rather than guessed: every check_interval
+seconds the primary's WAL position is sampled, and a replica counts as synced as of the
+newest sample it has replayed. A replica is only used if it's synced within max_lag
+seconds, and, so that a process always reads its own writes, not since before this
+process last ran a @transaction.
+"""
+
+import asyncio
+import contextlib
+import time
+import typing
+from collections import deque
+from dataclasses import dataclass
+
+import asyncpg
+from loguru import logger
+
+import mudforge
+
+# Errors that mean a replica is unreachable, rather than that a query was wrong.
+CONNECTION_ERRORS = (
+    OSError,
+    TimeoutError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.InterfaceError,
+    asyncpg.CannotConnectNowError,
+    asyncpg.AdminShutdownError,
+    asyncpg.CrashShutdownError,
+)
+
+
+class ReplicaLost(ConnectionError):
+    """
+    A replica failed partway through a read. It's out of rotation by the time this is
+    raised, and since only reads go to replicas, the read can be retried.
+    """
+
+PRIMARY_LSN = "SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), '0/0')::bigint"
+REPLAY_LSN = "SELECT pg_wal_lsn_diff(pg_last_wal_replay_lsn(), '0/0')::bigint"
+
+
+@dataclass(slots=True)
+class Replica:
+    name: str
+    dsn: str
+    pool: typing.Optional[asyncpg.Pool] = None
+    healthy: bool = False
+    # Monotonic time of the newest primary sample this replica has replayed.
+    synced_at: float = 0.0
+    reads: int = 0
+    errors: int = 0
+
+    def snapshot(self, now: float) -> dict:
+        return {
+            "name": self.name,
+            "healthy": self.healthy,
+            "lag": now - self.synced_at if self.synced_at else None,
+            "reads": self.reads,
+            "errors": self.errors,
+        }
+
+
+class ReplicaSet:
+    def __init__(self):
+        self.replicas: list[Replica] = list()
+        self.max_lag = 5.0
+        self.check_interval = 0.5
+        self.check_timeout = 2.0
+        self.pool_settings: dict = dict()
+        self.init = None
+        # (monotonic time, primary WAL position) from recent checks.
+        self.samples: deque[tuple[float, int]] = deque()
+        self.last_write = 0.0
+        self.primary_reads = 0
+        self.turn = 0
+
+    def configure(self, settings: dict):
+        self.max_lag = settings.get("max_lag", 5.0)
+        self.check_interval = settings.get("check_interval", 0.5)
+        self.check_timeout = settings.get("check_timeout", 2.0)
+        self.pool_settings = {
+            "min_size": settings.get("min_size", 2),
+            "max_size": settings.get("max_size", 10),
+        }
+        self.replicas = [
+            Replica(name=f"replica{i}", dsn=dsn)
+            for i, dsn in enumerate(settings.get("dsns", list()))
+        ]
+        # Enough samples to place any replica that's within max_lag.
+        self.samples = deque(maxlen=int(self.max_lag / self.check_interval) + 2)
+
+    def settle(self) -> float:
+        """
+        How long after a row changes a read of it might still return the old one.
+        """
+        return self.max_lag if self.replicas else 0.0
+
+    def wrote(self):
+        self.last_write = time.monotonic()
+
+    def choose(self) -> typing.Optional[Replica]:
+        if not self.replicas:
+            return None
+        now = time.monotonic()
+        usable = [
+            r
+            for r in self.replicas
+            if r.healthy
+            and r.synced_at >= self.last_write
+            and now - r.synced_at <= self.max_lag
+        ]
+        if not usable:
+            return None
+        self.turn += 1
+        return usable[self.turn % len(usable)]
+
+    def fail(self, replica: Replica, err: Exception):
+        replica.errors += 1
+        if replica.healthy:
+            logger.warning(f"{replica.name} is unavailable: {err!r}")
+        replica.healthy = False
+
+    @contextlib.asynccontextmanager
+    async def acquire(
+        self, primary: bool = False
+    ) -> typing.AsyncIterator[asyncpg.Connection]:
+        """
+        A connection for reads: from a replica if one is usable, otherwise PGPOOL.
+        Raises ReplicaLost if the replica's connection fails while in use.
+
+        With primary, always PGPOOL. choose() only knows about this process's own
+        writes, so a read prompted by another process's write (like a table_changes
+        notification) must use it to be sure of seeing that write.
+        """
+        if not primary and (replica := self.choose()) is not None:
+            try:
+                conn = await replica.pool.acquire(timeout=self.check_timeout)
+            except CONNECTION_ERRORS as err:
+                self.fail(replica, err)
+            else:
+                replica.reads += 1
+                try:
+                    yield conn
+                except CONNECTION_ERRORS as err:
+                    self.fail(replica, err)
+                    raise ReplicaLost(replica.name) from err
+                finally:
+                    await replica.pool.release(conn)
+                return
+        self.primary_reads += 1
+        async with mudforge.PGPOOL.acquire() as conn:
+            yield conn
+
+    async def connect(self, replica: Replica):
+        replica.pool = await asyncpg.create_pool(
+            dsn=replica.dsn, init=self.init, **self.pool_settings
+        )
+        logger.info(f"Connected to {replica.name}.")
+
+    async def check_replica(self, replica: Replica):
+        try:
+            async with asyncio.timeout(self.check_timeout):
+                if replica.pool is None:
+                    await self.connect(replica)
+                replayed = await replica.pool.fetchval(REPLAY_LSN)
+        except CONNECTION_ERRORS as err:
+            self.fail(replica, err)
+            return
+        if replayed is None:
+            # Not in recovery, so it isn't replicating anything.
+            self.fail(replica, RuntimeError("not a standby"))
+            return
+        for sampled_at, position in reversed(self.samples):
+            if position <= replayed:
+                replica.synced_at = max(replica.synced_at, sampled_at)
+                break
+        if not replica.healthy:
+            logger.info(f"{replica.name} is available.")
+        replica.healthy = True
+
+    async def check(self):
+        # Taken before the primary is asked, so that anything committed by now is
+        # covered by the position it reports.
+        sampled_at = time.monotonic()
+        try:
+            async with asyncio.timeout(self.check_timeout):
+                position = await mudforge.PGPOOL.fetchval(PRIMARY_LSN)
+        except CONNECTION_ERRORS as err:
+            logger.warning(f"Could not sample the primary's WAL position: {err!r}")
+            return
+        self.samples.append((sampled_at, position))
+        await asyncio.gather(*(self.check_replica(r) for r in self.replicas))
+
+    async def run(self):
+        if not self.replicas:
+            return
+        while True:
+            await self.check()
+            await asyncio.sleep(self.check_interval)
+
+    def snapshot(self) -> dict[str, typing.Any]:
+        now = time.monotonic()
+        return {
+            "max_lag": self.max_lag,
+            "primary_reads": self.primary_reads,
+            "replicas": [r.snapshot(now) for r in self.replicas],
+        }
+
+
+REPLICAS = ReplicaSet()
@@ -1,52 +1,71 @@
-import typing
 import uuid
 
-from asyncpg import Connection
+from asyncpg import Connection, Record
 from fastapi import HTTPException, status
 
-from .base import transaction, from_pool, stream
+from .base import (
+    transaction,
+    from_pool,
+    keyset,
+    columns,
+    from_record,
+    register_query,
+    coalesce,
+)
+from .cache import cached
 from mudforge.models.users import UserModel
 from mudforge.models.characters import CharacterModel
 
+USER_COLUMNS = columns(UserModel)
 
+GET_USER = register_query(
+    "users.get", f"SELECT {USER_COLUMNS} FROM users WHERE id = $1 LIMIT 1"
+)
+FIND_USER = register_query(
+    "users.find", f"SELECT {USER_COLUMNS} FROM users WHERE email = $1 LIMIT 1"
+)
+# Keyset pages. The first page gets its own query: "$1 IS NULL OR id > $1" would
+# keep a generic plan from using the primary key as a range, so every page would
+# scan from the start.
+LIST_USERS_FIRST = register_query(
+    "users.list_first",
+    f"SELECT {USER_COLUMNS} FROM users ORDER BY id LIMIT $1",
+)
+LIST_USERS_AFTER = register_query(
+    "users.list_after",
+    f"SELECT {USER_COLUMNS} FROM users WHERE id > $1 ORDER BY id LIMIT $2",
+)
+
+
+@cached("users")
+@coalesce
 @from_pool
 async def get_user(conn: Connection, user_id: uuid.UUID) -> UserModel:
-    user_data = await conn.fetchrow(
-        """
-        SELECT *
-        FROM users
-        WHERE id = $1 LIMIT 1
-        """,
-        user_id,
-    )
+    user_data = await conn.fetchrow(GET_USER, user_id)
     if not user_data:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found.",
         )
-    return UserModel(**user_data)
+    return from_record(UserModel, user_data)
 
 
+@coalesce
 @from_pool
 async def find_user(conn: Connection, email: str) -> UserModel:
-    user_data = await conn.fetchrow(
-        """
-        SELECT *
-        FROM users
-        WHERE email = $1 LIMIT 1
-        """,
-        email,
-    )
+    user_data = await conn.fetchrow(FIND_USER, email)
     if not user_data:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found.",
         )
-    return UserModel(**user_data)
+    return from_record(UserModel, user_data)
 
 
-@stream
-async def list_users(conn: Connection) -> typing.AsyncGenerator[UserModel, None]:
-    query = "SELECT * FROM users"
-    async for row in conn.cursor(query):
-        yield UserModel(**row)
+@keyset(UserModel)
+async def list_users(
+    conn: Connection, after: uuid.UUID | None, size: int
+) -> list[Record]:
+    if after is None:
+        return await conn.fetch(LIST_USERS_FIRST, size)
+    return await conn.fetch(LIST_USERS_AFTER, after, size)
@@ -3,6 +3,7 @@ import importlib
 import asyncpg
 import orjson
 import asyncio
+import time
 from loguru import logger
 from lark import Lark
 from pathlib import Path
@@ -11,6 +12,19 @@ from hypercorn import Config
 from hypercorn.asyncio import serve
 from mudforge import Application as OldApplication
 from mudforge.utils import callables_from_module, class_from_module, EventHub
+from mudforge.events.codec import CompactCodec
+from mudforge.db import metrics as db_metrics, cache as db_cache
+from mudforge.db.replicas import REPLICAS
+from mudforge.db.base import QUERIES, prepare_queries
+from mudforge.game import notifications
+from mudforge.game.notifications import ChangeFeed, NotificationDispatcher
+
+# Importing these registers their queries, so they're prepared on every connection.
+import mudforge.db.activity
+import mudforge.db.auth
+import mudforge.db.characters
+import mudforge.db.loginrecords
+import mudforge.db.users
 
 
 def decode_json(data: bytes):
@@ -26,6 +40,9 @@ async def init_connection(conn: asyncpg.Connection):
         schema="pg_catalog",
         format="text",
     )
+    database = mudforge.SETTINGS["GAME"].get("database", dict())
+    if database.get("prepare_queries", True):
+        await prepare_queries(conn)
 
 
 class Application(OldApplication):
@@ -35,11 +52,33 @@ class Application(OldApplication):
         super().__init__()
         self.fastapi_config = None
         self.fastapi_instance = None
+        self.notifications = None
+        self.feed = None
+        # Off when the portal runs the game in-process (game_transport = "asgi").
+        self.serve_http = True
 
     async def setup_asyncpg(self):
+        db_metrics.configure(mudforge.SETTINGS["GAME"].get("db_metrics", dict()))
+        db_cache.CACHE.configure(mudforge.SETTINGS["GAME"].get("db_cache", dict()))
         settings = mudforge.SETTINGS["POSTGRESQL"]
+        # create_pool opens min_size connections and runs init_connection on each
+        # (codecs, then every registered query), all before Hypercorn starts serving.
+        started = time.perf_counter()
         pool = await asyncpg.create_pool(init=init_connection, **settings)
         mudforge.PGPOOL = pool
+        logger.info(
+            f"Database pool warmed up: {pool.get_size()} connections, "
+            f"{len(QUERIES)} queries prepared on each, "
+            f"in {(time.perf_counter() - started) * 1000:.0f}ms"
+        )
+        REPLICAS.configure(mudforge.SETTINGS["GAME"].get("replicas", dict()))
+        REPLICAS.init = init_connection
+        for replica in REPLICAS.replicas:
+            try:
+                await REPLICAS.connect(replica)
+            except Exception as err:
+                # Reads go to the primary until the monitor manages to connect.
+                logger.error(f"Could not connect to {replica.name}: {err!r}")
 
     async def setup_fastapi(self):
         settings = mudforge.SETTINGS
@@ -58,6 +97,19 @@ class Application(OldApplication):
         if Path(tls["key"]).exists():
             self.fastapi_config.keyfile = str(Path(tls["key"]).absolute())
 
+        if unix_socket := networking.get("unix_socket", ""):
+            # Local-only, so TLS would just be overhead. Hypercorn only looks at
+            # insecure_bind when TLS is on; without it, everything in bind is plain.
+            if self.fastapi_config.ssl_enabled:
+                self.fastapi_config.insecure_bind = [f"unix:{unix_socket}"]
+            else:
+                self.fastapi_config.bind.append(f"unix:{unix_socket}")
+
+        # The default response class is left alone on purpose. For routes with a
+        # response_model, FastAPI serializes straight to bytes through pydantic-core,
+        # but only while no custom response class is set; an orjson default would
+        # turn that off. Hot routes return pre-serialized Responses instead
+        # (see rest.utils.conditional_response).
         self.fastapi_instance = FastAPI()
         routers = settings["FASTAPI"]["routers"]
         for k, v in routers.items():
@@ -76,7 +128,12 @@ class Application(OldApplication):
 
     async def setup(self):
         await super().setup()
-        mudforge.EVENT_HUB = EventHub()
+        events = mudforge.SETTINGS["GAME"].get("events", dict())
+        mudforge.EVENT_HUB = EventHub(
+            buffer_size=events.get("buffer_size", 256),
+            buffer_retention=events.get("buffer_retention", 300),
+        )
+        mudforge.EVENT_CODEC = CompactCodec.from_events()
         await self.setup_lark()
         await self.setup_asyncpg()
         await self.setup_fastapi()
@@ -93,44 +150,21 @@ class Application(OldApplication):
             for table in listener.tables:
                 mudforge.LISTENERS_TABLE[table].append(listener)
 
-    async def handle_postgre_notification(self, conn, pid, channel, payload):
-        decoded = orjson.loads(payload)
-        args = [decoded["table"], decoded["id"]]
-
-        if not (listeners := mudforge.LISTENERS_TABLE.get(decoded["table"], [])):
-            return
-
-        match decoded["operation"]:
-            case "UPDATE":
-                for listener in listeners:
-                    await listener.on_update(*args)
-            case "INSERT":
-                for listener in listeners:
-                    await listener.on_insert(*args)
-            case "DELETE":
-                for listener in listeners:
-                    await listener.on_delete(*args)
-
-    async def postgre_listener(self):
-        async with mudforge.PGPOOL.acquire() as conn:
-            await conn.add_listener("table_changes", self.handle_postgre_notification)
-            while True:
-                try:
-                    await asyncio.sleep(10)
-                except asyncio.CancelledError:
-                    break
-
-    async def system_pinger(self):
-        from mudforge.events.system import SystemPing
-
-        try:
-            while True:
-                await mudforge.EVENT_HUB.broadcast(SystemPing())
-                await asyncio.sleep(15)
-        except asyncio.CancelledError:
-            return
+        dispatch = mudforge.SETTINGS["GAME"].get("notifications", dict())
+        self.notifications = NotificationDispatcher(
+            window=dispatch.get("window", 0.05), workers=dispatch.get("workers", 8)
+        )
+        notifications.DISPATCHER = self.notifications
+        self.feed = ChangeFeed(
+            self.notifications, mudforge.SETTINGS["GAME"].get("listen", dict())
+        )
+        notifications.FEED = self.feed
 
     async def start(self):
-        self.task_group.create_task(serve(self.fastapi_instance, self.fastapi_config))
-        self.task_group.create_task(self.postgre_listener())
-        self.task_group.create_task(self.system_pinger())
+        if self.serve_http:
+            self.task_group.create_task(
+                serve(self.fastapi_instance, self.fastapi_config)
+            )
+        self.task_group.create_task(self.notifications.run())
+        self.task_group.create_task(self.feed.run())
+        self.task_group.create_task(REPLICAS.run())
@@ -1,7 +1,25 @@
+import uuid
+
+from fastapi import HTTPException
+
+import mudforge
+from mudforge.db import characters as characters_db, users as users_db
+from mudforge.db.cache import CACHE
+
+
 class TableListener:
     # The tables that this listener cares about.
     tables: list[str] = []
 
+    def on_notify(self, table: str, operation: str, id):
+        """
+        Called for every notification as soon as it arrives, before
+        NotificationDispatcher's window coalesces it. It runs inside the asyncpg
+        callback, so it must be quick and can't await; anything more belongs in
+        on_update and the rest.
+        """
+        pass
+
     async def on_update(self, table: str, id):
         pass
 
@@ -10,3 +28,96 @@ class TableListener:
 
     async def on_delete(self, table: str, id):
         pass
+
+    async def on_resync(self):
+        """
+        Called after the game may have missed notifications, such as when its LISTEN
+        connection had to be reconnected. Anything derived from the tables should be
+        rebuilt or thrown away.
+        """
+        pass
+
+
+class CacheListener(TableListener):
+    """
+    Drops cached rows (see mudforge.db.cache) as table_changes reports them changing.
+    This happens in on_notify, so the dispatcher's window never delays it: lookups such
+    as get_current_user's read admin levels and bans through the cache.
+    """
+
+    tables = ["users", "characters"]
+
+    def on_notify(self, table: str, operation: str, id):
+        CACHE.invalidate(table, id)
+
+    async def on_resync(self):
+        CACHE.clear()
+
+
+class PresenceListener(TableListener):
+    """
+    Keeps EventHub.presence in step with the characters and users tables, so that
+    who lists stay accurate without querying anything.
+
+    Only changes a who list shows reach here: 006_activity_notify.sql keeps
+    last_active_at updates out of table_changes.
+
+    Rows are re-read from the primary, past the cache. The change may have been made
+    by another process, and a replica that hasn't replayed it yet would hand back the
+    old row, which presence would then keep.
+    """
+
+    tables = ["characters", "users"]
+
+    async def refresh(self, table: str, id):
+        hub = mudforge.EVENT_HUB
+        row_id = uuid.UUID(str(id))
+        match table:
+            case "characters":
+                if not (entry := hub.presence.get(row_id, None)):
+                    return
+                try:
+                    character = await characters_db.find_character_id(
+                        row_id, primary=True
+                    )
+                except HTTPException:
+                    hub.presence.pop(row_id, None)
+                    return
+                hub.presence[row_id] = entry.model_copy(
+                    update={"character_name": character.name}
+                )
+            case "users":
+                affected = [
+                    character_id
+                    for character_id, entry in hub.presence.items()
+                    if entry.user_id == row_id
+                ]
+                if not affected:
+                    return
+                try:
+                    user = await users_db.get_user(row_id, primary=True)
+                except HTTPException:
+                    for character_id in affected:
+                        hub.presence.pop(character_id, None)
+                    return
+                update = {
+                    "display_name": user.display_name,
+                    "admin_level": user.admin_level,
+                }
+                for character_id in affected:
+                    if entry := hub.presence.get(character_id, None):
+                        hub.presence[character_id] = entry.model_copy(update=update)
+
+    async def on_update(self, table: str, id):
+        await self.refresh(table, id)
+
+    async def on_delete(self, table: str, id):
+        await self.refresh(table, id)
+
+    async def on_resync(self):
+        hub = mudforge.EVENT_HUB
+        user_ids = {entry.user_id for entry in hub.presence.values()}
+        for character_id in list(hub.presence.keys()):
+            await self.refresh("characters", character_id)
+        for user_id in user_ids:
+            await self.refresh("users", user_id)
@@ -0,0 +1,282 @@
+import asyncio
+import time
+import typing
+
+import asyncpg
+import orjson
+from loguru import logger
+
+import mudforge
+from mudforge.db.metrics import Histogram
+
+
+class NotificationDispatcher:
+    """
+    Delivers table_changes notifications to TableListeners off the asyncpg callback.
+
+    Notifications are collected for window seconds and coalesced per (table, id), so a
+    bulk update that touches a row many times reaches the listeners once. Each batch
+    is then handed to a fixed number of workers. A row's listeners are called in their
+    configured order, but different rows are handled concurrently, and a row that's
+    still being handled waits for the next batch rather than running twice at once.
+
+    Each listener's on_notify is called straight away, uncoalesced, for work that can't
+    wait for the window, such as dropping cached rows.
+    """
+
+    def __init__(self, window: float = 0.05, workers: int = 8):
+        self.window = window
+        self.workers = workers
+        # (table, id) -> (operation, monotonic time first seen)
+        self.pending: dict[tuple[str, str], tuple[str, float]] = dict()
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.running: set[tuple[str, str]] = set()
+        self.wake = asyncio.Event()
+        self.received = 0
+        self.coalesced = 0
+        self.dispatched = 0
+        self.errors = 0
+        self.max_depth = 0
+        self.lag = Histogram()
+
+    def depth(self) -> int:
+        return len(self.pending) + self.queue.qsize()
+
+    def submit(self, table: str, operation: str, id):
+        self.received += 1
+        for listener in mudforge.LISTENERS_TABLE.get(table, []):
+            try:
+                listener.on_notify(table, operation, id)
+            except Exception as err:
+                self.errors += 1
+                logger.exception(err)
+        key = (table, str(id))
+        if previous := self.pending.get(key, None):
+            self.coalesced += 1
+            # A row inserted and then updated in the same window is still new to the
+            # listeners; otherwise the latest operation wins.
+            if not (previous[0] == "INSERT" and operation == "UPDATE"):
+                self.pending[key] = (operation, previous[1])
+        else:
+            self.pending[key] = (operation, time.monotonic())
+        self.max_depth = max(self.max_depth, self.depth())
+        self.wake.set()
+
+    async def collect(self):
+        while True:
+            await self.wake.wait()
+            await asyncio.sleep(self.window)
+            self.wake.clear()
+            ready, self.pending = self.pending, dict()
+            for key, value in ready.items():
+                if key in self.running:
+                    # Still being handled; keep it (and anything newer) for next time.
+                    self.pending.setdefault(key, value)
+                    self.wake.set()
+                    continue
+                self.running.add(key)
+                self.queue.put_nowait((key, value))
+
+    async def work(self):
+        while True:
+            (table, id), (operation, first_seen) = await self.queue.get()
+            self.lag.observe(time.monotonic() - first_seen)
+            try:
+                await self.dispatch(table, operation, id)
+            except Exception as err:
+                self.errors += 1
+                logger.exception(err)
+            finally:
+                self.running.discard((table, id))
+                self.dispatched += 1
+
+    async def dispatch(self, table: str, operation: str, id):
+        for listener in mudforge.LISTENERS_TABLE.get(table, []):
+            match operation:
+                case "UPDATE":
+                    await listener.on_update(table, id)
+                case "INSERT":
+                    await listener.on_insert(table, id)
+                case "DELETE":
+                    await listener.on_delete(table, id)
+
+    async def run(self):
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(self.collect())
+            for _ in range(self.workers):
+                tg.create_task(self.work())
+
+    def snapshot(self) -> dict[str, typing.Any]:
+        return {
+            "received": self.received,
+            "coalesced": self.coalesced,
+            "dispatched": self.dispatched,
+            "errors": self.errors,
+            "depth": self.depth(),
+            "max_depth": self.max_depth,
+            "lag": self.lag.snapshot(),
+        }
+
+
+# create_pool options that asyncpg.connect doesn't take.
+POOL_ONLY = (
+    "min_size",
+    "max_size",
+    "max_queries",
+    "max_inactive_connection_lifetime",
+    "setup",
+    "init",
+    "reset",
+)
+
+
+class ChangeFeed:
+    """
+    Keeps a dedicated connection, outside of PGPOOL, LISTENing to table_changes and
+    feeding a NotificationDispatcher.
+
+    The connection is checked with SELECT 1 every health_interval seconds and replaced
+    (with capped exponential backoff) if that fails or the server closes it. Anything
+    sent while it was down is lost to LISTEN, so after a reconnect the feed either
+    replays the change_outbox table (see 004_change_outbox.sql), or, if the outbox is
+    off or no longer covers the gap, calls on_resync() on every listener.
+    """
+
+    def __init__(self, dispatcher: NotificationDispatcher, settings: dict):
+        self.dispatcher = dispatcher
+        self.health_interval = settings.get("health_interval", 10.0)
+        self.health_timeout = settings.get("health_timeout", 5.0)
+        self.reconnect_max_delay = settings.get("reconnect_max_delay", 30.0)
+        self.outbox = bool(settings.get("outbox", False))
+        self.outbox_retention = settings.get("outbox_retention", 3600)
+        self.outbox_replay_margin = settings.get("outbox_replay_margin", 1000)
+        # Whether 004_change_outbox.sql is applied, as of the last connect.
+        self.has_outbox = False
+        # The newest outbox id handed to the dispatcher.
+        self.last_outbox_id: typing.Optional[int] = None
+        self.connects = 0
+        self.disconnects = 0
+        self.replayed = 0
+        self.resyncs = 0
+
+    def connect_kwargs(self) -> dict:
+        settings = mudforge.SETTINGS["POSTGRESQL"]
+        return {k: v for k, v in settings.items() if k not in POOL_ONLY}
+
+    async def handle_notification(self, conn, pid, channel, payload):
+        decoded = orjson.loads(payload)
+        if (outbox_id := decoded.get("outbox_id", None)) is not None:
+            self.last_outbox_id = max(self.last_outbox_id or 0, outbox_id)
+        if decoded["table"] not in mudforge.LISTENERS_TABLE:
+            return
+        self.dispatcher.submit(decoded["table"], decoded["operation"], decoded["id"])
+
+    async def resync(self):
+        self.resyncs += 1
+        logger.warning("table_changes may have been missed; resyncing listeners.")
+        for listener in mudforge.LISTENERS.values():
+            try:
+                await listener.on_resync()
+            except Exception as err:
+                logger.exception(err)
+
+    async def replay(self, conn) -> bool:
+        """
+        Submits everything in the outbox newer than the last id seen. Returns False if
+        the outbox can't cover the gap, because rows since then have been pruned.
+
+        Ids are handed out as rows are inserted, not as they commit, so a change can
+        commit after one with a higher id has already been seen. The replay therefore
+        starts outbox_replay_margin ids back; listeners don't mind a repeat.
+        """
+        if not (self.outbox and self.has_outbox) or self.last_outbox_id is None:
+            return False
+        oldest = await conn.fetchval("SELECT min(id) FROM change_outbox")
+        if oldest is not None and oldest > self.last_outbox_id + 1:
+            return False
+        rows = await conn.fetch(
+            "SELECT id, table_name, operation, row_id FROM change_outbox "
+            "WHERE id > $1 ORDER BY id",
+            self.last_outbox_id - self.outbox_replay_margin,
+        )
+        for row in rows:
+            self.last_outbox_id = max(self.last_outbox_id, row["id"])
+            if row["table_name"] in mudforge.LISTENERS_TABLE:
+                self.dispatcher.submit(row["table_name"], row["operation"], row["row_id"])
+        self.replayed += len(rows)
+        if rows:
+            logger.info(f"Replayed {len(rows)} table changes from the outbox.")
+        return True
+
+    async def prune(self, conn):
+        await conn.execute(
+            "DELETE FROM change_outbox "
+            "WHERE created_at < CURRENT_TIMESTAMP - make_interval(secs => $1)",
+            float(self.outbox_retention),
+        )
+
+    async def listen(self, conn):
+        lost = asyncio.Event()
+        conn.add_termination_listener(lambda c: lost.set())
+        await conn.add_listener("table_changes", self.handle_notification)
+        # With 004 applied, every change lands in the outbox, so it's pruned whether or
+        # not this game replays from it.
+        self.has_outbox = await conn.fetchval(
+            "SELECT to_regclass('change_outbox') IS NOT NULL"
+        )
+        if self.connects:
+            if not await self.replay(conn):
+                await self.resync()
+        elif self.outbox and self.has_outbox:
+            self.last_outbox_id = await conn.fetchval(
+                "SELECT coalesce(max(id), 0) FROM change_outbox"
+            )
+        self.connects += 1
+        logger.info("Listening for table_changes.")
+        while not lost.is_set():
+            try:
+                async with asyncio.timeout(self.health_interval):
+                    await lost.wait()
+            except TimeoutError:
+                async with asyncio.timeout(self.health_timeout):
+                    await conn.fetchval("SELECT 1")
+                    if self.has_outbox:
+                        await self.prune(conn)
+
+    async def run(self):
+        delay = 1.0
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(**self.connect_kwargs())
+                delay = 1.0
+                await self.listen(conn)
+                logger.warning("The table_changes connection was closed.")
+            except (
+                OSError,
+                TimeoutError,
+                asyncpg.PostgresError,
+                asyncpg.InterfaceError,
+            ) as err:
+                logger.warning(f"The table_changes connection failed: {err!r}")
+            finally:
+                if conn is not None:
+                    conn.terminate()
+            # Until we're reconnected, listeners may be working from stale rows.
+            self.disconnects += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.reconnect_max_delay)
+
+    def snapshot(self) -> dict[str, typing.Any]:
+        return {
+            "connects": self.connects,
+            "disconnects": self.disconnects,
+            "replayed": self.replayed,
+            "resyncs": self.resyncs,
+            "last_outbox_id": self.last_outbox_id,
+        }
+
+
+# The game's dispatcher and feed, once it has set them up.
+DISPATCHER: typing.Optional[NotificationDispatcher] = None
+FEED: typing.Optional[ChangeFeed] = None
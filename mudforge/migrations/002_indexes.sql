@@ -0,0 +1,29 @@
+BEGIN TRANSACTION;
+
+-- Indexes for the queries in mudforge/db/ that the primary keys and unique
+-- constraints in 001_initial.sql don't already cover.
+--
+-- These build inside a transaction, which locks each table against writes while it
+-- runs. On a large live database, run each statement on its own as
+-- CREATE INDEX CONCURRENTLY instead.
+
+-- characters.list_user: WHERE user_id = $1 AND deleted_at IS NULL
+CREATE INDEX IF NOT EXISTS characters_user_id_active
+    ON characters (user_id, id) WHERE deleted_at IS NULL;
+
+-- fk_user on characters, checked whenever a user is deleted or their id changes.
+-- The partial index above can't serve it, since it has to see deleted characters too.
+CREATE INDEX IF NOT EXISTS characters_user_id ON characters (user_id);
+
+-- A user's login history, newest first, and ON DELETE CASCADE from users.
+CREATE INDEX IF NOT EXISTS loginrecords_user_id_created_at
+    ON loginrecords (user_id, created_at);
+
+-- ON DELETE CASCADE from users.
+CREATE INDEX IF NOT EXISTS passwords_user_id ON passwords (user_id);
+
+-- fk_current_password's ON DELETE SET NULL, checked whenever a password row goes.
+CREATE INDEX IF NOT EXISTS users_current_password_id
+    ON users (current_password_id) WHERE current_password_id IS NOT NULL;
+
+COMMIT;
@@ -0,0 +1,123 @@
+BEGIN TRANSACTION;
+
+-- Turns loginrecords into a table range-partitioned by month on created_at.
+--
+-- Time-range audit queries only touch the months they ask about, and expired months
+-- are dropped (or detached for archiving) whole, instead of being deleted row by row.
+-- Partitions are kept ahead of time by ensure_loginrecords_partitions() and expired by
+-- expire_loginrecords_partitions(); the game runs both periodically
+-- (see mudforge.db.loginrecords.LoginRecordMaintenance).
+
+-- Creates the monthly partitions from the month containing start_at through
+-- months_ahead months past the current one. Returns how many it created.
+CREATE OR REPLACE FUNCTION ensure_loginrecords_partitions(
+    start_at TIMESTAMPTZ, months_ahead INT
+) RETURNS INT AS $$
+DECLARE
+    month_start TIMESTAMPTZ := date_trunc('month', start_at);
+    last_month  TIMESTAMPTZ := date_trunc('month', CURRENT_TIMESTAMP)
+                               + make_interval(months => months_ahead);
+    part_name   TEXT;
+    created     INT := 0;
+BEGIN
+    WHILE month_start <= last_month LOOP
+        part_name := 'loginrecords_' || to_char(month_start, '"y"YYYY"m"MM');
+        IF to_regclass(part_name) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF loginrecords FOR VALUES FROM (%L) TO (%L)',
+                part_name, month_start, month_start + INTERVAL '1 month'
+            );
+            created := created + 1;
+        END IF;
+        month_start := month_start + INTERVAL '1 month';
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Removes monthly partitions that ended more than retention ago. With archive, they're
+-- detached and left as standalone tables (to be dumped and dropped by hand);
+-- otherwise they're dropped. Returns the affected tables' names.
+CREATE OR REPLACE FUNCTION expire_loginrecords_partitions(
+    retention INTERVAL, archive BOOLEAN DEFAULT FALSE
+) RETURNS SETOF TEXT AS $$
+DECLARE
+    child TEXT;
+    month_start TIMESTAMPTZ;
+BEGIN
+    FOR child IN
+        SELECT c.relname
+        FROM pg_inherits i
+                 JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'loginrecords'::regclass
+          AND c.relname ~ '^loginrecords_y\d{4}m\d{2}$'
+        ORDER BY c.relname
+    LOOP
+        month_start := to_timestamp(substring(child FROM 'y(\d{4}m\d{2})$'), 'YYYY"m"MM');
+        IF month_start + INTERVAL '1 month' <= CURRENT_TIMESTAMP - retention THEN
+            IF archive THEN
+                EXECUTE format('ALTER TABLE loginrecords DETACH PARTITION %I', child);
+            ELSE
+                EXECUTE format('DROP TABLE %I', child);
+            END IF;
+            RETURN NEXT child;
+        END IF;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP VIEW loginrecords_with_user;
+
+ALTER TABLE loginrecords RENAME TO loginrecords_unpartitioned;
+ALTER INDEX loginrecords_pkey RENAME TO loginrecords_unpartitioned_pkey;
+-- Keep the id sequence when the old table goes.
+ALTER SEQUENCE loginrecords_id_seq OWNED BY NONE;
+
+CREATE TABLE loginrecords
+(
+    id         BIGINT      NOT NULL DEFAULT nextval('loginrecords_id_seq'),
+    user_id    UUID        NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    ip_address INET        NOT NULL,
+    user_agent TEXT        NOT NULL,
+    success    BOOLEAN     NOT NULL,
+    -- A partitioned table's primary key must include the partition key.
+    PRIMARY KEY (id, created_at),
+    CONSTRAINT fk_user
+        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+) PARTITION BY RANGE (created_at);
+
+-- Catches anything outside the monthly partitions, like a badly skewed clock.
+CREATE TABLE loginrecords_default PARTITION OF loginrecords DEFAULT;
+
+SELECT ensure_loginrecords_partitions(
+    COALESCE((SELECT min(created_at) FROM loginrecords_unpartitioned), CURRENT_TIMESTAMP),
+    3
+);
+
+INSERT INTO loginrecords (id, user_id, created_at, ip_address, user_agent, success)
+SELECT id, user_id, created_at, ip_address, user_agent, success
+FROM loginrecords_unpartitioned;
+
+DROP TABLE loginrecords_unpartitioned;
+ALTER SEQUENCE loginrecords_id_seq OWNED BY loginrecords.id;
+
+-- Rows arrive in created_at order, so a BRIN index covers time ranges at a fraction
+-- of a btree's size.
+CREATE INDEX loginrecords_created_at_brin ON loginrecords USING BRIN (created_at);
+-- Replaces the index from 002_indexes.sql, which went with the old table.
+CREATE INDEX loginrecords_user_id_created_at ON loginrecords (user_id, created_at);
+
+CREATE VIEW loginrecords_with_user AS
+SELECT l.id,
+       l.user_id,
+       l.created_at,
+       l.ip_address,
+       l.user_agent,
+       l.success,
+       u.email,
+       u.display_name
+FROM loginrecords l
+         JOIN users u ON l.user_id = u.id;
+
+COMMIT;
@@ -0,0 +1,39 @@
+BEGIN TRANSACTION;
+
+-- Every table change is also written here, so a game that lost its LISTEN connection
+-- can replay what it missed instead of resyncing everything. Only read with
+-- [game.listen] outbox = true, but the game prunes rows older than outbox_retention
+-- whenever this table exists.
+CREATE TABLE change_outbox
+(
+    id         BIGSERIAL PRIMARY KEY,
+    table_name TEXT        NOT NULL,
+    operation  TEXT        NOT NULL,
+    row_id     TEXT        NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Rows arrive in created_at order, which is what BRIN is for.
+CREATE INDEX change_outbox_created_at ON change_outbox USING BRIN (created_at);
+
+CREATE OR REPLACE FUNCTION notify_table_change() RETURNS trigger AS $$
+DECLARE
+    entry_id BIGINT;
+BEGIN
+    INSERT INTO change_outbox (table_name, operation, row_id)
+    VALUES (TG_TABLE_NAME, TG_OP, COALESCE(NEW.id, OLD.id)::text)
+    RETURNING id INTO entry_id;
+    PERFORM pg_notify(
+        'table_changes',
+        json_build_object(
+            'table', TG_TABLE_NAME,
+            'operation', TG_OP,
+            'id', COALESCE(NEW.id, OLD.id),
+            'outbox_id', entry_id
+        )::text
+    );
+RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMIT;
@@ -0,0 +1,17 @@
+BEGIN TRANSACTION;
+
+-- For characters.search (see mudforge/db/characters.py). Names are CITEXT, so both
+-- indexes are on lower(name::text), which is what the query compares against.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Prefix matches, as the byte-wise range lower(name::text) ~>=~ prefix AND
+-- ~<~ prefix || chr(1114111). text_pattern_ops provides those operators, and a range
+-- keeps the index usable when the prefix is a parameter, which LIKE doesn't.
+CREATE INDEX IF NOT EXISTS characters_name_prefix
+    ON characters (lower(name::text) text_pattern_ops) WHERE deleted_at IS NULL;
+
+-- Fuzzy matches: lower(name::text) % 'term', ranked by similarity().
+CREATE INDEX IF NOT EXISTS characters_name_trgm
+    ON characters USING GIN (lower(name::text) gin_trgm_ops) WHERE deleted_at IS NULL;
+
+COMMIT;
@@ -0,0 +1,21 @@
+BEGIN TRANSACTION;
+
+-- ActivityTracker (mudforge/db/activity.py) updates last_active_at for every online
+-- character on every flush. Nothing listening to table_changes cares about that
+-- column, so an update that changes nothing else no longer notifies; otherwise each
+-- flush would mean a notification, an outbox row and a cache invalidation per
+-- character.
+DROP TRIGGER IF EXISTS characters_trigger ON characters;
+
+CREATE TRIGGER characters_trigger
+    AFTER INSERT OR DELETE ON characters
+    FOR EACH ROW EXECUTE FUNCTION notify_table_change();
+
+CREATE TRIGGER characters_update_trigger
+    AFTER UPDATE ON characters
+    FOR EACH ROW
+    WHEN ((to_jsonb(OLD) - 'last_active_at')
+          IS DISTINCT FROM (to_jsonb(NEW) - 'last_active_at'))
+    EXECUTE FUNCTION notify_table_change();
+
+COMMIT;
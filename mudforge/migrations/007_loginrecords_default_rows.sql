@@ -0,0 +1,49 @@
+BEGIN TRANSACTION;
+
+-- Replaces ensure_loginrecords_partitions() from 003_partition_loginrecords.sql.
+--
+-- Rows for a month that has no partition yet land in loginrecords_default (a skewed
+-- clock, or maintenance that hasn't run for a while). Once any are there, CREATE TABLE
+-- ... PARTITION OF for that month fails, since the default partition would then hold
+-- rows outside its range, and maintenance could never catch up. Each month is now
+-- created as a standalone table, the default partition's rows for it are moved in,
+-- and only then is it attached.
+CREATE OR REPLACE FUNCTION ensure_loginrecords_partitions(
+    start_at TIMESTAMPTZ, months_ahead INT
+) RETURNS INT AS $$
+DECLARE
+    month_start TIMESTAMPTZ := date_trunc('month', start_at);
+    last_month  TIMESTAMPTZ := date_trunc('month', CURRENT_TIMESTAMP)
+                               + make_interval(months => months_ahead);
+    month_end   TIMESTAMPTZ;
+    part_name   TEXT;
+    created     INT := 0;
+BEGIN
+    WHILE month_start <= last_month LOOP
+        month_end := month_start + INTERVAL '1 month';
+        part_name := 'loginrecords_' || to_char(month_start, '"y"YYYY"m"MM');
+        IF to_regclass(part_name) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I (LIKE loginrecords INCLUDING DEFAULTS)', part_name
+            );
+            IF to_regclass('loginrecords_default') IS NOT NULL THEN
+                EXECUTE format(
+                    'WITH moved AS (DELETE FROM loginrecords_default'
+                    ' WHERE created_at >= %L AND created_at < %L RETURNING *)'
+                    ' INSERT INTO %I SELECT * FROM moved',
+                    month_start, month_end, part_name
+                );
+            END IF;
+            EXECUTE format(
+                'ALTER TABLE loginrecords ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                part_name, month_start, month_end
+            );
+            created := created + 1;
+        END IF;
+        month_start := month_end;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMIT;
@@ -5,6 +5,9 @@ import uuid
 
 from datetime import datetime, timedelta, timezone
 
+from .users import UserModel
+from .characters import CharacterModel
+
 
 class UserLogin(pydantic.BaseModel):
     email: pydantic.EmailStr
@@ -61,3 +64,14 @@ class TokenResponse(pydantic.BaseModel):
 
 class RefreshTokenModel(pydantic.BaseModel):
     refresh_token: str
+
+
+class SessionBootstrap(pydantic.BaseModel):
+    """
+    Everything the portal needs to go from the login screen to character select
+    in a single round-trip.
+    """
+
+    token: TokenResponse
+    user: UserModel
+    characters: list[CharacterModel]
@@ -19,5 +19,28 @@ class ActiveAs(pydantic.BaseModel):
     user: UserModel
     character: CharacterModel
 
+
+class Presence(pydantic.BaseModel):
+    """
+    What a who list shows of an online character. Unlike ActiveAs, it carries nothing
+    private, such as the user's email.
+    """
+
+    character_id: uuid.UUID
+    character_name: str
+    user_id: uuid.UUID
+    display_name: Optional[str]
+    admin_level: int
+
+    @classmethod
+    def from_active(cls, active: ActiveAs) -> "Presence":
+        return cls(
+            character_id=active.character.id,
+            character_name=active.character.name,
+            user_id=active.user.id,
+            display_name=active.user.display_name,
+            admin_level=active.user.admin_level,
+        )
+
 class CharacterCreate(pydantic.BaseModel):
     name: str
\ No newline at end of file
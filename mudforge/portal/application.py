@@ -5,7 +5,7 @@ import traceback
 
 import mudforge
 from mudforge import Application as _Application
-from mudforge.utils import callables_from_module
+from mudforge.utils import callables_from_module, class_from_module
 from loguru import logger
 
 
@@ -16,6 +16,8 @@ class Application(_Application):
         super().__init__()
         self.game_sessions = dict()
         self.resolver = None
+        # Only used in all-in-one mode.
+        self.game = None
 
         loop = asyncio.get_event_loop()
         if sys.platform != "win32":
@@ -24,6 +26,15 @@ class Application(_Application):
     async def setup(self):
         await super().setup()
 
+        if mudforge.SETTINGS["PORTAL"]["networking"].get("game_transport") == "asgi":
+            game_class = class_from_module(
+                mudforge.SETTINGS["GAME"]["classes"]["application"]
+            )
+            self.game = game_class()
+            # Requests reach it through ASGITransport, not a socket.
+            self.game.serve_http = False
+            await self.game.setup()
+
         for k, v in mudforge.SETTINGS["PORTAL"]["commands"].items():
             for name, command in callables_from_module(v).items():
                 mudforge.COMMANDS[command.name] = command
@@ -39,3 +50,12 @@ class Application(_Application):
             logger.error(err)
         finally:
             del self.game_sessions[protocol.session_name]
+            if link := protocol.get_link():
+                await link.close_session(protocol)
+
+    async def start(self):
+        if self.game:
+            self.game.task_group = self.task_group
+            # The game's own services (login records, activity, ...) run here too.
+            self.game.start_services(self.task_group)
+            await self.game.start()
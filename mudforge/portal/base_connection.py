@@ -1,22 +1,34 @@
 import mudforge
 import asyncio
+import functools
 import jwt
+import pydantic
+import orjson
 import typing
 import time
 from datetime import datetime
-from httpx import AsyncClient, HTTPStatusError, Limits
+from httpx import (
+    AsyncClient,
+    AsyncHTTPTransport,
+    ASGITransport,
+    HTTPStatusError,
+    Limits,
+)
 from loguru import logger
 from rich.console import Console
 from rich.markup import MarkupError, escape
 from rich.table import Table
 from rich.box import ASCII2
-from httpx_sse import aconnect_sse
+from httpx_sse import aconnect_sse, ServerSentEvent
 import re
 from rich.color import ColorType
-from mudforge.models.characters import ActiveAs
-from mudforge.models.auth import TokenResponse
+from mudforge.models.characters import ActiveAs, CharacterModel, Presence
+from mudforge.models.users import UserModel
+from mudforge.models.auth import TokenResponse, SessionBootstrap
+from mudforge.events.codec import CompactCodec
 from aiomudtelnet import MudClientCapabilities
 
+from collections import OrderedDict
 from dataclasses import dataclass, field
 
 _re_event = re.compile(r"event: (.+)\ndata: (.+)\n\n", re.MULTILINE)
@@ -49,6 +61,47 @@ class ClientGMCP:
     data: dict
 
 
+class ResponseCache:
+    """
+    A small LRU of ETagged GET responses, used to make conditional requests to the game.
+
+    It lives on a connection rather than being shared, since what a response contains
+    depends on who is asking. Responses are kept as api_call returned them, validated
+    models included, so a 304 costs neither the body nor its decoding.
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self.entries: OrderedDict[tuple, tuple[str, typing.Any, int]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    @staticmethod
+    def make_key(path: str, query: dict | None, model: typing.Any = None) -> tuple:
+        query = tuple(sorted((k, str(v)) for k, v in (query or dict()).items()))
+        return path, query, model
+
+    def get(self, key: tuple) -> typing.Optional[tuple[str, typing.Any, int]]:
+        if (entry := self.entries.get(key, None)) is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def store(self, key: tuple, etag: str, data: typing.Any, size: int):
+        self.entries[key] = (etag, data, size)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+
+@functools.cache
+def type_adapter(model: typing.Any) -> pydantic.TypeAdapter:
+    return pydantic.TypeAdapter(model)
+
+
 def color_num_to_rich(color_num: int) -> ColorType:
     match color_num:
         case 0:
@@ -92,6 +145,12 @@ class BaseConnection:
         self.payload: dict[str, "Any"] = dict()
         self.last_active_at = datetime.now()
         self.refresh_token = None
+        # Filled in by a session bootstrap so that parsers don't need to refetch them.
+        self.user: typing.Optional[UserModel] = None
+        self.characters: typing.Optional[list[CharacterModel]] = None
+        self.response_cache = ResponseCache()
+        self.api_calls = 0
+        self.api_seconds = 0.0
         self.shutdown_event = asyncio.Event()
         self.shutdown_cause = None
 
@@ -153,6 +212,17 @@ class BaseConnection:
             logger.info(
                 f"Connection {self.session_name} shutting down: {self.shutdown_cause}"
             )
+            cache = self.response_cache
+            logger.debug(
+                f"Connection {self.session_name} response cache: {cache.hits} hits, "
+                f"{cache.misses} misses, {cache.bytes_saved} bytes saved"
+            )
+            if self.api_calls:
+                average = self.api_seconds / self.api_calls * 1000
+                logger.debug(
+                    f"Connection {self.session_name} made {self.api_calls} API calls, "
+                    f"averaging {average:.3f}ms"
+                )
             raise asyncio.CancelledError()
 
     color_types = {
@@ -270,11 +340,37 @@ class BaseConnection:
         if not self.capabilities.mssp:
             return
 
+    def get_link(self):
+        """
+        Returns the game link service if it's enabled and currently connected.
+        """
+        if (link := mudforge.SERVICES.get("link", None)) is None:
+            return None
+        if link.is_valid() and link.is_connected():
+            return link
+        return None
+
     def create_client(self):
+        networking = mudforge.SETTINGS["PORTAL"]["networking"]
+        limits = Limits(max_connections=10, max_keepalive_connections=10)
+        match networking.get("game_transport", "tcp"):
+            case "unix":
+                transport = AsyncHTTPTransport(
+                    uds=mudforge.SETTINGS["GAME"]["networking"]["unix_socket"],
+                    limits=limits,
+                )
+                return AsyncClient(
+                    base_url="http://game", transport=transport, follow_redirects=True
+                )
+            case "asgi":
+                transport = ASGITransport(app=mudforge.APP.game.fastapi_instance)
+                return AsyncClient(
+                    base_url="http://game", transport=transport, follow_redirects=True
+                )
         return AsyncClient(
-            base_url=mudforge.SETTINGS["PORTAL"]["networking"]["game_url"],
+            base_url=networking["game_url"],
             http2=True,
-            limits=Limits(max_connections=10, max_keepalive_connections=10),
+            limits=limits,
             verify=False,
             follow_redirects=True,
         )
@@ -297,6 +393,11 @@ class BaseConnection:
                     logger.error(e)
 
     async def handle_token(self, token: TokenResponse):
+        if (self.payload or dict()).get("sub", None) != jwt.decode(
+            token.access_token, options={"verify_signature": False}
+        ).get("sub", None):
+            # cached responses were fetched on behalf of someone else.
+            self.response_cache.clear()
         self.jwt = token.access_token
         self.payload = jwt.decode(self.jwt, options={"verify_signature": False})
         self.refresh_token = token.refresh_token
@@ -308,6 +409,11 @@ class BaseConnection:
         up = parser_class()
         await self.push_parser(up)
 
+    async def handle_bootstrap(self, bootstrap: SessionBootstrap):
+        self.user = bootstrap.user
+        self.characters = bootstrap.characters
+        await self.handle_login(bootstrap.token)
+
     async def run_refresher(self):
         while True:
             try:
@@ -360,7 +466,8 @@ class BaseConnection:
         json: dict = None,
         data: dict = None,
         headers: dict[str, str] = None,
-    ) -> dict:
+        model: typing.Any = None,
+    ) -> typing.Any:
         """
         Generic method to call the game server's REST API.
 
@@ -368,12 +475,62 @@ class BaseConnection:
         :param path: The endpoint path (e.g., '/boards')
         :param query: Dictionary of query parameters to include in the URL.
         :param json: JSON serializable body (if needed).
-        :return: The parsed JSON response.
+        :param model: What to validate the response into, e.g. UserModel or
+            list[CharacterModel].
+        :return: The parsed JSON response, or the validated model if one was given.
         :raises HTTPStatusError: For non-200 responses.
+
+        GET responses carrying an ETag are remembered, and later GETs for the same
+        path are made conditional. A 304 reuses the cached data (or model), so treat
+        what's returned as read-only.
         """
+        started = time.perf_counter()
+        try:
+            return await self._api_call(
+                method,
+                path,
+                query=query,
+                json=json,
+                data=data,
+                headers=headers,
+                model=model,
+            )
+        finally:
+            self.api_calls += 1
+            self.api_seconds += time.perf_counter() - started
+
+    async def _api_call(
+        self,
+        method: str,
+        path: str,
+        *,
+        query: dict = None,
+        json: dict = None,
+        data: dict = None,
+        headers: dict[str, str] = None,
+        model: typing.Any = None,
+    ) -> typing.Any:
         use_headers = self.get_headers()
         if headers:
             use_headers.update(headers)
+        if link := self.get_link():
+            result = await link.call(
+                self,
+                method,
+                path,
+                query=query,
+                json=json,
+                data=data,
+                headers=use_headers,
+            )
+            if model is None:
+                return result
+            return type_adapter(model).validate_python(result)
+        cached = None
+        if method.upper() == "GET":
+            cache_key = self.response_cache.make_key(path, query, model)
+            if cached := self.response_cache.get(cache_key):
+                use_headers["If-None-Match"] = cached[0]
         try:
             response = await self.client.request(
                 method,
@@ -383,9 +540,22 @@ class BaseConnection:
                 data=data,
                 headers=use_headers,
             )
+            if cached and response.status_code == 304:
+                self.response_cache.hits += 1
+                self.response_cache.bytes_saved += cached[2]
+                return cached[1]
             # Raise an exception if the status code indicates an error.
             response.raise_for_status()
-            return response.json()
+            if model is None:
+                decoded = response.json()
+            else:
+                decoded = type_adapter(model).validate_json(response.content)
+            if method.upper() == "GET" and (etag := response.headers.get("ETag")):
+                self.response_cache.misses += 1
+                self.response_cache.store(
+                    cache_key, etag, decoded, len(response.content)
+                )
+            return decoded
         except HTTPStatusError as exc:
             logger.error(
                 f"HTTP error on {method} {path}: {exc.response.status_code} {exc.response.text}"
@@ -393,7 +563,7 @@ class BaseConnection:
             # Optionally, handle the error (for example, re-raise or return a default value)
             raise
 
-    async def api_stream(
+    async def api_sse(
         self,
         method: str,
         path: str,
@@ -402,11 +572,10 @@ class BaseConnection:
         json: dict = None,
         data: dict = None,
         headers: dict[str, str] = None,
-    ) -> typing.AsyncGenerator[tuple[str, dict], None]:
+    ) -> typing.AsyncGenerator[ServerSentEvent, None]:
         """
-        Opens a streaming request to the given endpoint and yields chunks of text.
-        For Server-Sent Events (SSE), you'll typically want to parse these chunks
-        line-by-line and accumulate complete events.
+        Opens a Server-Sent Events stream to the given endpoint and yields each
+        ServerSentEvent as it arrives.
         """
         use_headers = self.get_headers()
         if headers:
@@ -423,11 +592,133 @@ class BaseConnection:
                 timeout=None,
             ) as event_source:
                 # Raise an exception for non-2xx status codes.
+                event_source.response.raise_for_status()
                 async for event in event_source.aiter_sse():
-                    yield event.event, event.json()
+                    yield event
         except HTTPStatusError as exc:
             # Log or handle errors as needed
-            logger.error(
-                f"HTTP error: {exc.response.status_code} - {exc.response.text}"
-            )
+            logger.error(f"HTTP error: {exc.response.status_code}")
             raise
+
+    async def api_stream(
+        self,
+        method: str,
+        path: str,
+        *,
+        query: dict = None,
+        json: dict = None,
+        data: dict = None,
+        headers: dict[str, str] = None,
+    ) -> typing.AsyncGenerator[tuple[str, dict], None]:
+        """
+        Like api_sse, but yields (event_name, event_data) with the data decoded from JSON.
+        """
+        async for event in self.api_sse(
+            method, path, query=query, json=json, data=data, headers=headers
+        ):
+            yield event.event, event.json()
+
+    def decode_event(self, event_name: str, event_data: str | bytes):
+        """
+        Builds an event from its class name and JSON. Returns None for unknown events.
+        """
+        if event_class := mudforge.EVENTS.get(event_name, None):
+            return event_class.model_validate_json(event_data)
+        logger.error(f"Unknown event: {event_name}")
+        return None
+
+    def decode_compact(self, codec: CompactCodec, type_id: int, values):
+        if (event := codec.decode_values(type_id, values)) is None:
+            logger.error(f"Unknown event type: {type_id}")
+        return event
+
+    async def get_event_codec(self, refresh: bool = False) -> typing.Optional[CompactCodec]:
+        """
+        Returns the negotiated compact event codec, or None if the portal is configured
+        to receive events as JSON.
+        """
+        if mudforge.SETTINGS["PORTAL"]["networking"].get("event_codec") != "compact":
+            return None
+        if refresh or mudforge.EVENT_CODEC is None:
+            table = await self.api_call("GET", "/system/events")
+            mudforge.EVENT_CODEC = CompactCodec.from_table(table)
+        return mudforge.EVENT_CODEC
+
+    async def character_events(
+        self,
+        character_id,
+        last_event_id: typing.Optional[str] = None,
+        events: typing.Optional[typing.Iterable[str]] = None,
+    ) -> typing.AsyncGenerator[tuple[str, "EventBase"], None]:
+        """
+        Yields (event_id, event) for the given character, over the game link if there is
+        one, otherwise over SSE. Events this process doesn't recognize are skipped.
+
+        If last_event_id is given, the game first replays whatever it still has buffered
+        after that event. If events is given, the game only sends those event classes.
+        """
+        if mudforge.APP.game:
+            # ASGITransport buffers whole responses, so SSE can't work through it.
+            # We share a process with the game, though, so just use its EventHub,
+            # which hands us the event objects themselves; nothing is serialized.
+            # This verifies that we control the character.
+            acting = await self.api_call(
+                "GET", f"/characters/{character_id}/active", model=ActiveAs
+            )
+            queue = mudforge.EVENT_HUB.subscribe(
+                character_id,
+                last_event_id,
+                events,
+                presence=Presence.from_active(acting),
+            )
+            try:
+                while (entry := await queue.get()) is not None:
+                    yield entry
+            finally:
+                mudforge.EVENT_HUB.unsubscribe(character_id, queue)
+            return
+
+        for attempt in range(2):
+            # A 409 means the game's event table changed (it restarted with different
+            # events), so renegotiate once.
+            codec = await self.get_event_codec(refresh=bool(attempt))
+            try:
+                if link := self.get_link():
+                    stream = link.subscribe(
+                        self, character_id, last_event_id, events, codec
+                    )
+                    async for frame in stream:
+                        if codec:
+                            event = self.decode_compact(
+                                codec, frame["type"], frame["values"]
+                            )
+                        else:
+                            event = self.decode_event(
+                                frame["event"], orjson.dumps(frame["data"])
+                            )
+                        if event:
+                            yield frame["id"], event
+                    return
+
+                headers = {"Last-Event-ID": last_event_id} if last_event_id else None
+                query = {"events": list(events)} if events else dict()
+                if codec:
+                    query.update({"codec": "compact", "codec_version": codec.version})
+                async for sse in self.api_sse(
+                    "GET",
+                    f"/characters/{character_id}/events",
+                    query=query,
+                    headers=headers,
+                ):
+                    if codec:
+                        event = self.decode_compact(
+                            codec, int(sse.event), orjson.loads(sse.data)
+                        )
+                    else:
+                        event = self.decode_event(sse.event, sse.data)
+                    if event:
+                        yield sse.id, event
+                return
+            except HTTPStatusError as e:
+                if not codec or attempt or e.response.status_code != 409:
+                    raise
@@ -0,0 +1,219 @@
+import asyncio
+import contextlib
+import itertools
+import ssl
+import typing
+
+import httpx
+import orjson
+from loguru import logger
+from websockets.asyncio.client import connect
+from websockets.exceptions import ConnectionClosed
+
+import mudforge
+from mudforge import Service
+
+
+class LinkError(ConnectionError):
+    pass
+
+
+class LinkService(Service):
+    """
+    Holds the portal's end of the multiplexed link to the game (see mudforge.rest.link).
+
+    All connections share the one WebSocket. Each connection authenticates its session
+    once, and re-authenticates only when its token changes. While the link is down,
+    BaseConnection falls back to plain HTTP.
+    """
+
+    def __init__(self):
+        self.networking = mudforge.SETTINGS["PORTAL"]["networking"]
+        self.websocket = None
+        self.connected = asyncio.Event()
+        self.counter = itertools.count(1)
+        self.pending: dict[int, asyncio.Future] = dict()
+        self.streams: dict[str, asyncio.Queue] = dict()
+        self.authed: dict[str, str] = dict()
+
+    def is_valid(self):
+        return bool(self.networking.get("game_link", False))
+
+    def is_connected(self) -> bool:
+        return self.connected.is_set()
+
+    def link_url(self) -> str:
+        url = httpx.URL(self.networking["game_url"])
+        scheme = "wss" if url.scheme == "https" else "ws"
+        return str(url.copy_with(scheme=scheme, path="/link/"))
+
+    def ssl_context(self) -> typing.Optional[ssl.SSLContext]:
+        if not self.link_url().startswith("wss"):
+            return None
+        # Same as the portal's HTTP client, which uses verify=False.
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        return context
+
+    async def run(self):
+        delay = 1.0
+        while True:
+            try:
+                async with connect(
+                    self.link_url(), ssl=self.ssl_context(), max_size=None
+                ) as websocket:
+                    self.websocket = websocket
+                    self.connected.set()
+                    delay = 1.0
+                    logger.info(f"Game link established to {self.link_url()}")
+                    async for message in websocket:
+                        self.handle_frame(orjson.loads(message))
+            except asyncio.CancelledError:
+                self.teardown()
+                return
+            except (OSError, ConnectionClosed) as err:
+                logger.warning(f"Game link lost: {err}")
+            self.teardown()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+    def teardown(self):
+        self.connected.clear()
+        self.websocket = None
+        self.authed.clear()
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(LinkError("Game link lost."))
+        self.pending.clear()
+        for queue in self.streams.values():
+            queue.put_nowait(LinkError("Game link lost."))
+        self.streams.clear()
+
+    def handle_frame(self, frame: dict):
+        match frame.get("op", None):
+            case "result":
+                if future := self.pending.pop(frame["id"], None):
+                    if not future.done():
+                        future.set_result(frame)
+            case "event":
+                if queue := self.streams.get(frame["sid"], None):
+                    queue.put_nowait(frame)
+            case "end":
+                if queue := self.streams.get(frame["sid"], None):
+                    queue.put_nowait(None)
+
+    async def send(self, frame: dict):
+        if not self.websocket:
+            raise LinkError("Game link is not connected.")
+        await self.websocket.send(orjson.dumps(frame))
+
+    async def request(self, frame: dict) -> dict:
+        frame["id"] = next(self.counter)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[frame["id"]] = future
+        try:
+            await self.send(frame)
+            return await future
+        finally:
+            self.pending.pop(frame["id"], None)
+
+    async def authenticate(self, conn):
+        """
+        Makes sure the game knows about conn's current token.
+        """
+        if not conn.jwt or self.authed.get(conn.session_name, None) == conn.jwt:
+            return
+        result = await self.request(
+            {"op": "auth", "sid": conn.session_name, "token": conn.jwt}
+        )
+        self.raise_for_status("POST", "/link/", result)
+        self.authed[conn.session_name] = conn.jwt
+
+    @staticmethod
+    def raise_for_status(method: str, path: str, result: dict):
+        """
+        Raises the same HTTPStatusError that the HTTP path would, so callers can't tell
+        the difference.
+        """
+        if result["status"] < 400:
+            return
+        response = httpx.Response(
+            result["status"],
+            json=result["data"],
+            request=httpx.Request(method, f"http://game{path}"),
+        )
+        response.raise_for_status()
+
+    async def call(
+        self,
+        conn,
+        method: str,
+        path: str,
+        *,
+        query: dict = None,
+        json: dict = None,
+        data: dict = None,
+        headers: dict[str, str] = None,
+    ):
+        await self.authenticate(conn)
+        headers = dict(headers or dict())
+        headers.pop("Authorization", None)
+        result = await self.request(
+            {
+                "op": "call",
+                "sid": conn.session_name if conn.jwt else None,
+                "method": method,
+                "path": path,
+                "query": query,
+                "json": json,
+                "data": data,
+                "headers": headers,
+            }
+        )
+        self.raise_for_status(method, path, result)
+        return result["data"]
+
+    async def subscribe(
+        self,
+        conn,
+        character_id,
+        last_event_id: typing.Optional[str] = None,
+        events: typing.Optional[typing.Iterable[str]] = None,
+        codec: typing.Optional["CompactCodec"] = None,
+    ) -> typing.AsyncGenerator[dict, None]:
+        """
+        Yields the raw event frames for a character. If a codec is given, they carry
+        "type" and "values" rather than "event" and "data".
+        """
+        await self.authenticate(conn)
+        queue = asyncio.Queue()
+        self.streams[conn.session_name] = queue
+        try:
+            path = f"/characters/{character_id}/events"
+            result = await self.request(
+                {
+                    "op": "subscribe",
+                    "sid": conn.session_name,
+                    "character_id": str(character_id),
+                    "last_event_id": last_event_id,
+                    "events": list(events) if events else None,
+                    "codec": "compact" if codec else "json",
+                    "codec_version": codec.version if codec else None,
+                }
+            )
+            self.raise_for_status("GET", path, result)
+            while (item := await queue.get()) is not None:
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            if self.streams.get(conn.session_name, None) is queue:
+                del self.streams[conn.session_name]
+                with contextlib.suppress(LinkError, ConnectionClosed):
+                    await self.send({"op": "unsubscribe", "sid": conn.session_name})
+
+    async def close_session(self, conn):
+        self.authed.pop(conn.session_name, None)
+        with contextlib.suppress(LinkError, ConnectionClosed):
+            await self.send({"op": "close", "sid": conn.session_name})
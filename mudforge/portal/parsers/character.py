@@ -1,11 +1,12 @@
 import typing
 import mudforge
 import asyncio
+import random
 import orjson
 
 from mudforge.models.characters import ActiveAs
 from loguru import logger
-from httpx import HTTPStatusError
+from httpx import HTTPStatusError, TransportError
 
 from rich.markup import escape, MarkupError
 
@@ -14,11 +15,17 @@ from ..commands.base import CMD_MATCH
 
 
 class CharacterParser(BaseParser):
+    # Bounds, in seconds, for the backoff used when the event stream must be resumed.
+    resume_base_delay = 0.5
+    resume_max_delay = 30.0
+    # Names of the event classes this parser wants streamed. None means all of them.
+    event_filter: typing.Optional[set[str]] = None
 
     def __init__(self, active: ActiveAs):
         super().__init__()
         self.active = active
         self.stream_task = None
+        self.last_event_id = None
 
     async def on_start(self):
         await self.send_line(
@@ -32,21 +39,24 @@ class CharacterParser(BaseParser):
                 self.stream_task.cancel()
             self.stream_task = None
 
-    async def handle_event(self, event_name: str, event_data: dict):
-
-        if event_class := mudforge.EVENTS.get(event_name, None):
-            event = event_class(**event_data)
-            await event.handle_event(self)
-        else:
-            logger.error(f"Unknown event: {event_name}")
+    async def handle_event(self, event: "EventBase"):
+        await event.handle_event(self)
 
     async def stream_updates(self):
+        """
+        Runs the character's event stream. If it drops, it's reopened with jittered
+        exponential backoff, and the game replays anything sent since last_event_id.
+        """
+        attempt = 0
         while True:
             try:
-                async for event_name, event_data in self.connection.api_stream(
-                    "GET", f"/characters/{self.active.character.id}/events"
+                async for event_id, event in self.connection.character_events(
+                    self.active.character.id, self.last_event_id, self.event_filter
                 ):
-                    await self.handle_event(event_name, event_data)
+                    attempt = 0
+                    if event_id:
+                        self.last_event_id = event_id
+                    await self.handle_event(event)
                 self.stream_task.cancel()
                 await self.connection.pop_parser()
             except asyncio.CancelledError:
@@ -58,6 +68,12 @@ class CharacterParser(BaseParser):
                 logger.exception("HTTP error in stream_updates: %s")
                 await self.send_line("An error occurred. Please contact staff.")
                 return
+            except (TransportError, ConnectionError) as e:
+                if attempt == 0:
+                    logger.warning(f"Event stream for {self.active.character.id} lost: {e}")
+                delay = min(self.resume_max_delay, self.resume_base_delay * 2**attempt)
+                attempt += 1
+                await asyncio.sleep(random.uniform(0, delay))
             except Exception as e:
                 logger.exception("Unknown error occurred in stream_updates.")
                 await self.send_line("An error occurred. Please contact staff.")
@@ -86,10 +102,9 @@ class CharacterParser(BaseParser):
                 return command
 
     async def refresh_active(self):
-        json_data = await self.api_call(
-            "GET", f"/characters/{self.active.character.id}/active"
+        self.active = await self.api_call(
+            "GET", f"/characters/{self.active.character.id}/active", model=ActiveAs
         )
-        self.active = ActiveAs(**json_data)
 
     async def handle_command(self, cmd: str):
         try:
@@ -5,7 +5,7 @@ from ..commands.base import CMD_MATCH
 from httpx import HTTPStatusError
 from mudforge.models.validators import user_rich_text
 
-from mudforge.models.auth import UserLogin, TokenResponse
+from mudforge.models.auth import UserLogin, TokenResponse, SessionBootstrap
 
 
 class LoginParser(BaseParser):
@@ -56,12 +56,12 @@ class LoginParser(BaseParser):
             "grant_type": "password",
         }
         try:
-            json_data = await self.api_call("POST", "/auth/login", data=data)
+            json_data = await self.api_call("POST", "/auth/bootstrap", data=data)
         except HTTPStatusError as e:
             await self.send_line(f"Login failed: {e}")
             return
-        token = TokenResponse(**json_data)
-        await self.connection.handle_login(token)
+        bootstrap = SessionBootstrap(**json_data)
+        await self.connection.handle_bootstrap(bootstrap)
 
     async def handle_register(self, lsargs: str, rsargs: str):
         if not lsargs and rsargs:
@@ -14,7 +14,30 @@ class UserParser(BaseParser):
     """
 
     async def on_start(self):
-        await self.handle_look()
+        await self.handle_look(refresh=False)
+
+    async def get_user(self, refresh: bool = False) -> UserModel:
+        """
+        Returns the logged-in user, only asking the game if we don't already have it
+        from the session bootstrap or if a refresh is requested.
+        """
+        if refresh or self.connection.user is None:
+            user_id = self.connection.payload.get("sub")
+            self.connection.user = await self.api_call(
+                "GET", f"/users/{user_id}", model=UserModel
+            )
+        return self.connection.user
+
+    async def get_characters(self, refresh: bool = False) -> list[CharacterModel]:
+        """
+        Same as get_user, but for the user's character list.
+        """
+        if refresh or self.connection.characters is None:
+            user_id = self.connection.payload.get("sub")
+            self.connection.characters = await self.api_call(
+                "GET", f"/users/{user_id}/characters", model=list[CharacterModel]
+            )
+        return self.connection.characters
 
     async def handle_help(self, args: str):
         help_table = self.make_table("Command", "Description", title="User Commands")
@@ -37,18 +60,26 @@ class UserParser(BaseParser):
             await self.send_line(f"Error creating character: {e.response.text}")
             return
         character = CharacterModel(**character_data)
-        await self.handle_look()
+        if self.connection.characters is not None:
+            # Not append(): the list may be the one in the response cache.
+            self.connection.characters = [*self.connection.characters, character]
+        await self.handle_look(refresh=False)
         await self.send_line(f"Character {character.name} created.")
 
     async def handle_play(self, args: str):
         if not args:
             await self.send_line("You must supply a name for your character.")
             return
-        user_id = self.connection.payload.get("sub")
-        user_data = await self.api_call("GET", f"/users/{user_id}")
-        user = UserModel(**user_data)
-        character_data = await self.api_call("GET", f"/users/{user_id}/characters")
-        characters = [CharacterModel(**c) for c in character_data]
+        user = await self.get_user()
+        if (characters := self.connection.characters) is None:
+            # No list yet, so let the game find the one character rather than
+            # downloading all of them. The search ranks the way partial_match does.
+            characters = await self.api_call(
+                "GET",
+                "/characters/search",
+                query={"prefix": args, "limit": 1, "mine": "true", "fuzzy": "false"},
+                model=list[CharacterModel],
+            )
 
         if not (character := partial_match(args, characters, key=lambda c: c.name)):
             await self.send_line("Character not found.")
@@ -67,13 +98,12 @@ class UserParser(BaseParser):
         self.connection.jwt = None
         self.connection.payload = None
         self.connection.refresh_token = None
+        self.connection.user = None
+        self.connection.characters = None
         await self.connection.pop_parser()
 
-    async def handle_look(self):
-        user_id = self.connection.payload.get("sub")
-        character_data = await self.api_call("GET", f"/users/{user_id}/characters")
-
-        characters = [CharacterModel(**c) for c in character_data]
+    async def handle_look(self, refresh: bool = True):
+        characters = await self.get_characters(refresh=refresh)
 
         character_table = self.make_table("Name", "Last Active", title="Characters")
         for character in characters:
@@ -6,21 +6,29 @@ import jwt
 from fastapi import APIRouter, Depends, Body, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordRequestForm
 
-from mudforge.models.auth import TokenResponse, UserLogin, RefreshTokenModel
-
-from mudforge.db import auth as auth_db, users as users_db
+from mudforge.models.auth import (
+    TokenResponse,
+    UserLogin,
+    RefreshTokenModel,
+    SessionBootstrap,
+)
+
+from mudforge.models.users import UserModel
+from mudforge.db import auth as auth_db, users as users_db, characters as characters_db
 from mudforge.utils import crypt_context
 from .utils import oauth2_scheme, get_real_ip, get_current_user
 
 router = APIRouter()
 
 
-async def handle_login(request: Request, email: str, password: str) -> TokenResponse:
+async def handle_login(request: Request, email: str, password: str) -> UserModel:
+    """
+    Checks the credentials, recording the attempt against the caller's real IP and
+    User-Agent, and returns the user. Raises if they're wrong.
+    """
     ip = get_real_ip(request)
     user_agent = request.headers.get("User-Agent", None)
-
-    result = await auth_db.authenticate_user(email, password, ip, user_agent)
-    return TokenResponse.from_uuid(result.id)
+    return await auth_db.authenticate_user(email, password, ip, user_agent)
 
 
 @router.post("/register", response_model=TokenResponse)
@@ -42,7 +50,23 @@ async def register(request: Request, data: Annotated[UserLogin, Body()]):
 async def login(
     request: Request, data: Annotated[OAuth2PasswordRequestForm, Depends()]
 ):
-    return await handle_login(request, data.username, data.password)
+    user = await handle_login(request, data.username, data.password)
+    return TokenResponse.from_uuid(user.id)
+
+
+@router.post("/bootstrap", response_model=SessionBootstrap)
+async def bootstrap(
+    request: Request, data: Annotated[OAuth2PasswordRequestForm, Depends()]
+):
+    """
+    Login, but also hand back the user and their characters so that the portal
+    doesn't need to make follow-up calls to reach character select.
+    """
+    user = await handle_login(request, data.username, data.password)
+    characters = [c async for c in characters_db.list_characters_user(user)]
+    return SessionBootstrap(
+        token=TokenResponse.from_uuid(user.id), user=user, characters=characters
+    )
 
 
 @router.post("/refresh", response_model=TokenResponse)
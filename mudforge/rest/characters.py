@@ -4,69 +4,184 @@ import mudforge
 import typing
 import uuid
 
-from fastapi import APIRouter, Depends, Body, HTTPException, status, Request
+import asyncio
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    Body,
+    Header,
+    HTTPException,
+    Query,
+    status,
+    Request,
+)
 from fastapi.responses import StreamingResponse
 
-from .utils import get_current_user, get_acting_character, streaming_list
+from .utils import (
+    get_current_user,
+    get_acting_character,
+    streaming_list,
+    list_page,
+    conditional_response,
+    StreamCompressor,
+    negotiate_codec,
+)
 
 from mudforge.models.users import UserModel
-from mudforge.models.characters import CharacterModel, ActiveAs, CharacterCreate
+from mudforge.models.characters import (
+    CharacterModel,
+    ActiveAs,
+    CharacterCreate,
+    Presence,
+)
 from mudforge.db import characters as characters_db
+from mudforge.events.codec import CompactCodec
 
 router = APIRouter()
 
 
 @router.get("/", response_model=typing.List[CharacterModel])
-async def get_characters(user: Annotated[UserModel, Depends(get_current_user)]):
+async def get_characters(
+    request: Request,
+    user: Annotated[UserModel, Depends(get_current_user)],
+    after: Annotated[uuid.UUID | None, Query()] = None,
+    limit: Annotated[int | None, Query(ge=1, le=1000)] = None,
+):
+    """
+    Without limit, streams everything after the given id. With limit, returns one page,
+    and X-Next-After gives the after= for the next one.
+    """
     if not user.admin_level > 0:
         raise HTTPException(
             status_code=403, detail="You do not have permission to view all characters."
         )
 
-    stream = characters_db.list_characters()
+    stream = characters_db.list_characters(after=after, limit=limit, raw=True)
+    if limit:
+        return await list_page(stream, limit)
+    return streaming_list(stream, request)
+
 
-    return streaming_list(stream)
+# Declared before /{character_id}, which would otherwise take "search" as an id.
+@router.get("/search", response_model=typing.List[CharacterModel])
+async def search_characters(
+    request: Request,
+    user: Annotated[UserModel, Depends(get_current_user)],
+    prefix: Annotated[str, Query(min_length=1, max_length=255)],
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+    mine: Annotated[bool, Query()] = False,
+    fuzzy: Annotated[bool, Query()] = True,
+):
+    """
+    Characters by name: exact matches, then names starting with prefix, then (if fuzzy)
+    similar names. Admins search everyone's unless mine is set; others only their own.
+    """
+    owner = user.id if mine or user.admin_level == 0 else None
+    found = await characters_db.search_characters(prefix, limit, owner, fuzzy)
+    return conditional_response(request, found)
 
 
 @router.get("/{character_id}", response_model=CharacterModel)
 async def get_character(
-    user: Annotated[UserModel, Depends(get_current_user)], character_id: uuid.UUID
+    request: Request,
+    user: Annotated[UserModel, Depends(get_current_user)],
+    character_id: uuid.UUID,
 ):
     character = await characters_db.find_character_id(character_id)
     if character.user_id != user.id and user.admin_level == 0:
         raise HTTPException(status_code=403, detail="Character does not belong to you.")
-    return character
+    return conditional_response(request, character)
 
 
 @router.get("/{character_id}/active", response_model=ActiveAs)
 async def get_character_active_as(
-    user: Annotated[UserModel, Depends(get_current_user)], character_id: uuid.UUID
+    request: Request,
+    user: Annotated[UserModel, Depends(get_current_user)],
+    character_id: uuid.UUID,
 ):
     acting = await get_acting_character(user, character_id)
-    return acting
+    return conditional_response(request, acting)
+
+
+def sse_frame(event_id: str, item, codec: CompactCodec | None = None) -> str:
+    if codec:
+        type_id, data = codec.encode(item)
+        return f"id: {event_id}\nevent: {type_id}\ndata: {data.decode()}\n\n"
+    return f"id: {event_id}\nevent: {item.__class__.__name__}\ndata: {item.model_dump_json()}\n\n"
 
 
 @router.get("/{character_id}/events")
 async def stream_character_events(
-    user: Annotated[UserModel, Depends(get_current_user)], character_id: uuid.UUID
+    request: Request,
+    user: Annotated[UserModel, Depends(get_current_user)],
+    character_id: uuid.UUID,
+    last_event_id: Annotated[str | None, Header()] = None,
+    events: Annotated[list[str] | None, Query()] = None,
+    codec: Annotated[str, Query()] = "json",
+    codec_version: Annotated[str | None, Query()] = None,
 ):
-    # We don't use it; but this verifies that user can control character.
+    # This verifies that user can control character, and is who they appear as.
     acting = await get_acting_character(user, character_id)
+    # With the compact codec, "event" is the type id and "data" is the field values.
+    event_codec = negotiate_codec(codec, codec_version)
+    settings = mudforge.SETTINGS["GAME"].get("events", dict())
+    heartbeat = settings.get("heartbeat", 15)
+    batch_window = settings.get("batch_window", 0.02)
+    # Without a window, batching only added work (see benchmarks/sse_throughput.py),
+    # so each event is written as it comes.
+    batch_max = settings.get("batch_max", 64) if batch_window else 1
+    compressor = (
+        StreamCompressor.negotiate(request)
+        if settings.get("compression", False)
+        else StreamCompressor()
+    )
 
     async def event_generator():
-        queue = mudforge.EVENT_HUB.subscribe(character_id)
+        # Reconnecting clients send the Last-Event-ID they saw and get only what they missed.
+        # Clients may also list the event classes they care about; the rest are never queued.
+        queue = mudforge.EVENT_HUB.subscribe(
+            character_id,
+            last_event_id,
+            events,
+            presence=Presence.from_active(acting),
+        )
         graceful = False
         try:
-            # blocks until a new event
-            while item := await queue.get():
-                yield f"event: {item.__class__.__name__}\ndata: {item.model_dump_json()}\n\n"
+            while True:
+                try:
+                    async with asyncio.timeout(heartbeat):
+                        entry = await queue.get()
+                except TimeoutError:
+                    # Idle. An SSE comment keeps the connection alive; clients ignore it.
+                    yield compressor.chunk(": ping\n\n")
+                    continue
+                if entry is None:
+                    break
+                if batch_window:
+                    # Give a busy room a moment to produce more.
+                    await asyncio.sleep(batch_window)
+                # Everything already queued goes out as one write.
+                frames = [sse_frame(*entry, event_codec)]
+                while len(frames) < batch_max and not queue.empty():
+                    if (entry := queue.get_nowait()) is None:
+                        break
+                    frames.append(sse_frame(*entry, event_codec))
+                yield compressor.chunk("".join(frames))
+                if entry is None:
+                    break
+            yield compressor.finish()
             graceful = True
         finally:
             mudforge.EVENT_HUB.unsubscribe(character_id, queue)
             if not graceful:
                 pass  # this can do something later.
 
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", **compressor.headers()},
+    )
 
 
 @router.post("/", response_model=CharacterModel)
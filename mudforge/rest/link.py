@@ -0,0 +1,320 @@
+"""
+A persistent, multiplexed link between the portal and the game.
+
+Instead of one HTTP request per player command and one SSE stream per character,
+the portal can hold a single WebSocket open to /link/ and carry every session over it.
+Each session authenticates once; after that, calls are made on its behalf without
+re-sending or re-verifying the bearer token.
+
+Frames are orjson-encoded objects with an "op" key. From the portal:
+
+    {"op": "auth", "id": 1, "sid": "telnet_...", "token": "..."}
+    {"op": "call", "id": 2, "sid": "telnet_...", "method": "GET", "path": "/users/...",
+        "query": {...}, "json": {...}, "data": {...}, "headers": {...}}
+    {"op": "subscribe", "id": 3, "sid": "telnet_...", "character_id": "...",
+        "last_event_id": "...", "events": ["CharacterCreated", ...],
+        "codec": "json", "codec_version": null}
+    {"op": "unsubscribe", "sid": "telnet_..."}
+    {"op": "close", "sid": "telnet_..."}
+
+From the game:
+
+    {"op": "result", "id": 2, "status": 200, "data": ...}
+    {"op": "event", "sid": "telnet_...", "id": "...", "event": "CharacterCreated",
+        "data": {...}}
+    {"op": "event", "sid": "telnet_...", "id": "...", "type": 3, "values": [...]}
+    {"op": "end", "sid": "telnet_..."}
+
+Calls matching a route in FAST_ROUTES are answered directly. Anything else is forwarded
+to the game's own FastAPI app in-process, so every REST route is reachable over the link.
+
+Subscriptions made with "codec": "compact" get events in the second form above; see
+mudforge.events.codec.
+"""
+
+import asyncio
+import re
+import time
+import typing
+import uuid
+from dataclasses import dataclass, field
+
+import httpx
+import orjson
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, status
+from loguru import logger
+
+import mudforge
+from mudforge.db import characters as characters_db, users as users_db
+from mudforge.events.codec import CompactCodec, json_default
+from mudforge.models.users import UserModel
+from mudforge.models.characters import ActiveAs, Presence
+
+from .utils import decode_token, get_acting_character, negotiate_codec
+
+router = APIRouter()
+
+FAST_ROUTES: list[tuple[str, re.Pattern, typing.Callable]] = list()
+
+_UUID = r"[0-9a-fA-F-]{36}"
+
+
+def fast_route(method: str, pattern: str):
+    """
+    Registers a handler that answers a call over the link without going through FastAPI.
+    The handler receives the session's UserModel and the named groups of the pattern,
+    and returns a pydantic model (or list of them).
+    """
+
+    def decorator(func):
+        FAST_ROUTES.append((method.upper(), re.compile(f"^{pattern}/?$"), func))
+        return func
+
+    return decorator
+
+
+@fast_route("GET", rf"/characters/(?P<character_id>{_UUID})")
+async def fast_get_character(user: UserModel, character_id: str):
+    character = await characters_db.find_character_id(uuid.UUID(character_id))
+    if character.user_id != user.id and user.admin_level == 0:
+        raise HTTPException(status_code=403, detail="Character does not belong to you.")
+    return character
+
+
+@fast_route("GET", rf"/characters/(?P<character_id>{_UUID})/active")
+async def fast_get_active(user: UserModel, character_id: str):
+    return await get_acting_character(user, uuid.UUID(character_id))
+
+
+@fast_route("GET", rf"/users/(?P<user_id>{_UUID})")
+async def fast_get_user(user: UserModel, user_id: str):
+    user_id = uuid.UUID(user_id)
+    if user.admin_level < 1 and user.id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions."
+        )
+    return await users_db.get_user(user_id)
+
+
+@fast_route("GET", rf"/users/(?P<user_id>{_UUID})/characters")
+async def fast_get_user_characters(user: UserModel, user_id: str):
+    user_id = uuid.UUID(user_id)
+    if user.id != user_id and user.admin_level < 1:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions."
+        )
+    target_user = await users_db.get_user(user_id)
+    return [c async for c in characters_db.list_characters_user(target_user)]
+
+
+def _to_jsonable(data):
+    if isinstance(data, list):
+        return [_to_jsonable(d) for d in data]
+    if hasattr(data, "model_dump"):
+        return data.model_dump(mode="json")
+    return data
+
+
+@dataclass(slots=True)
+class LinkSession:
+    token: str
+    user_id: uuid.UUID
+    expires_at: float
+    subscription: typing.Optional[asyncio.Task] = None
+
+
+@dataclass
+class LinkConnection:
+    websocket: WebSocket
+    sessions: dict[str, LinkSession] = field(default_factory=dict)
+    send_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    tasks: set[asyncio.Task] = field(default_factory=set)
+    asgi_client: typing.Optional[httpx.AsyncClient] = None
+
+    async def send(self, frame: dict):
+        data = orjson.dumps(frame, default=json_default)
+        async with self.send_lock:
+            await self.websocket.send_bytes(data)
+
+    async def reply(self, frame_id: int, status_code: int, data=None):
+        await self.send(
+            {"op": "result", "id": frame_id, "status": status_code, "data": data}
+        )
+
+    def spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    def get_session(self, sid: str) -> LinkSession:
+        if not (session := self.sessions.get(sid, None)):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Session is not authenticated.",
+            )
+        if session.expires_at <= time.time():
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="Session expired."
+            )
+        return session
+
+    async def get_user(self, sid: str) -> UserModel:
+        return await users_db.get_user(self.get_session(sid).user_id)
+
+    async def handle_frame(self, frame: dict):
+        frame_id = frame.get("id", None)
+        try:
+            match frame.get("op", None):
+                case "auth":
+                    payload = decode_token(frame["token"])
+                    user_id = uuid.UUID(payload["sub"])
+                    expires_at = payload.get("exp", float("inf"))
+                    session = self.sessions.get(frame["sid"], None)
+                    if session and session.user_id == user_id:
+                        # A refreshed token. Keep any running subscription.
+                        session.token = frame["token"]
+                        session.expires_at = expires_at
+                    else:
+                        self.close_session(frame["sid"])
+                        self.sessions[frame["sid"]] = LinkSession(
+                            token=frame["token"], user_id=user_id, expires_at=expires_at
+                        )
+                    await self.reply(frame_id, 200)
+                case "call":
+                    status_code, data = await self.handle_call(frame)
+                    await self.reply(frame_id, status_code, data)
+                case "subscribe":
+                    await self.handle_subscribe(frame)
+                    await self.reply(frame_id, 200)
+                case "unsubscribe":
+                    if session := self.sessions.get(frame["sid"], None):
+                        if session.subscription:
+                            session.subscription.cancel()
+                            session.subscription = None
+                case "close":
+                    self.close_session(frame["sid"])
+                case op:
+                    if frame_id is not None:
+                        await self.reply(frame_id, 400, {"detail": f"Unknown op: {op}"})
+        except HTTPException as e:
+            if frame_id is not None:
+                await self.reply(frame_id, e.status_code, {"detail": e.detail})
+        except Exception as e:
+            logger.exception(e)
+            if frame_id is not None:
+                await self.reply(frame_id, 500, {"detail": "Internal server error."})
+
+    async def handle_call(self, frame: dict) -> tuple[int, typing.Any]:
+        method = frame.get("method", "GET").upper()
+        path = frame["path"]
+        sid = frame.get("sid", None)
+
+        if sid in self.sessions:
+            for route_method, pattern, handler in FAST_ROUTES:
+                if route_method == method and (match := pattern.match(path)):
+                    user = await self.get_user(sid)
+                    result = await handler(user, **match.groupdict())
+                    return 200, _to_jsonable(result)
+
+        # Everything else goes through the REST API itself.
+        headers = frame.get("headers", None) or dict()
+        if sid in self.sessions:
+            headers["Authorization"] = f"Bearer {self.get_session(sid).token}"
+        response = await self.asgi_client.request(
+            method,
+            path,
+            params=frame.get("query", None),
+            json=frame.get("json", None),
+            data=frame.get("data", None),
+            headers=headers,
+        )
+        if not response.content:
+            return response.status_code, None
+        try:
+            return response.status_code, response.json()
+        except ValueError:
+            return response.status_code, {"detail": response.text}
+
+    async def handle_subscribe(self, frame: dict):
+        sid = frame["sid"]
+        user = await self.get_user(sid)
+        character_id = uuid.UUID(frame["character_id"])
+        # This verifies that the user can control the character.
+        acting = await get_acting_character(user, character_id)
+        codec = negotiate_codec(
+            frame.get("codec", None) or "json", frame.get("codec_version", None)
+        )
+
+        session = self.sessions[sid]
+        if session.subscription:
+            session.subscription.cancel()
+        session.subscription = self.spawn(
+            self.pump_events(
+                sid,
+                character_id,
+                frame.get("last_event_id", None),
+                frame.get("events", None),
+                codec,
+                acting,
+            )
+        )
+
+    async def pump_events(
+        self,
+        sid: str,
+        character_id: uuid.UUID,
+        last_event_id: str | None = None,
+        events: list[str] | None = None,
+        codec: CompactCodec | None = None,
+        acting: ActiveAs | None = None,
+    ):
+        presence = Presence.from_active(acting) if acting else None
+        queue = mudforge.EVENT_HUB.subscribe(
+            character_id, last_event_id, events, presence=presence
+        )
+        try:
+            while (entry := await queue.get()) is not None:
+                event_id, item = entry
+                frame = {"op": "event", "sid": sid, "id": event_id}
+                if codec:
+                    frame["type"], frame["values"] = codec.encode_values(item)
+                else:
+                    frame["event"] = item.__class__.__name__
+                    frame["data"] = item.model_dump(mode="json")
+                await self.send(frame)
+            await self.send({"op": "end", "sid": sid})
+        finally:
+            mudforge.EVENT_HUB.unsubscribe(character_id, queue)
+
+    def close_session(self, sid: str):
+        if session := self.sessions.pop(sid, None):
+            if session.subscription:
+                session.subscription.cancel()
+
+    def close(self):
+        for task in list(self.tasks):
+            task.cancel()
+        self.sessions.clear()
+
+
+@router.websocket("/")
+async def link(websocket: WebSocket):
+    await websocket.accept()
+    conn = LinkConnection(websocket)
+    # Forwarded calls appear to come from the portal itself, so X-Forwarded-For
+    # is trusted exactly as it would be over HTTP.
+    client = websocket.client or ("127.0.0.1", 0)
+    transport = httpx.ASGITransport(app=websocket.app, client=(client[0], client[1]))
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://game"
+    ) as client:
+        conn.asgi_client = client
+        try:
+            while True:
+                frame = orjson.loads(await websocket.receive_bytes())
+                conn.spawn(conn.handle_frame(frame))
+        except WebSocketDisconnect:
+            pass
+        finally:
+            conn.close()
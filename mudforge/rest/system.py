@@ -1,5 +1,7 @@
 from typing import Annotated
 
+import mudforge
+
 import pydantic
 
 from rich.text import Text
@@ -12,6 +14,9 @@ from .utils import (
     get_acting_character,
 )
 from mudforge.utils import subscription
+from mudforge.db import metrics as db_metrics, cache as db_cache
+from mudforge.db.replicas import REPLICAS
+from mudforge.game import notifications
 
 from mudforge.models.users import UserModel
 from mudforge.models.characters import CharacterModel, ActiveAs
@@ -37,3 +42,33 @@ async def verify_rich_text(
     except MarkupError as e:
         raise HTTPException(status_code=400, detail=str(e))
     return {"success": True}
+
+
+@router.get("/events")
+async def get_event_table():
+    """
+    The numeric type ids and field orders used by the compact event codec. See
+    mudforge.events.codec.
+    """
+    return mudforge.EVENT_CODEC.table()
+
+
+@router.get("/metrics")
+async def get_metrics(user: Annotated[UserModel, Depends(get_current_user)]):
+    """
+    Database query, cache and table-change notification metrics.
+    """
+    if user.admin_level < 1:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions."
+        )
+    return {
+        "enabled": db_metrics.ENABLED,
+        "queries": db_metrics.snapshot(),
+        "cache": db_cache.CACHE.snapshot(),
+        "notifications": (
+            notifications.DISPATCHER.snapshot() if notifications.DISPATCHER else None
+        ),
+        "feed": notifications.FEED.snapshot() if notifications.FEED else None,
+        "replicas": REPLICAS.snapshot(),
+    }
@@ -3,11 +3,13 @@ from typing import Annotated
 import typing
 import uuid
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Request
 
 from .utils import (
     get_current_user,
     streaming_list,
+    list_page,
+    conditional_response,
 )
 
 from mudforge.models.users import UserModel
@@ -18,19 +20,32 @@ router = APIRouter()
 
 
 @router.get("/", response_model=typing.List[UserModel])
-async def get_users(user: Annotated[UserModel, Depends(get_current_user)]):
+async def get_users(
+    request: Request,
+    user: Annotated[UserModel, Depends(get_current_user)],
+    after: Annotated[uuid.UUID | None, Query()] = None,
+    limit: Annotated[int | None, Query(ge=1, le=1000)] = None,
+):
+    """
+    Without limit, streams everything after the given id. With limit, returns one page,
+    and X-Next-After gives the after= for the next one.
+    """
     if user.admin_level < 1:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions."
         )
 
-    users = users_db.list_users()
-    return streaming_list(users)
+    users = users_db.list_users(after=after, limit=limit, raw=True)
+    if limit:
+        return await list_page(users, limit)
+    return streaming_list(users, request)
 
 
 @router.get("/{user_id}", response_model=UserModel)
 async def get_user(
-    user_id: uuid.UUID, user: Annotated[UserModel, Depends(get_current_user)]
+    request: Request,
+    user_id: uuid.UUID,
+    user: Annotated[UserModel, Depends(get_current_user)],
 ):
     if user.admin_level < 1 and user.id != user_id:
         raise HTTPException(
@@ -38,12 +53,14 @@ async def get_user(
         )
 
     found = await users_db.get_user(user_id)
-    return found
+    return conditional_response(request, found)
 
 
 @router.get("/{user_id}/characters", response_model=typing.List[CharacterModel])
 async def get_user_characters(
-    user_id: uuid.UUID, user: Annotated[UserModel, Depends(get_current_user)]
+    request: Request,
+    user_id: uuid.UUID,
+    user: Annotated[UserModel, Depends(get_current_user)],
 ):
     if user.id != user_id and user.admin_level < 1:
         raise HTTPException(
@@ -52,5 +69,6 @@ async def get_user_characters(
 
     target_user = await users_db.get_user(user_id)
 
-    characters = characters_db.list_characters_user(target_user)
-    return streaming_list(characters)
+    # A user's roster is small, so it's buffered in order to be ETagged.
+    characters = [c async for c in characters_db.list_characters_user(target_user)]
+    return conditional_response(request, characters)
@@ -1,5 +1,7 @@
 import mudforge
+import hashlib
 import jwt
+import zlib
 import uuid
 import pydantic
 import orjson
@@ -10,51 +12,229 @@ from typing import Annotated, Optional
 
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi import Request, Depends, HTTPException, status
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, Response
 
 from mudforge.utils import crypt_context
+from mudforge.events.codec import CompactCodec
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 from mudforge.models.users import UserModel
-from mudforge.models.characters import CharacterModel, ActiveAs
+from mudforge.models.characters import ActiveAs
 
-from ..db import characters as characters_db
+from ..db import characters as characters_db, users as users_db, activity
 
-async def json_array_generator(data: typing.AsyncGenerator[pydantic.BaseModel, None]) -> typing.AsyncGenerator[str, None]:
-        # Start the JSON array
-        yield "["
-        first = True
-        # Stream the rows from the DB
-        async for element in data:
-            # Insert commas between elements
+def _encode_row(element) -> bytes:
+    # Models go through pydantic. Raw rows (see list_characters(raw=True)) skip
+    # models entirely; their columns already match the model's fields. OPT_UTC_Z
+    # writes UTC datetimes with a Z, as pydantic does, so both come out the same.
+    if isinstance(element, pydantic.BaseModel):
+        return element.__pydantic_serializer__.to_json(element)
+    return orjson.dumps(dict(element), option=orjson.OPT_UTC_Z)
+
+
+async def json_array_generator(
+    data: typing.AsyncGenerator[pydantic.BaseModel, None],
+    ndjson: bool = False,
+    batch_rows: int = 500,
+    flush_bytes: int = 65536,
+) -> typing.AsyncGenerator[bytes, None]:
+    """
+    Serializes rows into one buffer and yields it whenever it holds batch_rows rows or
+    flush_bytes bytes, rather than sending every row and comma as its own chunk.
+
+    Yields a JSON array, or newline-delimited JSON if ndjson is set.
+    """
+    separator = b"\n" if ndjson else b","
+    buffer = bytearray() if ndjson else bytearray(b"[")
+    first = True
+    rows = 0
+    async for element in data:
+        if ndjson:
+            buffer += _encode_row(element)
+            buffer += separator
+        else:
             if not first:
-                yield ","
-            else:
-                first = False
-            # Convert your Pydantic model to JSON. (Assumes CharacterModel has .json())
-            yield element.model_dump_json()
-        # End the JSON array
-        yield "]"
-
-def streaming_list(data: typing.AsyncGenerator[pydantic.BaseModel, None]) -> StreamingResponse:
+                buffer += separator
+            first = False
+            buffer += _encode_row(element)
+        rows += 1
+        if rows >= batch_rows or len(buffer) >= flush_bytes:
+            yield bytes(buffer)
+            buffer.clear()
+            rows = 0
+    if not ndjson:
+        buffer += b"]"
+    if buffer:
+        yield bytes(buffer)
+
+
+def streaming_list(
+    data: typing.AsyncGenerator[pydantic.BaseModel, None],
+    request: Optional[Request] = None,
+) -> StreamingResponse:
+    """
+    Streams data as a JSON array, or as NDJSON if the client accepts
+    application/x-ndjson.
+    """
+    settings = mudforge.SETTINGS["FASTAPI"].get("streaming", dict())
+    ndjson = bool(
+        request and "application/x-ndjson" in request.headers.get("accept", "")
+    )
     return StreamingResponse(
-        json_array_generator(data),
-        media_type="application/json",
+        json_array_generator(
+            data,
+            ndjson=ndjson,
+            batch_rows=settings.get("batch_rows", 500),
+            flush_bytes=settings.get("flush_bytes", 65536),
+        ),
+        media_type="application/x-ndjson" if ndjson else "application/json",
     )
 
+
+async def list_page(data: typing.AsyncGenerator[typing.Any, None], limit: int) -> Response:
+    """
+    Returns one page of a keyset-paginated list as a plain response. If the page is
+    full, the X-Next-After header holds the id to pass as after= for the next page.
+    """
+    rows = [row async for row in data]
+    headers = dict()
+    if rows and len(rows) == limit:
+        last = rows[-1]
+        last_id = last.id if isinstance(last, pydantic.BaseModel) else last["id"]
+        headers["X-Next-After"] = str(last_id)
+    body = b"[" + b",".join(_encode_row(row) for row in rows) + b"]"
+    return Response(body, media_type="application/json", headers=headers)
+
+
+def _dump_json(data: pydantic.BaseModel | list[pydantic.BaseModel]) -> bytes:
+    # Straight to bytes through pydantic-core, skipping model_dump_json's str round trip.
+    if isinstance(data, pydantic.BaseModel):
+        return data.__pydantic_serializer__.to_json(data)
+    return b"[" + b",".join(e.__pydantic_serializer__.to_json(e) for e in data) + b"]"
+
+
+def make_etag(body: bytes) -> str:
+    """
+    Strong ETag derived from the serialized body, so it changes whenever any field does.
+    """
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if not (header := request.headers.get("If-None-Match", None)):
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def conditional_response(
+    request: Request, data: pydantic.BaseModel | list[pydantic.BaseModel]
+) -> Response:
+    """
+    Serializes data and tags it with an ETag. If the client already holds that
+    version (If-None-Match), a bodiless 304 is returned instead.
+
+    Returning a Response means FastAPI skips response_model validation and
+    serialization entirely, so routes using this serialize exactly once.
+    """
+    body = _dump_json(data)
+    headers = {"ETag": make_etag(body), "Cache-Control": "private, no-cache"}
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+class StreamCompressor:
+    """
+    Incrementally compresses a streamed response body. Every chunk is sync-flushed,
+    so the client can decode each one as soon as it arrives.
+    """
+
+    # Content-Encoding -> zlib wbits.
+    encodings = {"gzip": 31, "deflate": 15}
+
+    def __init__(self, encoding: str | None = None):
+        self.encoding = encoding
+        self.compressor = (
+            zlib.compressobj(wbits=self.encodings[encoding]) if encoding else None
+        )
+
+    @classmethod
+    def negotiate(cls, request: Request) -> "StreamCompressor":
+        accepted = {
+            e.split(";")[0].strip().lower()
+            for e in request.headers.get("Accept-Encoding", "").split(",")
+        }
+        for encoding in cls.encodings:
+            if encoding in accepted:
+                return cls(encoding)
+        return cls()
+
+    def headers(self) -> dict[str, str]:
+        if not self.encoding:
+            return dict()
+        return {"Content-Encoding": self.encoding, "Vary": "Accept-Encoding"}
+
+    def chunk(self, text: str) -> bytes:
+        data = text.encode()
+        if not self.compressor:
+            return data
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if not self.compressor:
+            return b""
+        return self.compressor.flush()
+
+
+def negotiate_codec(
+    codec: str, codec_version: Optional[str] = None
+) -> Optional[CompactCodec]:
+    """
+    Returns the codec an event stream should use, or None for plain JSON.
+
+    Raises a 409 if a compact client's event table doesn't match ours, so that it
+    can fetch GET /system/events again and retry.
+    """
+    match codec:
+        case "json":
+            return None
+        case "compact":
+            if codec_version != mudforge.EVENT_CODEC.version:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Event table version mismatch.",
+                )
+            return mudforge.EVENT_CODEC
+        case _:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown event codec: {codec}",
+            )
+
+
 def get_real_ip(request: Request):
     """
     If the request is behind a trusted proxy, then we'll trust X-Forwarded-For and use the first IP in the list.
     trusted proxies are in mudforge.SETTINGS["GAME"]["networking"]["trusted_proxy_ips"]
     """
-    ip = request.client.host
+    # Hypercorn has no peer address for Unix socket connections. Only processes on
+    # this host can reach those, so they count as loopback.
+    ip = request.client.host if request.client else "127.0.0.1"
     if ip in mudforge.SETTINGS["GAME"]["networking"]["trusted_proxy_ips"]:
         ip = request.headers.get("X-Forwarded-For", ip).split(",")[0].strip()
     return ip
 
 
-async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]) -> UserModel:
+def decode_token(token: str) -> dict:
+    """
+    Verifies an access token and returns its payload.
+    Raises a 401 HTTPException if it's invalid or has no subject.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -65,18 +245,26 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]) -> Use
         payload = jwt.decode(
             token, jwt_settings["secret"], algorithms=[jwt_settings["algorithm"]]
         )
-        if (user_id := payload.get("sub", None)) is None:
+        if payload.get("sub", None) is None:
             raise credentials_exception
     except jwt.PyJWTError as e:
         raise credentials_exception
+    return payload
 
-    async with mudforge.PGPOOL.acquire() as conn:
-        user = await conn.fetchrow("SELECT * FROM users WHERE id = $1", user_id)
 
-    if user is None:
-        raise credentials_exception
+async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]) -> UserModel:
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    user_id = decode_token(token)["sub"]
 
-    return UserModel(**user)
+    # Shares one query with any concurrent lookups of the same user.
+    try:
+        return await users_db.get_user(uuid.UUID(user_id))
+    except HTTPException:
+        raise credentials_exception
 
 
 async def get_acting_character(user: UserModel, character_id: uuid.UUID) -> ActiveAs:
@@ -90,4 +278,6 @@ async def get_acting_character(user: UserModel, character_id: uuid.UUID) -> Acti
         user=user,
         character=character
     )
+    # The portal checks this before every command, so it doubles as "last seen".
+    activity.touch(character_id)
     return act
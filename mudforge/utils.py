@@ -16,7 +16,7 @@ import signal
 import asyncio
 from contextlib import asynccontextmanager
 from passlib.context import CryptContext
-from collections import defaultdict
+from collections import defaultdict, deque
 
 from datetime import datetime, timezone
 from inspect import getmembers, getmodule, getmro, ismodule, trace
@@ -770,20 +770,106 @@ async def queue_iterator(queue: asyncio.Queue):
 
 
 class EventHub:
-    def __init__(self):
+    """
+    Routes events to the queues of whoever is subscribed to a character.
+
+    Every event is given an id of the form "<epoch>-<sequence>", where the sequence is
+    monotonic and the epoch changes every boot. The last buffer_size events for each
+    character are kept in a ring buffer, even for a while (buffer_retention seconds)
+    after its last subscriber leaves, so that a subscriber which comes back with the
+    last id it saw can be sent only what it missed.
+
+    Queues receive (event_id, event) tuples. A subscriber may name the event classes
+    it wants, in which case nothing else is put into its queue.
+    """
+
+    def __init__(self, buffer_size: int = 256, buffer_retention: float = 300.0):
         self.subscriptions: dict[uuid.UUID, list[asyncio.Queue]] = defaultdict(list)
         self.subscribed_at: dict[uuid.UUID, datetime] = dict()
-
-    def subscribe(self, character_id: uuid.UUID) -> asyncio.Queue:
-        """Create a new queue for this character and add it to the subscription list."""
+        # Who each online character is (a Presence), for who lists that don't
+        # touch the database. Kept fresh by mudforge.game.listeners.PresenceListener.
+        self.presence: dict[uuid.UUID, typing.Any] = dict()
+        self.epoch = f"{int(time.time()):x}"
+        self.sequence = 0
+        self.buffer_size = buffer_size
+        self.buffer_retention = buffer_retention
+        self.buffers: dict[uuid.UUID, deque[tuple[int, str, typing.Any]]] = dict()
+        # The sequence of the newest event each full buffer has pushed out. Sequences
+        # are shared by every character, so a gap before a buffer's oldest event is
+        # only a loss if it was evicted from that buffer.
+        self.dropped_through: dict[uuid.UUID, int] = dict()
+        self.unsubscribed_at: dict[uuid.UUID, float] = dict()
+        self.filters: dict[asyncio.Queue, frozenset[str]] = dict()
+
+    def wants(self, q: asyncio.Queue, message) -> bool:
+        if (wanted := self.filters.get(q, None)) is None:
+            return True
+        return message.__class__.__name__ in wanted
+
+    def next_id(self) -> tuple[int, str]:
+        self.sequence += 1
+        return self.sequence, f"{self.epoch}-{self.sequence}"
+
+    def parse_id(self, event_id: typing.Optional[str]) -> typing.Optional[int]:
+        """
+        Returns the sequence number of an event id from this boot, or None.
+        """
+        if not event_id:
+            return None
+        epoch, _, seq = event_id.partition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def prune(self):
+        """Drop the buffers of characters that have been gone for too long."""
+        cutoff = time.monotonic() - self.buffer_retention
+        for character_id, left_at in list(self.unsubscribed_at.items()):
+            if left_at < cutoff:
+                del self.unsubscribed_at[character_id]
+                self.buffers.pop(character_id, None)
+                self.dropped_through.pop(character_id, None)
+
+    def subscribe(
+        self,
+        character_id: uuid.UUID,
+        last_event_id: typing.Optional[str] = None,
+        events: typing.Optional[typing.Iterable[str]] = None,
+        presence=None,
+    ) -> asyncio.Queue:
+        """
+        Create a new queue for this character and add it to the subscription list.
+        If last_event_id is given, the queue starts with every buffered event after it.
+        If events is given, only events of those class names are delivered.
+        If presence is given (the character's Presence), it's what who() reports.
+        """
+        self.prune()
         q = asyncio.Queue()
+        if events:
+            self.filters[q] = frozenset(events)
         if character_id not in self.subscriptions:
             self.subscribed_at[character_id] = datetime.now()
         self.subscriptions[character_id].append(q)
+        self.unsubscribed_at.pop(character_id, None)
+        if presence is not None:
+            self.presence[character_id] = presence
+        buffer = self.buffers.setdefault(
+            character_id, deque(maxlen=self.buffer_size)
+        )
+
+        if (last_seq := self.parse_id(last_event_id)) is not None:
+            if self.dropped_through.get(character_id, 0) > last_seq:
+                logger.warning(
+                    f"Event buffer for {character_id} no longer holds everything after {last_event_id}."
+                )
+            for seq, event_id, message in buffer:
+                if seq > last_seq and self.wants(q, message):
+                    q.put_nowait((event_id, message))
         return q
 
     def unsubscribe(self, character_id: uuid.UUID, q: asyncio.Queue):
         """Remove the given queue from this character's subscription list."""
+        self.filters.pop(q, None)
         if character_id in self.subscriptions:
             try:
                 self.subscriptions[character_id].remove(q)
@@ -793,33 +879,76 @@ class EventHub:
             if not self.subscriptions[character_id]:
                 del self.subscriptions[character_id]
                 del self.subscribed_at[character_id]
+                self.presence.pop(character_id, None)
+                # Keep its buffer around in case it comes right back.
+                self.unsubscribed_at[character_id] = time.monotonic()
+        self.prune()
+
+    def record(self, character_id: uuid.UUID, message) -> typing.Optional[str]:
+        """
+        Buffer a message for this character. Returns its event id, or None if nobody is
+        or recently was subscribed to the character.
+        """
+        if (buffer := self.buffers.get(character_id, None)) is None:
+            return None
+        seq, event_id = self.next_id()
+        self.append(character_id, buffer, (seq, event_id, message))
+        return event_id
+
+    def append(
+        self,
+        character_id: uuid.UUID,
+        buffer: deque[tuple[int, str, typing.Any]],
+        entry: tuple[int, str, typing.Any],
+    ):
+        if len(buffer) == buffer.maxlen:
+            self.dropped_through[character_id] = buffer[0][0]
+        buffer.append(entry)
 
     async def send(self, character_id: uuid.UUID, message):
         """Send a message to all subscribers for this character."""
+        event_id = self.record(character_id, message)
         if character_id in self.subscriptions:
             # iterate a copy to prevent possible mutation during iteration
             for q in self.subscriptions[character_id].copy():
-                await q.put(message)
+                if self.wants(q, message):
+                    await q.put((event_id, message))
 
     def send_nowait(self, character_id: uuid.UUID, message):
+        event_id = self.record(character_id, message)
         if character_id in self.subscriptions:
             for q in self.subscriptions[character_id].copy():
-                q.put_nowait(message)
+                if self.wants(q, message):
+                    q.put_nowait((event_id, message))
+
+    def record_all(self, message) -> str:
+        seq, event_id = self.next_id()
+        for character_id, buffer in self.buffers.items():
+            self.append(character_id, buffer, (seq, event_id, message))
+        return event_id
 
     async def broadcast(self, message):
         """Send a message to all subscribers blindly."""
-        for channel_list in self.subscriptions.values():
+        event_id = self.record_all(message)
+        for channel_list in list(self.subscriptions.values()):
             for channel in channel_list:
-                await channel.put(message)
+                if self.wants(channel, message):
+                    await channel.put((event_id, message))
 
     def broadcast_nowait(self, message):
+        event_id = self.record_all(message)
         for channel_list in self.subscriptions.values():
             for channel in channel_list:
-                channel.put_nowait(message)
+                if self.wants(channel, message):
+                    channel.put_nowait((event_id, message))
 
     def online(self) -> set[uuid.UUID]:
         """Return a set of all currently online characters."""
         return set(self.subscriptions.keys())
 
+    def who(self) -> list:
+        """Return the presence entries of all online characters."""
+        return list(self.presence.values())
+
     def connected_at(self) -> dict[uuid.UUID, datetime]:
         return self.subscribed_at.copy()
@@ -0,0 +1,96 @@
+import asyncio
+import os
+import uuid
+from pathlib import Path
+
+import asyncpg
+import pytest
+
+import mudforge
+from mudforge.utils import get_config
+
+# Tests that need PostgreSQL run against a throwaway database created on this server,
+# with every migration applied. The role needs CREATEDB. Replica tests also need a
+# streaming standby of the same server.
+TEST_DSN = os.environ.get("MUDFORGE_TEST_DSN", "")
+REPLICA_DSN = os.environ.get("MUDFORGE_TEST_REPLICA_DSN", "")
+MIGRATIONS = Path(mudforge.__file__).parent / "migrations"
+
+requires_postgres = pytest.mark.skipif(
+    not TEST_DSN, reason="MUDFORGE_TEST_DSN is not set"
+)
+requires_replica = pytest.mark.skipif(
+    not (TEST_DSN and REPLICA_DSN),
+    reason="MUDFORGE_TEST_DSN and MUDFORGE_TEST_REPLICA_DSN are not set",
+)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(autouse=True)
+def settings():
+    """
+    The default configuration, fresh for every test.
+    """
+    previous = mudforge.SETTINGS
+    mudforge.SETTINGS = get_config("game")
+    yield mudforge.SETTINGS
+    mudforge.SETTINGS = previous
+
+
+async def _create_database(name: str):
+    conn = await asyncpg.connect(TEST_DSN)
+    try:
+        await conn.execute(f'CREATE DATABASE "{name}"')
+    finally:
+        await conn.close()
+    conn = await asyncpg.connect(TEST_DSN, database=name)
+    try:
+        for migration in sorted(MIGRATIONS.glob("*.sql")):
+            await conn.execute(migration.read_text())
+    finally:
+        await conn.close()
+
+
+async def _drop_database(name: str):
+    conn = await asyncpg.connect(TEST_DSN)
+    try:
+        await conn.execute(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)')
+    finally:
+        await conn.close()
+
+
+@pytest.fixture(scope="session")
+def database():
+    """
+    The name of a freshly migrated database, dropped after the session.
+    """
+    if not TEST_DSN:
+        pytest.skip("MUDFORGE_TEST_DSN is not set")
+    name = f"mudforge_test_{uuid.uuid4().hex[:12]}"
+    asyncio.run(_create_database(name))
+    yield name
+    asyncio.run(_drop_database(name))
+
+
+@pytest.fixture
+async def pool(database, settings):
+    """
+    PGPOOL on the test database, set up the way the game does it.
+    """
+    from mudforge.game.application import init_connection
+
+    settings["POSTGRESQL"]["dsn"] = TEST_DSN
+    created = await asyncpg.create_pool(
+        TEST_DSN, database=database, init=init_connection, min_size=2, max_size=10
+    )
+    previous = mudforge.PGPOOL
+    mudforge.PGPOOL = created
+    try:
+        yield created
+    finally:
+        mudforge.PGPOOL = previous
+        await created.close()
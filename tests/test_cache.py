@@ -0,0 +1,122 @@
+import asyncio
+import types
+import uuid
+
+import pytest
+
+from mudforge.db import cache as cache_module
+from mudforge.db.cache import RowCache, cached
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def cache(monkeypatch, clock):
+    cache = RowCache(ttl=60.0, max_entries=3)
+    monkeypatch.setattr(cache_module, "CACHE", cache)
+    monkeypatch.setattr(cache_module.REPLICAS, "settle", lambda: 0.0)
+    return cache
+
+
+def row(row_id=None):
+    return types.SimpleNamespace(id=row_id or uuid.uuid4())
+
+
+def test_entries_expire_after_the_ttl(cache, clock):
+    cache.store("users", "a", "key", "value")
+    clock.now += 59.0
+    assert cache.get("users", "key") == (True, "value")
+    clock.now += 1.0
+    assert cache.get("users", "key") == (False, None)
+    assert cache.entries == {} and not cache.rows
+    assert cache.stats["users"].snapshot()["hits"] == 1
+
+
+def test_least_recently_used_is_evicted(cache):
+    for key in "abc":
+        cache.store("users", key, key, key)
+    cache.get("users", "a")
+    cache.store("users", "d", "d", "d")
+    assert list(cache.entries) == ["c", "a", "d"]
+    assert cache.stats["users"].evictions == 1
+    assert ("users", "b") not in cache.rows
+
+
+def test_invalidation_drops_every_key_for_the_row(cache):
+    cache.store("characters", "a", ("by_id", "a"), "Bob")
+    cache.store("characters", "a", ("by_name", "bob"), "Bob")
+    cache.store("characters", "b", ("by_id", "b"), "Amy")
+    generation = cache.generation
+    cache.invalidate("characters", "a")
+    assert list(cache.entries) == [("by_id", "b")]
+    assert cache.generation == generation + 1
+    assert cache.stats["characters"].invalidations == 2
+
+
+def test_rows_that_just_changed_are_not_stored(cache, clock, monkeypatch):
+    monkeypatch.setattr(cache_module.REPLICAS, "settle", lambda: 5.0)
+    cache.invalidate("users", "a")
+    # Read on a replica that may not have the change yet.
+    cache.store("users", "a", "key", "stale", started=clock.now)
+    assert cache.get("users", "key") == (False, None)
+    clock.now += 5.0
+    cache.store("users", "a", "key", "fresh", started=clock.now)
+    assert cache.get("users", "key") == (True, "fresh")
+
+
+@pytest.mark.anyio
+async def test_cached_lookups(cache):
+    calls = list()
+
+    @cached("users")
+    async def lookup(row_id, primary=False, deleted=False):
+        calls.append((row_id, primary, deleted))
+        return row(row_id)
+
+    user_id = uuid.uuid4()
+    first = await lookup(user_id)
+    assert await lookup(user_id) is first
+    deleted = await lookup(user_id, deleted=True)
+    assert deleted is not first
+    assert await lookup(user_id, deleted=True) is deleted
+    # Reads from the primary skip the cache.
+    assert await lookup(user_id, primary=True) is not first
+    assert calls == [
+        (user_id, False, False),
+        (user_id, False, True),
+        (user_id, True, False),
+    ]
+
+
+@pytest.mark.anyio
+async def test_invalidated_while_fetching(cache):
+    user_id = uuid.uuid4()
+    fetching, release = asyncio.Event(), asyncio.Event()
+    versions = iter(["old", "new"])
+
+    @cached("users")
+    async def lookup(row_id):
+        fetching.set()
+        await release.wait()
+        return types.SimpleNamespace(id=row_id, version=next(versions))
+
+    task = asyncio.ensure_future(lookup(user_id))
+    await fetching.wait()
+    cache.invalidate("users", user_id)
+    release.set()
+    assert (await task).version == "old"
+    # What it read may predate the change, so it wasn't kept.
+    assert (await lookup(user_id)).version == "new"
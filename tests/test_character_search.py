@@ -0,0 +1,87 @@
+import uuid
+
+import httpx
+import pytest
+
+from mudforge.game.application import Application
+from mudforge.models.auth import TokenResponse
+from mudforge.utils import partial_match
+
+from conftest import requires_postgres
+
+pytestmark = [requires_postgres, pytest.mark.anyio]
+
+
+@pytest.fixture
+async def world(pool):
+    """
+    An admin and a player, each owning some characters, and no other characters.
+    """
+    tag = uuid.uuid4().hex[:8]
+    players = dict()
+    async with pool.acquire() as conn:
+        await conn.execute("DELETE FROM characters")
+        for email, level in (("admin", 1), ("player", 0)):
+            players[email] = await conn.fetchval(
+                "INSERT INTO users (email, admin_level) VALUES ($1, $2) RETURNING id",
+                f"{tag}-{email}@example.com",
+                level,
+            )
+        owned = {
+            "player": ["Bob", "Bobby", "Boba", "Bobbie", "Al_x", "Alex", "A%b"],
+            "admin": ["Bobcat"],
+        }
+        for owner, names in owned.items():
+            for name in names:
+                await conn.execute(
+                    "INSERT INTO characters (name, user_id) VALUES ($1, $2)",
+                    name,
+                    players[owner],
+                )
+
+    app = Application()
+    await app.setup_fastapi()
+    transport = httpx.ASGITransport(app=app.fastapi_instance)
+    async with httpx.AsyncClient(base_url="http://game", transport=transport) as client:
+
+        async def search(who: str, prefix: str, **query) -> list[str]:
+            token = TokenResponse.from_uuid(players[who]).access_token
+            response = await client.get(
+                "/characters/search",
+                params={"prefix": prefix, **query},
+                headers={"Authorization": f"Bearer {token}"},
+            )
+            response.raise_for_status()
+            return [c["name"] for c in response.json()]
+
+        yield search
+
+
+async def test_exact_then_prefix_by_name_then_similar(world):
+    assert await world("admin", "bob") == ["Bob", "Boba", "Bobbie", "Bobby", "Bobcat"]
+    # Similar names come last, most similar first.
+    assert await world("player", "bobby") == ["Bobby", "Bobbie", "Bob", "Boba"]
+    assert await world("player", "bobby", fuzzy="false") == ["Bobby"]
+
+
+async def test_limit_one_agrees_with_partial_match(world):
+    everything = ["Bob", "Bobby", "Boba", "Bobbie", "Al_x", "Alex", "A%b"]
+    for prefix in ("b", "bo", "bobb", "al", "a"):
+        (found,) = await world("player", prefix, limit=1, fuzzy="false")
+        assert found == partial_match(prefix, everything, key=lambda n: n)
+
+
+async def test_wildcards_are_literal(world):
+    assert await world("player", "al_", fuzzy="false") == ["Al_x"]
+    # pg_trgm ignores the underscore, so Alex is similar enough to follow.
+    assert await world("player", "al_") == ["Al_x", "Alex"]
+    assert await world("player", "a%") == ["A%b"]
+    assert await world("player", "%") == []
+
+
+async def test_players_only_search_their_own(world):
+    assert "Bobcat" not in await world("player", "bob")
+    assert "Bobcat" not in await world("player", "bob", mine="false")
+    assert "Bobcat" in await world("admin", "bob")
+    # Bobcat is the admin's own; mine leaves out the player's.
+    assert await world("admin", "bob", mine="true") == ["Bobcat"]
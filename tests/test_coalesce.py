@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from mudforge.db.base import coalesce
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_concurrent_calls_share_one():
+    calls = list()
+
+    @coalesce
+    async def lookup(row_id, deleted=False):
+        calls.append((row_id, deleted))
+        await asyncio.sleep(0.01)
+        return object()
+
+    first, second, other, keyword = await asyncio.gather(
+        lookup(1), lookup(1), lookup(2), lookup(1, deleted=True)
+    )
+    assert first is second
+    assert other is not first and keyword is not first
+    assert sorted(calls) == [(1, False), (1, True), (2, False)]
+    # Nothing in flight now, so the next call runs again.
+    await lookup(1)
+    assert len(calls) == 4
+
+
+async def test_each_caller_gets_its_own_exception():
+    calls = 0
+
+    @coalesce
+    async def lookup(row_id):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise HTTPException(status_code=404, detail="Not found")
+
+    results = await asyncio.gather(
+        *(lookup(1) for _ in range(3)), return_exceptions=True
+    )
+    assert calls == 1
+    assert all(isinstance(e, HTTPException) for e in results)
+    assert [(e.status_code, e.detail) for e in results] == [(404, "Not found")] * 3
+    assert len({id(e) for e in results}) == 3
+    (original,) = {id(e.__cause__) for e in results}
+    assert original not in {id(e) for e in results}
+
+
+async def test_a_cancelled_caller_leaves_the_call_running():
+    release = asyncio.Event()
+
+    @coalesce
+    async def lookup(row_id):
+        await release.wait()
+        return row_id
+
+    first = asyncio.ensure_future(lookup(1))
+    second = asyncio.ensure_future(lookup(1))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+    assert await second == 1
+    with pytest.raises(asyncio.CancelledError):
+        await first
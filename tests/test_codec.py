@@ -0,0 +1,59 @@
+import uuid
+
+import pytest
+
+import mudforge
+from mudforge.events.base import EventBase
+from mudforge.events.characters import CharacterCreated
+from mudforge.events.codec import CompactCodec
+
+
+class Said(EventBase):
+    character_id: uuid.UUID
+    text: str
+
+
+class SaidReordered(EventBase):
+    text: str
+    character_id: uuid.UUID
+
+
+@pytest.fixture
+def events(monkeypatch):
+    events = {"CharacterCreated": CharacterCreated, "Said": Said}
+    monkeypatch.setattr(mudforge, "EVENTS", events)
+    return events
+
+
+def test_table_round_trip(events):
+    game = CompactCodec.from_events()
+    portal = CompactCodec.from_table(game.table())
+    assert portal.version == game.version
+    assert game.table()["fields"]["Said"] == ["happened_at", "character_id", "text"]
+
+    event = Said(character_id=uuid.uuid4(), text="hello")
+    type_id, data = game.encode(event)
+    assert portal.decode(type_id, data) == event
+
+
+def test_version_covers_field_order(events):
+    before = CompactCodec.from_events()
+    events["Said"] = SaidReordered
+    after = CompactCodec.from_events()
+    assert before.names == after.names
+    assert before.version != after.version
+
+
+def test_portal_decodes_onto_the_games_field_order(events):
+    game = CompactCodec.from_events()
+    table = game.table()
+    event = Said(character_id=uuid.uuid4(), text="hello")
+    type_id, data = game.encode(event)
+
+    # The portal's copy of the class has its fields in another order.
+    events["Said"] = SaidReordered
+    portal = CompactCodec.from_table(table)
+    assert portal.version == game.version
+    decoded = portal.decode(type_id, data)
+    assert isinstance(decoded, SaidReordered)
+    assert (decoded.character_id, decoded.text) == (event.character_id, event.text)
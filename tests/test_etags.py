@@ -0,0 +1,70 @@
+import datetime
+import uuid
+
+from fastapi import Request
+
+from mudforge.models.characters import CharacterModel
+from mudforge.rest.utils import conditional_response, etag_matches, make_etag
+
+NOW = datetime.datetime.now(datetime.timezone.utc)
+
+
+def request(if_none_match: str | None = None) -> Request:
+    headers = list()
+    if if_none_match is not None:
+        headers.append((b"if-none-match", if_none_match.encode()))
+    return Request({"type": "http", "method": "GET", "headers": headers})
+
+
+def character(name: str = "Bob") -> CharacterModel:
+    return CharacterModel(
+        id=uuid.uuid4(),
+        user_id=uuid.uuid4(),
+        name=name,
+        created_at=NOW,
+        updated_at=NOW,
+        last_active_at=NOW,
+        deleted_at=None,
+    )
+
+
+def test_etag_follows_the_body():
+    assert make_etag(b'{"a":1}') == make_etag(b'{"a":1}')
+    assert make_etag(b'{"a":1}') != make_etag(b'{"a":2}')
+    assert make_etag(b"").startswith('"') and make_etag(b"").endswith('"')
+
+
+def test_if_none_match_forms():
+    etag = make_etag(b"body")
+    assert not etag_matches(request(), etag)
+    assert etag_matches(request(etag), etag)
+    assert etag_matches(request(f"W/{etag}"), etag)
+    assert etag_matches(request(f'"other", {etag}'), etag)
+    assert etag_matches(request("*"), etag)
+    assert not etag_matches(request('"other", W/"another"'), etag)
+
+
+def test_conditional_response():
+    bob = character()
+    first = conditional_response(request(), bob)
+    assert first.status_code == 200
+    assert CharacterModel.model_validate_json(first.body) == bob
+    etag = first.headers["ETag"]
+
+    again = conditional_response(request(etag), bob)
+    assert again.status_code == 304
+    assert again.body == b""
+    assert again.headers["ETag"] == etag
+
+    renamed = bob.model_copy(update={"name": "Robert"})
+    changed = conditional_response(request(etag), renamed)
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_conditional_list_response():
+    characters = [character("Bob"), character("Amy")]
+    first = conditional_response(request(), characters)
+    assert first.body.startswith(b"[") and first.body.endswith(b"]")
+    again = conditional_response(request(first.headers["ETag"]), characters)
+    assert again.status_code == 304
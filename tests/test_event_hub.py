@@ -0,0 +1,88 @@
+import uuid
+
+import pytest
+from loguru import logger
+
+from mudforge.utils import EventHub
+
+
+@pytest.fixture
+def warnings():
+    messages = list()
+    handler = logger.add(messages.append, level="WARNING", format="{message}")
+    yield messages
+    logger.remove(handler)
+
+
+def drain(q) -> list:
+    events = list()
+    while not q.empty():
+        events.append(q.get_nowait())
+    return events
+
+
+def test_replays_what_came_after_the_last_event_id():
+    hub = EventHub()
+    character_id = uuid.uuid4()
+    q = hub.subscribe(character_id)
+    for n in range(5):
+        hub.send_nowait(character_id, n)
+    seen = drain(q)
+    hub.unsubscribe(character_id, q)
+    hub.send_nowait(character_id, 5)
+
+    resumed = hub.subscribe(character_id, last_event_id=seen[2][0])
+    assert [message for _, message in drain(resumed)] == [3, 4, 5]
+
+
+def test_ignores_ids_from_another_boot():
+    hub = EventHub()
+    character_id = uuid.uuid4()
+    hub.subscribe(character_id)
+    hub.send_nowait(character_id, "hello")
+    assert drain(hub.subscribe(character_id, last_event_id="0-1")) == []
+
+
+def test_gaps_from_other_characters_are_not_losses(warnings):
+    hub = EventHub(buffer_size=2)
+    bob, amy = uuid.uuid4(), uuid.uuid4()
+    q = hub.subscribe(bob)
+    hub.subscribe(amy)
+    hub.send_nowait(bob, "first")
+    (last_id, _), = drain(q)
+    for n in range(10):
+        hub.send_nowait(amy, n)
+    hub.send_nowait(bob, "second")
+    hub.send_nowait(bob, "third")
+
+    resumed = hub.subscribe(bob, last_event_id=last_id)
+    assert [message for _, message in drain(resumed)] == ["second", "third"]
+    assert warnings == []
+
+
+def test_warns_when_the_buffer_dropped_unseen_events(warnings):
+    hub = EventHub(buffer_size=2)
+    character_id = uuid.uuid4()
+    q = hub.subscribe(character_id)
+    hub.send_nowait(character_id, 0)
+    (last_id, _), = drain(q)
+    for n in range(1, 5):
+        hub.send_nowait(character_id, n)
+
+    resumed = hub.subscribe(character_id, last_event_id=last_id)
+    assert [message for _, message in drain(resumed)] == [3, 4]
+    assert "no longer holds" in "".join(warnings)
+
+
+def test_broadcasts_evict_too(warnings):
+    hub = EventHub(buffer_size=2)
+    character_id = uuid.uuid4()
+    q = hub.subscribe(character_id)
+    hub.send_nowait(character_id, "mine")
+    (last_id, _), = drain(q)
+    for n in range(3):
+        hub.broadcast_nowait(n)
+
+    resumed = hub.subscribe(character_id, last_event_id=last_id)
+    assert [message for _, message in drain(resumed)] == [1, 2]
+    assert "no longer holds" in "".join(warnings)
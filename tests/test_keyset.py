@@ -0,0 +1,113 @@
+import asyncio
+import contextlib
+import time
+import uuid
+
+import pytest
+
+import mudforge
+from mudforge.db import characters as characters_db
+from mudforge.db.base import from_pool
+
+
+class FakePool:
+    """
+    Stands in for PGPOOL: size connections, each query taking a couple of
+    milliseconds, answering the characters keyset queries from rows.
+    """
+
+    def __init__(self, size: int, rows: list[dict]):
+        self.slots = asyncio.Semaphore(size)
+        self.rows = rows
+        self.held = 0
+        self.peak = 0
+        self.queries: list[tuple] = list()
+
+    @contextlib.asynccontextmanager
+    async def acquire(self):
+        async with self.slots:
+            self.held += 1
+            self.peak = max(self.peak, self.held)
+            try:
+                yield self
+            finally:
+                self.held -= 1
+
+    async def fetch(self, sql, *args):
+        self.queries.append((sql, args))
+        await asyncio.sleep(0.002)
+        if sql == characters_db.LIST_CHARACTERS_FIRST:
+            (size,) = args
+            return self.rows[:size]
+        assert sql == characters_db.LIST_CHARACTERS_AFTER
+        after, size = args
+        return [r for r in self.rows if r["id"] > after][:size]
+
+    async def fetchval(self, sql, *args):
+        await asyncio.sleep(0.002)
+        return 1
+
+
+@from_pool
+async def probe(conn):
+    return await conn.fetchval("SELECT 1")
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    rows = sorted(
+        ({"id": uuid.uuid4(), "name": f"c{i}"} for i in range(2000)),
+        key=lambda r: r["id"],
+    )
+    fake = FakePool(10, rows)
+    monkeypatch.setattr(mudforge, "PGPOOL", fake)
+    return fake
+
+
+@pytest.mark.anyio
+async def test_pages_use_the_first_and_after_queries(pool):
+    seen = [row["id"] async for row in characters_db.list_characters(raw=True)]
+    assert seen == [r["id"] for r in pool.rows]
+    first, *rest = pool.queries
+    assert first == (characters_db.LIST_CHARACTERS_FIRST, (500,))
+    assert [sql for sql, _ in rest] == [characters_db.LIST_CHARACTERS_AFTER] * 4
+    assert [args[0] for _, args in rest] == [
+        pool.rows[i]["id"] for i in (499, 999, 1499, 1999)
+    ]
+
+
+@pytest.mark.anyio
+async def test_pool_stays_healthy_with_50_slow_readers(pool):
+    async def slow_reader():
+        count = 0
+        async for _ in characters_db.list_characters(raw=True):
+            count += 1
+            if count % 100 == 0:
+                # A client reading slowly: the response stalls between chunks.
+                await asyncio.sleep(0.05)
+        return count
+
+    waits = list()
+
+    async def prober(stop: asyncio.Event):
+        while not stop.is_set():
+            started = time.perf_counter()
+            await probe()
+            waits.append(time.perf_counter() - started)
+            await asyncio.sleep(0.01)
+
+    stop = asyncio.Event()
+    probing = asyncio.create_task(prober(stop))
+    started = time.perf_counter()
+    counts = await asyncio.gather(*(slow_reader() for _ in range(50)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probing
+
+    assert counts == [2000] * 50
+    # Each reader spends about a second stalled; they run side by side.
+    assert elapsed < 5
+    assert pool.peak <= 10
+    # Other queries still get a connection promptly while all 50 are mid-stream.
+    assert len(waits) > 20
+    assert max(waits) < 0.25
@@ -0,0 +1,51 @@
+import datetime
+import uuid
+
+import orjson
+import pytest
+
+from mudforge.models.characters import CharacterModel
+from mudforge.rest.utils import _dump_json, json_array_generator, list_page
+
+pytestmark = pytest.mark.anyio
+
+NOW = datetime.datetime(2026, 10, 19, 12, 30, 15, 250000, tzinfo=datetime.timezone.utc)
+
+
+def row() -> dict:
+    # What asyncpg hands back for a characters row: timestamptz as aware UTC.
+    return {
+        "id": uuid.uuid4(),
+        "user_id": uuid.uuid4(),
+        "name": "Bob",
+        "created_at": NOW,
+        "last_active_at": NOW,
+        "updated_at": NOW,
+        "deleted_at": None,
+    }
+
+
+async def rows_of(items):
+    for item in items:
+        yield item
+
+
+async def test_raw_rows_serialize_like_models():
+    raw = [row(), row()]
+    models = [CharacterModel(**r) for r in raw]
+    expected = _dump_json(models)
+    assert b'"2026-10-19T12:30:15.250000Z"' in expected
+
+    # Field order may differ; the values, datetimes included, may not.
+    for items in (raw, models):
+        page = await list_page(rows_of(items), limit=10)
+        assert orjson.loads(page.body) == orjson.loads(expected)
+        streamed = b"".join([c async for c in json_array_generator(rows_of(items))])
+        assert orjson.loads(streamed) == orjson.loads(expected)
+
+
+async def test_full_pages_point_at_the_next():
+    raw = [row(), row()]
+    page = await list_page(rows_of(raw), limit=2)
+    assert page.headers["X-Next-After"] == str(raw[-1]["id"])
+    assert "X-Next-After" not in (await list_page(rows_of(raw), limit=3)).headers
@@ -0,0 +1,167 @@
+import asyncio
+import contextlib
+import datetime
+import time
+import uuid
+
+import orjson
+import pytest
+from fastapi import HTTPException
+
+import mudforge
+from mudforge.db import characters as characters_db, users as users_db
+from mudforge.db import replicas as replicas_module
+from mudforge.db.cache import CACHE
+from mudforge.db.replicas import Replica, ReplicaSet
+from mudforge.game.listeners import PresenceListener
+from mudforge.models.characters import ActiveAs, CharacterModel, Presence
+from mudforge.models.users import UserModel
+from mudforge.utils import EventHub
+
+from conftest import requires_postgres
+
+NOW = datetime.datetime.now(datetime.timezone.utc)
+
+
+def active_as(name: str) -> ActiveAs:
+    user = UserModel.model_construct(
+        id=uuid.uuid4(),
+        email=f"{name.lower()}@example.com",
+        display_name=None,
+        admin_level=0,
+    )
+    character = CharacterModel.model_construct(
+        id=uuid.uuid4(), user_id=user.id, name=name, last_active_at=NOW
+    )
+    return ActiveAs(user=user, character=character)
+
+
+@pytest.fixture
+def hub(monkeypatch):
+    hub = EventHub()
+    monkeypatch.setattr(mudforge, "EVENT_HUB", hub)
+    return hub
+
+
+def test_presence_carries_no_email(hub):
+    acting = active_as("Bob")
+    hub.subscribe(acting.character.id, presence=Presence.from_active(acting))
+    (entry,) = hub.who()
+    assert entry.character_name == "Bob"
+    assert entry.user_id == acting.user.id
+    assert "email" not in entry.model_dump()
+
+
+@pytest.mark.anyio
+async def test_listener_follows_renames_and_deletions(hub, monkeypatch):
+    bob, amy = active_as("Bob"), active_as("Amy")
+    for acting in (bob, amy):
+        hub.subscribe(acting.character.id, presence=Presence.from_active(acting))
+    rows = {
+        bob.character.id: bob.character.model_copy(update={"name": "Robert"}),
+        bob.user.id: bob.user.model_copy(update={"display_name": "Rob"}),
+    }
+
+    async def find(row_id, primary=False):
+        if row_id not in rows:
+            raise HTTPException(status_code=404)
+        return rows[row_id]
+
+    monkeypatch.setattr(characters_db, "find_character_id", find)
+    monkeypatch.setattr(users_db, "get_user", find)
+    listener = PresenceListener()
+
+    await listener.on_update("characters", str(bob.character.id))
+    await listener.on_update("users", str(bob.user.id))
+    await listener.on_delete("characters", str(amy.character.id))
+
+    (entry,) = hub.who()
+    assert (entry.character_name, entry.display_name) == ("Robert", "Rob")
+
+
+class CharacterPool:
+    """
+    A pool whose only row is one character, under the given name.
+    """
+
+    def __init__(self, character: CharacterModel, name: str):
+        self.row = character.model_dump() | {"name": name}
+
+    async def acquire(self, timeout=None):
+        return self
+
+    async def release(self, conn):
+        pass
+
+    async def fetchrow(self, sql, *args):
+        return self.row
+
+
+class PrimaryPool(CharacterPool):
+    @contextlib.asynccontextmanager
+    async def acquire(self):
+        yield self
+
+
+@pytest.mark.anyio
+async def test_listener_reads_renames_from_the_primary(hub, monkeypatch):
+    bob = active_as("Bob")
+    character = bob.character.model_copy(
+        update={"created_at": NOW, "updated_at": NOW, "deleted_at": None}
+    )
+    hub.subscribe(character.id, presence=Presence.from_active(bob))
+    # Another process renamed Bob. The replica hasn't replayed that yet, but this
+    # process hasn't written anything, so it counts as usable for ordinary reads.
+    replica = Replica(name="replica0", dsn="", pool=CharacterPool(character, "Bob"))
+    replica.healthy = True
+    replica.synced_at = time.monotonic()
+    replica_set = ReplicaSet()
+    replica_set.replicas = [replica]
+    monkeypatch.setattr(replicas_module, "REPLICAS", replica_set)
+    monkeypatch.setattr("mudforge.db.base.REPLICAS", replica_set)
+    monkeypatch.setattr(mudforge, "PGPOOL", PrimaryPool(character, "Robert"))
+    CACHE.clear()
+    assert (await characters_db.find_character_id(character.id)).name == "Bob"
+
+    await PresenceListener().on_update("characters", str(character.id))
+
+    (entry,) = hub.who()
+    assert entry.character_name == "Robert"
+    CACHE.clear()
+
+
+@requires_postgres
+@pytest.mark.anyio
+async def test_last_active_at_updates_do_not_notify(pool):
+    received = list()
+    async with pool.acquire() as conn:
+        user_id = await conn.fetchval(
+            "INSERT INTO users (email) VALUES ($1) RETURNING id",
+            f"{uuid.uuid4().hex[:8]}@example.com",
+        )
+        character_id = await conn.fetchval(
+            "INSERT INTO characters (name, user_id) VALUES ($1, $2) RETURNING id",
+            f"Idle{uuid.uuid4().hex[:8]}",
+            user_id,
+        )
+
+    def notified(conn, pid, channel, payload):
+        received.append(orjson.loads(payload))
+
+    async with pool.acquire() as listening:
+        await listening.add_listener("table_changes", notified)
+        async with pool.acquire() as conn:
+            await conn.execute(
+                "UPDATE characters SET last_active_at = now() WHERE id = $1",
+                character_id,
+            )
+            await conn.execute(
+                "UPDATE characters SET name = $2 WHERE id = $1",
+                character_id,
+                f"Busy{uuid.uuid4().hex[:8]}",
+            )
+        await asyncio.sleep(0.5)
+        await listening.remove_listener("table_changes", notified)
+
+    changes = [r for r in received if r["id"] == str(character_id)]
+    assert [r["operation"] for r in changes] == ["UPDATE"]
@@ -0,0 +1,146 @@
+import contextlib
+import uuid
+
+import asyncpg
+import pytest
+from loguru import logger
+
+import mudforge
+from mudforge.db.loginrecords import (
+    PARTITIONED,
+    LoginRecordMaintenance,
+    LoginRecordWriter,
+)
+
+from conftest import requires_postgres
+
+
+class FakePool:
+    """
+    Stands in for PGPOOL. COPY is all-or-nothing, like the real one: a batch holding
+    a record with a bad ip_address writes nothing.
+    """
+
+    def __init__(self):
+        self.written: list[tuple] = list()
+        self.copies = 0
+        self.down = False
+
+    @contextlib.asynccontextmanager
+    async def acquire(self):
+        yield self
+
+    async def copy_records_to_table(self, table, records, columns):
+        self.copies += 1
+        if self.down:
+            raise ConnectionResetError("connection lost")
+        if any(r[1] == "not-an-ip" for r in records):
+            raise asyncpg.DataError("invalid input syntax for type inet")
+        self.written.extend(records)
+
+
+@pytest.fixture
+def writer(settings, monkeypatch):
+    settings["GAME"]["login_records"] = {"batch_size": 64, "max_buffer": 100}
+    pool = FakePool()
+    monkeypatch.setattr(mudforge, "PGPOOL", pool)
+    return LoginRecordWriter(), pool
+
+
+def fill(writer: LoginRecordWriter, count: int, bad: set[int] = frozenset()):
+    for i in range(count):
+        writer.add(uuid.uuid4(), "not-an-ip" if i in bad else "192.0.2.1", True, str(i))
+
+
+@pytest.mark.anyio
+async def test_bad_rows_are_dropped_and_the_rest_written(writer):
+    writer, pool = writer
+    fill(writer, 64, bad={5, 40})
+    await writer.flush()
+    assert len(pool.written) == 62
+    assert writer.rejected == 2
+    assert not writer.buffer
+    # Bisecting costs a few COPYs, not one per row.
+    assert pool.copies < 30
+
+
+@pytest.mark.anyio
+async def test_connection_errors_keep_the_batch(writer):
+    writer, pool = writer
+    fill(writer, 10)
+    pool.down = True
+    await writer.flush()
+    assert pool.written == []
+    assert [r[3] for r in writer.buffer] == [str(i) for i in range(10)]
+    pool.down = False
+    await writer.flush()
+    assert [r[3] for r in pool.written] == [str(i) for i in range(10)]
+
+
+@pytest.mark.anyio
+async def test_requeue_into_a_full_buffer_drops_the_oldest(writer):
+    writer, pool = writer
+    batch = [(uuid.uuid4(), "192.0.2.1", True, f"old{i}", None) for i in range(10)]
+    fill(writer, 95)
+    writer.requeue(batch)
+    assert len(writer.buffer) == 100
+    assert writer.dropped == 5
+    assert writer.buffer[0][3] == "old5"
+    assert writer.buffer[-1][3] == "94"
+
+
+class UnpartitionedPool:
+    """
+    Stands in for PGPOOL on a database without 003_partition_loginrecords.sql.
+    """
+
+    def __init__(self):
+        self.queries: list[str] = list()
+
+    @contextlib.asynccontextmanager
+    async def acquire(self):
+        yield self
+
+    async def fetchval(self, sql, *args):
+        self.queries.append(sql)
+        return False
+
+
+@pytest.mark.anyio
+async def test_maintenance_skips_an_unpartitioned_table(monkeypatch):
+    pool = UnpartitionedPool()
+    monkeypatch.setattr(mudforge, "PGPOOL", pool)
+    messages = list()
+    handler = logger.add(messages.append, level="WARNING", format="{message}")
+    try:
+        maintenance = LoginRecordMaintenance()
+        await maintenance.maintain()
+        await maintenance.maintain()
+    finally:
+        logger.remove(handler)
+    # Only the check ran, once per pass.
+    assert pool.queries == [PARTITIONED, PARTITIONED]
+    assert len(messages) == 1
+
+
+@requires_postgres
+@pytest.mark.anyio
+async def test_rows_in_the_default_partition_move_to_their_month(pool, settings):
+    settings["GAME"]["login_records"] = {"partitions_ahead": 30}
+    async with pool.acquire() as conn:
+        user_id = await conn.fetchval(
+            "INSERT INTO users (email) VALUES ($1) RETURNING id",
+            f"{uuid.uuid4().hex[:8]}@example.com",
+        )
+        # Past the partitions 003 created, so it lands in loginrecords_default.
+        await conn.execute(
+            "INSERT INTO loginrecords (user_id, created_at, ip_address, user_agent,"
+            " success) VALUES ($1, now() + interval '2 years', '192.0.2.1', '', true)",
+            user_id,
+        )
+        await LoginRecordMaintenance().maintain()
+        partition = await conn.fetchval(
+            "SELECT tableoid::regclass::text FROM loginrecords WHERE user_id = $1",
+            user_id,
+        )
+    assert partition.startswith("loginrecords_y")
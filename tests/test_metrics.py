@@ -0,0 +1,136 @@
+import time
+import uuid
+
+import httpx
+import pytest
+from loguru import logger
+
+from mudforge.db import metrics
+from mudforge.db import users as users_db
+from mudforge.db.metrics import BUCKETS, Histogram
+from mudforge.game.application import Application
+from mudforge.models.auth import TokenResponse
+from mudforge.models.users import UserModel
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    monkeypatch.setattr(metrics, "SLOW_QUERY_SECONDS", 0.25)
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+@pytest.fixture
+def warnings():
+    messages = list()
+    handler = logger.add(messages.append, level="WARNING", format="{message}")
+    yield messages
+    logger.remove(handler)
+
+
+def test_histogram_buckets():
+    histogram = Histogram()
+    # Bounds are inclusive: 1 ms lands in le_1, just over it in le_2.
+    for ms in (0.5, 1.0, 1.5, 5.0, 7000.0):
+        histogram.observe(ms / 1000)
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 5
+    assert snapshot["buckets"]["le_1"] == 2
+    assert snapshot["buckets"]["le_2"] == 1
+    assert snapshot["buckets"]["le_5"] == 1
+    assert snapshot["buckets"]["inf"] == 1
+    assert sum(snapshot["buckets"].values()) == 5
+    assert len(snapshot["buckets"]) == len(BUCKETS) + 1
+    assert snapshot["max_ms"] == pytest.approx(7000.0)
+    assert snapshot["mean_ms"] == pytest.approx(7008.0 / 5)
+
+
+def test_histogram_quantiles():
+    histogram = Histogram()
+    assert histogram.quantile(0.5) == 0.0
+    for _ in range(98):
+        histogram.observe(0.003)
+    histogram.observe(0.040)
+    histogram.observe(0.300)
+    assert histogram.quantile(0.5) == 5
+    assert histogram.quantile(0.99) == 50
+    # Never past the slowest call, even mid-bucket or in the last one.
+    assert histogram.quantile(1.0) == pytest.approx(300.0)
+    histogram.observe(9.0)
+    assert histogram.quantile(1.0) == pytest.approx(9000.0)
+
+
+def test_disabled_measurements_record_nothing(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", False)
+    metrics.reset()
+    with metrics.measure("users.get_user") as measurement:
+        measurement.connected()
+        measurement.rows += 1
+    assert measurement is metrics.measure("characters.find_character_id")
+    assert metrics.snapshot() == {}
+
+
+def test_measurements(enabled):
+    with metrics.measure("users.get_user") as measurement:
+        measurement.connected()
+        measurement.rows = 3
+    with pytest.raises(ValueError):
+        with metrics.measure("users.get_user"):
+            raise ValueError
+    snapshot = metrics.snapshot()["users.get_user"]
+    assert (snapshot["calls"], snapshot["errors"], snapshot["rows"]) == (2, 1, 3)
+    assert snapshot["slow"] == 0
+
+
+def test_slow_queries_are_logged(enabled, warnings, monkeypatch):
+    monkeypatch.setattr(metrics, "SLOW_QUERY_SECONDS", 0.05)
+    started = time.perf_counter()
+    metrics.record("users.get_user", started - 0.01, started - 0.01, 1)
+    assert warnings == []
+    metrics.record("users.get_user", started - 0.06, started - 0.05, 1)
+    assert metrics.METRICS["users.get_user"].slow == 1
+    (message,) = warnings
+    assert message.startswith("Slow query: users.get_user took")
+    assert "waiting for a connection" in message
+
+
+def test_configure_reads_milliseconds(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", False)
+    monkeypatch.setattr(metrics, "SLOW_QUERY_SECONDS", 0.25)
+    metrics.configure({"enabled": True, "slow_query_ms": 100})
+    assert (metrics.ENABLED, metrics.SLOW_QUERY_SECONDS) == (True, 0.1)
+
+
+@pytest.mark.anyio
+async def test_metrics_are_admin_only(monkeypatch):
+    users = {
+        level: UserModel.model_construct(
+            id=uuid.uuid4(), email=f"level{level}@example.com", admin_level=level
+        )
+        for level in (0, 1)
+    }
+    by_id = {user.id: user for user in users.values()}
+
+    async def get_user(user_id, primary=False):
+        return by_id[user_id]
+
+    monkeypatch.setattr(users_db, "get_user", get_user)
+    app = Application()
+    await app.setup_fastapi()
+    transport = httpx.ASGITransport(app=app.fastapi_instance)
+    async with httpx.AsyncClient(base_url="http://game", transport=transport) as client:
+
+        async def get(level: int | None) -> httpx.Response:
+            headers = dict()
+            if level is not None:
+                token = TokenResponse.from_uuid(users[level].id).access_token
+                headers["Authorization"] = f"Bearer {token}"
+            return await client.get("/system/metrics", headers=headers)
+
+        assert (await get(None)).status_code == 401
+        assert (await get(0)).status_code == 403
+        response = await get(1)
+        assert response.status_code == 200
+        assert {"enabled", "queries", "cache"} <= set(response.json())
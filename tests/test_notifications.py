@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+import mudforge
+from mudforge.db.cache import CACHE
+from mudforge.game.listeners import CacheListener
+from mudforge.game.notifications import ChangeFeed, NotificationDispatcher
+
+
+class RecordingDispatcher:
+    def __init__(self):
+        self.submitted: list[tuple] = list()
+
+    def submit(self, table, operation, id):
+        self.submitted.append((table, operation, id))
+
+
+class FakeOutboxConnection:
+    """
+    The ChangeFeed's connection, with change_outbox held in memory.
+    """
+
+    def __init__(self, rows: list[dict] | None = None):
+        self.rows = rows
+        self.pruned = 0
+        self.on_terminate = None
+
+    def add_termination_listener(self, callback):
+        self.on_terminate = callback
+
+    async def add_listener(self, channel, callback):
+        pass
+
+    async def fetchval(self, sql, *args):
+        if "to_regclass" in sql:
+            return self.rows is not None
+        if "min(id)" in sql:
+            return min((r["id"] for r in self.rows), default=None)
+        if "max(id)" in sql:
+            return max((r["id"] for r in self.rows), default=0)
+        return 1
+
+    async def fetch(self, sql, after):
+        return [r for r in sorted(self.rows, key=lambda r: r["id"]) if r["id"] > after]
+
+    async def execute(self, sql, *args):
+        assert sql.startswith("DELETE FROM change_outbox")
+        self.pruned += 1
+        if self.pruned == 2:
+            self.on_terminate(self)
+
+
+def row(id: int, row_id: str) -> dict:
+    return dict(id=id, table_name="characters", operation="UPDATE", row_id=row_id)
+
+
+@pytest.fixture
+def feed(monkeypatch):
+    monkeypatch.setattr(mudforge, "LISTENERS_TABLE", {"characters": [object()]})
+    dispatcher = RecordingDispatcher()
+    settings = {"outbox": True, "outbox_replay_margin": 10}
+    return ChangeFeed(dispatcher, settings), dispatcher
+
+
+@pytest.mark.anyio
+async def test_replay_catches_changes_that_committed_out_of_order(feed):
+    feed, dispatcher = feed
+    feed.has_outbox = True
+    feed.last_outbox_id = 105
+    # 103 committed after 105 had been seen; LISTEN was down by then.
+    conn = FakeOutboxConnection([row(i, f"c{i}") for i in range(101, 107)])
+    assert await feed.replay(conn)
+    replayed = [id for _, _, id in dispatcher.submitted]
+    assert "c103" in replayed and "c106" in replayed
+    assert feed.last_outbox_id == 106
+
+
+@pytest.mark.anyio
+async def test_replay_gives_up_when_the_gap_was_pruned(feed):
+    feed, dispatcher = feed
+    feed.has_outbox = True
+    feed.last_outbox_id = 100
+    assert not await feed.replay(FakeOutboxConnection([row(150, "c150")]))
+    assert dispatcher.submitted == []
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("outbox", [True, False])
+async def test_outbox_is_pruned_whether_or_not_it_is_replayed(feed, outbox):
+    feed, _ = feed
+    feed.outbox = outbox
+    feed.health_interval = 0.01
+    conn = FakeOutboxConnection([row(1, "c1")])
+    async with asyncio.timeout(5):
+        await feed.listen(conn)
+    assert feed.has_outbox
+    assert conn.pruned == 2
+
+
+@pytest.mark.anyio
+async def test_nothing_is_pruned_without_the_outbox_table(feed):
+    feed, _ = feed
+    feed.health_interval = 0.01
+    conn = FakeOutboxConnection(None)
+    listening = asyncio.create_task(feed.listen(conn))
+    await asyncio.sleep(0.1)
+    conn.on_terminate(conn)
+    await listening
+    assert not feed.has_outbox
+    assert conn.pruned == 0
+
+
+@pytest.mark.anyio
+async def test_cache_is_invalidated_before_the_window(monkeypatch):
+    monkeypatch.setattr(mudforge, "LISTENERS_TABLE", {"users": [CacheListener()]})
+    CACHE.clear()
+    CACHE.store("users", "u1", ("users.get_user", ("u1",)), "stale")
+    dispatcher = NotificationDispatcher(window=60.0)
+
+    dispatcher.submit("users", "UPDATE", "u1")
+
+    assert CACHE.get("users", ("users.get_user", ("u1",))) == (False, None)
+    assert ("users", "u1") in dispatcher.pending
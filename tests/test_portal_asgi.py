@@ -0,0 +1,49 @@
+import asyncio
+from collections import defaultdict
+
+import pytest
+
+import mudforge
+from mudforge.db.activity import ActivityTracker
+from mudforge.db.loginrecords import LoginRecordWriter
+from mudforge.game import application as game_application
+from mudforge.portal.application import Application as PortalApplication
+
+
+class EmbeddedGame(game_application.Application):
+    async def setup_asyncpg(self):
+        # No database here; nothing in this test queries one.
+        pass
+
+
+@pytest.mark.anyio
+async def test_asgi_mode_runs_game_services_without_serving(settings, monkeypatch):
+    settings["PORTAL"]["networking"]["game_transport"] = "asgi"
+    settings["PORTAL"]["services"] = dict()
+    settings["GAME"]["classes"]["application"] = f"{__name__}.EmbeddedGame"
+    served = list()
+
+    async def serve(*args, **kwargs):
+        served.append(args)
+
+    monkeypatch.setattr(game_application, "serve", serve)
+    monkeypatch.setattr(mudforge, "SERVICES", dict())
+    monkeypatch.setattr(mudforge, "LISTENERS", dict())
+    monkeypatch.setattr(mudforge, "LISTENERS_TABLE", defaultdict(list))
+
+    portal = PortalApplication()
+    await portal.setup()
+    running = asyncio.create_task(portal.run())
+    await asyncio.sleep(0.1)
+
+    assert portal.game.serve_http is False
+    assert served == []
+    writer = mudforge.SERVICES["loginrecords"]
+    tracker = mudforge.SERVICES["activity"]
+    assert isinstance(writer, LoginRecordWriter) and writer.running
+    assert isinstance(tracker, ActivityTracker) and tracker.running
+
+    portal.shutdown()
+    with pytest.raises(asyncio.CancelledError):
+        await running
+    assert not writer.running
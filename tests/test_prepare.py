@@ -0,0 +1,42 @@
+import asyncpg
+import pytest
+from loguru import logger
+
+from mudforge.db import base
+
+
+class FakeConnection:
+    def __init__(self, failing: set[str] = frozenset()):
+        self.failing = failing
+        self.prepared: list[str] = list()
+
+    async def prepare(self, sql):
+        if sql in self.failing:
+            raise asyncpg.UndefinedFunctionError("function similarity does not exist")
+        self.prepared.append(sql)
+
+
+@pytest.fixture
+def queries(monkeypatch):
+    queries = {"ok.one": "SELECT 1", "ok.two": "SELECT 2", "bad": "SELECT bad()"}
+    monkeypatch.setattr(base, "QUERIES", queries)
+    monkeypatch.setattr(base, "UNPREPARED", set())
+    return queries
+
+
+@pytest.fixture
+def logged():
+    messages = list()
+    handler = logger.add(messages.append, level="WARNING", format="{message}")
+    yield messages
+    logger.remove(handler)
+
+
+@pytest.mark.anyio
+async def test_failing_query_is_logged_once(queries, logged):
+    connections = [FakeConnection({queries["bad"]}) for _ in range(3)]
+    counts = [await base.prepare_queries(conn) for conn in connections]
+    assert counts == [2, 2, 2]
+    assert all(c.prepared == ["SELECT 1", "SELECT 2"] for c in connections)
+    assert len(logged) == 1 and "bad" in logged[0]
+
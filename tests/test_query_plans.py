@@ -0,0 +1,159 @@
+"""
+EXPLAIN (FORMAT JSON) checks for the registered queries (see register_query): on
+tables seeded to a realistic size and analyzed, each read must use its index under
+the generic plan it gets once prepared on every connection. A plan that only walks an
+index in order, or scans the table, fails here rather than in production.
+"""
+
+import asyncio
+import re
+
+import asyncpg
+import orjson
+import pytest
+
+from mudforge.db import activity, auth, characters, loginrecords, users  # noqa: F401
+from mudforge.db.base import QUERIES
+
+from conftest import TEST_DSN, requires_postgres
+
+USERS = 100_000
+CHARACTERS = 1_000_000
+
+# Names are letters drawn from an md5, so prefixes and trigrams spread the way real
+# names do; one character in 20 is soft-deleted.
+SEED = f"""
+INSERT INTO users (email, display_name, created_at)
+SELECT 'seed' || i || '@plans.example.com', 'Seed' || i, now() - i * interval '1 minute'
+FROM generate_series(1, {USERS}) AS i;
+
+INSERT INTO characters (user_id, name, deleted_at)
+SELECT u.id,
+       initcap(translate(substr(md5(i::text), 1, 10), '0123456789', 'ghijklmnop'))
+           || i,
+       CASE WHEN i % 20 = 0 THEN now() END
+FROM generate_series(1, {CHARACTERS}) AS i
+         JOIN LATERAL (
+    SELECT id FROM users
+    WHERE email = 'seed' || (i % {USERS} + 1) || '@plans.example.com'
+) u ON true;
+"""
+UNSEED = """
+DELETE FROM characters
+WHERE user_id IN (SELECT id FROM users WHERE email LIKE '%@plans.example.com');
+DELETE FROM users WHERE email LIKE '%@plans.example.com';
+"""
+
+# Query name: the indexes it must search with an Index Cond. Where the planner may
+# fairly pick either of two indexes, each choice is listed.
+SEARCHED = {
+    "users.get": [{"users_pkey"}],
+    "users.find": [{"users_email_key"}],
+    "users.list_after": [{"users_pkey"}],
+    "auth.find_user_password": [{"users_email_key"}],
+    "characters.find_name": [{"unique_character_name"}],
+    "characters.find_id": [{"characters_pkey"}],
+    "characters.list_after": [{"characters_pkey"}],
+    "characters.list_user": [{"characters_user_id_active"}],
+    "characters.search": [{"characters_name_prefix"}],
+    "characters.search_fuzzy": [{"characters_name_prefix", "characters_name_trgm"}],
+    "characters.search_mine": [
+        {"characters_user_id_active"},
+        {"characters_name_prefix"},
+    ],
+    "characters.search_mine_fuzzy": [
+        {"characters_user_id_active"},
+        {"characters_name_prefix", "characters_name_trgm"},
+    ],
+    "activity.update_last_active": [{"characters_pkey"}],
+}
+# Query name: the index it reads in order, for ORDER BY ... LIMIT.
+ORDERED = {
+    "users.list_first": "users_pkey",
+    "characters.list_first": "characters_pkey",
+}
+# Writes and one-row probes, with nothing to search.
+UNPLANNED = {
+    "auth.any_user",
+    "auth.register",
+    "auth.insert_password",
+    "auth.set_current_password",
+    "characters.create",
+    "loginrecords.insert",
+}
+
+
+def index_scans(plan: dict):
+    """
+    (index name, has an Index Cond) for every index scan in the plan tree.
+    """
+    if "Index Name" in plan:
+        yield plan["Index Name"], "Index Cond" in plan
+    for child in plan.get("Plans", ()):
+        yield from index_scans(child)
+
+
+async def _seed(database: str, sql: str):
+    conn = await asyncpg.connect(TEST_DSN, database=database)
+    try:
+        # Nothing is listening, and a million notifications and outbox rows would only
+        # slow the seeding down.
+        await conn.execute(
+            "ALTER TABLE users DISABLE TRIGGER USER;"
+            "ALTER TABLE characters DISABLE TRIGGER USER;"
+        )
+        await conn.execute(sql)
+        await conn.execute(
+            "ALTER TABLE users ENABLE TRIGGER USER;"
+            "ALTER TABLE characters ENABLE TRIGGER USER;"
+        )
+        await conn.execute("ANALYZE users; ANALYZE characters")
+    finally:
+        await conn.close()
+
+
+@pytest.fixture(scope="module")
+def seeded(database):
+    asyncio.run(_seed(database, SEED))
+    yield
+    asyncio.run(_seed(database, UNSEED))
+
+
+@pytest.fixture
+async def explain(seeded, pool):
+    async with pool.acquire() as conn:
+        await conn.execute("SET plan_cache_mode = force_generic_plan")
+
+        async def explain(name: str) -> list[tuple[str, bool]]:
+            sql = QUERIES[name]
+            params = max((int(n) for n in re.findall(r"\$(\d+)", sql)), default=0)
+            await conn.execute(f"PREPARE plan_check AS {sql}")
+            try:
+                arguments = f"({', '.join(['NULL'] * params)})" if params else ""
+                result = await conn.fetchval(
+                    f"EXPLAIN (FORMAT JSON) EXECUTE plan_check{arguments}"
+                )
+            finally:
+                await conn.execute("DEALLOCATE plan_check")
+            return list(index_scans(orjson.loads(result)[0]["Plan"]))
+
+        yield explain
+
+
+def test_every_query_is_checked():
+    assert set(QUERIES) == set(SEARCHED) | set(ORDERED) | UNPLANNED
+
+
+@requires_postgres
+@pytest.mark.anyio
+@pytest.mark.parametrize("name", sorted(SEARCHED))
+async def test_query_searches_its_index(explain, name):
+    searched = {index for index, condition in await explain(name) if condition}
+    assert any(choice <= searched for choice in SEARCHED[name]), searched
+
+
+@requires_postgres
+@pytest.mark.anyio
+@pytest.mark.parametrize("name", sorted(ORDERED))
+async def test_query_reads_its_index_in_order(explain, name):
+    assert (ORDERED[name], False) in await explain(name)
@@ -0,0 +1,205 @@
+import asyncio
+import contextlib
+import time
+
+import pytest
+
+import mudforge
+from mudforge.db.base import from_pool, transaction
+from mudforge.db.replicas import ReplicaSet, Replica, ReplicaLost
+from mudforge.db import replicas as replicas_module
+
+from conftest import REPLICA_DSN, requires_replica
+
+
+class FakePool:
+    """
+    Answers fetchval with its name, or raises error once it's set.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.error: Exception | None = None
+
+    async def acquire(self, timeout=None):
+        return self
+
+    async def release(self, conn):
+        pass
+
+    async def fetchval(self, sql, *args):
+        if self.error:
+            raise self.error
+        return self.name
+
+
+class FakePrimary(FakePool):
+    @contextlib.asynccontextmanager
+    async def acquire(self):
+        yield self
+
+
+@from_pool
+async def where(conn):
+    return await conn.fetchval("SELECT current_setting('cluster_name')")
+
+
+@pytest.fixture
+def replicas(monkeypatch):
+    replica_set = ReplicaSet()
+    replica = Replica(name="replica0", dsn="", pool=FakePool("replica0"))
+    replica.healthy = True
+    replica.synced_at = time.monotonic()
+    replica_set.replicas = [replica]
+    monkeypatch.setattr(replicas_module, "REPLICAS", replica_set)
+    monkeypatch.setattr("mudforge.db.base.REPLICAS", replica_set)
+    monkeypatch.setattr(mudforge, "PGPOOL", FakePrimary("primary"))
+    return replica_set
+
+
+@pytest.mark.anyio
+async def test_reads_go_to_a_synced_replica(replicas):
+    assert await where() == "replica0"
+    replicas.wrote()
+    # Not synced since this process wrote, so the primary serves the read.
+    assert await where() == "primary"
+
+
+@pytest.mark.anyio
+async def test_a_replica_failing_mid_read_is_dropped_and_the_read_retried(replicas):
+    (replica,) = replicas.replicas
+    replica.pool.error = ConnectionResetError("connection reset by peer")
+    assert await where() == "primary"
+    assert not replica.healthy
+    assert replica.errors == 1
+
+
+@pytest.mark.anyio
+async def test_query_errors_leave_the_replica_alone(replicas):
+    (replica,) = replicas.replicas
+    replica.pool.error = ValueError("not a connection problem")
+    with pytest.raises(ValueError):
+        await where()
+    assert replica.healthy
+
+
+@pytest.mark.anyio
+async def test_acquire_raises_replica_lost(replicas):
+    with pytest.raises(ReplicaLost):
+        async with replicas.acquire():
+            raise ConnectionResetError()
+    assert not replicas.replicas[0].healthy
+
+
+# Against a real primary (MUDFORGE_TEST_DSN) and a streaming standby of it
+# (MUDFORGE_TEST_REPLICA_DSN), connecting as a role allowed to pause WAL replay.
+
+
+@pytest.fixture
+async def standby(pool, database, settings, monkeypatch):
+    replica_set = ReplicaSet()
+    replica_set.configure(
+        {"dsns": [REPLICA_DSN], "max_lag": 1.0, "check_interval": 0.1, "min_size": 1}
+    )
+    replica_set.pool_settings["database"] = database
+    monkeypatch.setattr(replicas_module, "REPLICAS", replica_set)
+    monkeypatch.setattr("mudforge.db.base.REPLICAS", replica_set)
+    async with pool.acquire() as conn:
+        await conn.execute(
+            "CREATE TABLE IF NOT EXISTS replica_check (id INT PRIMARY KEY, value INT)"
+        )
+        await conn.execute("TRUNCATE replica_check")
+    checking = asyncio.create_task(replica_set.run())
+    # Until the standby has replayed the CREATE TABLE, it isn't usable.
+    for _ in range(100):
+        await asyncio.sleep(0.1)
+        if replica_set.choose():
+            break
+    (replica,) = replica_set.replicas
+    assert replica.healthy
+    try:
+        yield replica_set
+    finally:
+        checking.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await checking
+        # Some tests close the pool themselves.
+        with contextlib.suppress(Exception):
+            await replica.pool.execute("SELECT pg_wal_replay_resume()")
+        with contextlib.suppress(Exception):
+            await replica.pool.close()
+
+
+@transaction
+async def write_value(conn, value: int):
+    await conn.execute(
+        "INSERT INTO replica_check VALUES (1, $1) "
+        "ON CONFLICT (id) DO UPDATE SET value = EXCLUDED.value",
+        value,
+    )
+
+
+@from_pool
+async def read_value(conn):
+    return await conn.fetchval("SELECT value FROM replica_check WHERE id = 1")
+
+
+@requires_replica
+@pytest.mark.anyio
+async def test_reads_your_writes(standby):
+    for value in range(20):
+        await write_value(value)
+        # Straight after a write, only the primary or a standby that has replayed it
+        # may answer.
+        assert await read_value() == value
+    assert standby.replicas[0].reads > 0 or standby.primary_reads > 0
+
+
+@requires_replica
+@pytest.mark.anyio
+async def test_a_lagging_standby_is_skipped(standby):
+    (replica,) = standby.replicas
+    await write_value(1)
+    await asyncio.sleep(0.5)
+    assert await read_value() == 1
+    assert replica.reads > 0
+
+    await replica.pool.execute("SELECT pg_wal_replay_pause()")
+    await write_value(2)
+    # Once max_lag has passed without the standby catching up, reads stop going there,
+    # even from processes that haven't written.
+    standby.last_write = 0.0
+    await asyncio.sleep(standby.max_lag + 0.5)
+    reads = replica.reads
+    assert await read_value() == 2
+    assert replica.reads == reads
+
+    await replica.pool.execute("SELECT pg_wal_replay_resume()")
+    await asyncio.sleep(0.5)
+    assert await read_value() == 2
+    assert replica.reads == reads + 1
+
+
+@requires_replica
+@pytest.mark.anyio
+async def test_reads_fail_over_to_the_primary(standby):
+    (replica,) = standby.replicas
+    await write_value(3)
+    await asyncio.sleep(0.5)
+
+    # A connection dropped mid-query takes the standby out, and the read is retried.
+    @from_pool
+    async def read_and_drop(conn):
+        if replica.healthy:
+            await conn.execute("SELECT pg_terminate_backend(pg_backend_pid())")
+        return await conn.fetchval("SELECT value FROM replica_check WHERE id = 1")
+
+    assert await read_and_drop() == 3
+    assert replica.errors >= 1
+
+    # So does the standby's pool going away entirely.
+    await asyncio.sleep(0.5)
+    assert replica.healthy
+    await replica.pool.close()
+    assert await read_value() == 3
+    assert not replica.healthy
@@ -0,0 +1,121 @@
+import datetime
+import uuid
+
+import httpx
+import pytest
+
+pytest.importorskip("aiomudtelnet")
+
+from mudforge.models.characters import CharacterModel
+from mudforge.models.users import UserModel
+from mudforge.portal.base_connection import BaseConnection, ResponseCache
+from mudforge.rest.utils import _dump_json, make_etag
+
+NOW = datetime.datetime.now(datetime.timezone.utc)
+
+
+class Game:
+    """
+    Answers GETs the way conditional_response does, counting what it was asked.
+    """
+
+    def __init__(self, bodies: dict[str, bytes]):
+        self.bodies = bodies
+        self.requests = list()
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        body = self.bodies[request.url.path]
+        etag = make_etag(body)
+        self.requests.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == etag:
+            return httpx.Response(304, headers={"ETag": etag})
+        return httpx.Response(200, content=body, headers={"ETag": etag})
+
+
+@pytest.fixture
+def user():
+    return UserModel(
+        id=uuid.uuid4(),
+        email="bob@example.com",
+        email_confirmed_at=None,
+        display_name="Bob",
+        admin_level=0,
+        created_at=NOW,
+        updated_at=NOW,
+        deleted_at=None,
+    )
+
+
+@pytest.fixture
+def game(user):
+    character = CharacterModel(
+        id=uuid.uuid4(),
+        user_id=user.id,
+        name="Bob",
+        created_at=NOW,
+        updated_at=NOW,
+        last_active_at=NOW,
+        deleted_at=None,
+    )
+    return Game(
+        {
+            f"/users/{user.id}": _dump_json(user),
+            f"/users/{user.id}/characters": _dump_json([character]),
+        }
+    )
+
+
+@pytest.fixture
+async def connection(game):
+    connection = BaseConnection()
+    connection.host_address = "127.0.0.1"
+    connection.client = httpx.AsyncClient(
+        base_url="http://game", transport=httpx.MockTransport(game)
+    )
+    yield connection
+    await connection.client.aclose()
+
+
+def test_least_recently_used_is_dropped():
+    cache = ResponseCache(max_entries=2)
+    for path in ("/a", "/b"):
+        cache.store(cache.make_key(path, None), f'"{path}"', path, 1)
+    cache.get(cache.make_key("/a", None))
+    cache.store(cache.make_key("/c", None), '"/c"', "/c", 1)
+    assert cache.get(cache.make_key("/b", None)) is None
+    assert cache.get(cache.make_key("/a", None))[1] == "/a"
+
+
+def test_keys_follow_query_and_model():
+    key = ResponseCache.make_key
+    assert key("/a", {"limit": 1, "mine": "true"}) == key(
+        "/a", {"mine": "true", "limit": "1"}
+    )
+    assert key("/a", None) != key("/a", {"limit": 1})
+    assert key("/a", None) != key("/a", None, UserModel)
+
+
+@pytest.mark.anyio
+async def test_not_modified_reuses_the_model(connection, game, user):
+    path = f"/users/{user.id}"
+    first = await connection.api_call("GET", path, model=UserModel)
+    assert first == user
+    again = await connection.api_call("GET", path, model=UserModel)
+    # The 304 hands back the model validated the first time.
+    assert again is first
+    assert game.requests == [None, make_etag(game.bodies[path])]
+    cache = connection.response_cache
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.bytes_saved == len(game.bodies[path])
+
+
+@pytest.mark.anyio
+async def test_lists_and_plain_json_are_cached_apart(connection, game, user):
+    path = f"/users/{user.id}/characters"
+    characters = await connection.api_call("GET", path, model=list[CharacterModel])
+    assert [c.name for c in characters] == ["Bob"]
+    again = await connection.api_call("GET", path, model=list[CharacterModel])
+    assert again is characters
+    raw = await connection.api_call("GET", path)
+    assert raw[0]["name"] == "Bob"
+    assert game.requests[2] is None
@@ -0,0 +1,75 @@
+import asyncio
+import uuid
+
+import httpx
+import pytest
+from hypercorn.asyncio import serve
+
+from mudforge.db import auth as auth_db
+from mudforge.game.application import Application
+from mudforge.models.users import UserModel
+
+
+@pytest.fixture
+async def unix_game(settings, tmp_path, monkeypatch):
+    """
+    The game's FastAPI app served by Hypercorn on a Unix socket only, the way
+    game.networking.unix_socket sets it up. Logins are answered without a database,
+    recording the IP they were attributed to.
+    """
+    socket_path = str(tmp_path / "game.sock")
+    settings["GAME"]["networking"]["unix_socket"] = socket_path
+    logins = list()
+
+    async def authenticate_user(email, password, ip, user_agent):
+        logins.append(ip)
+        return UserModel.model_construct(
+            id=uuid.uuid4(), email=email, admin_level=0, created_at=None
+        )
+
+    monkeypatch.setattr(auth_db, "authenticate_user", authenticate_user)
+
+    app = Application()
+    await app.setup_fastapi()
+    # No TCP listener; the Unix socket setup_fastapi added is the only one.
+    config = app.fastapi_config
+    config.bind = [b for b in config.bind if b.startswith("unix:")]
+    config.insecure_bind = [b for b in config.insecure_bind if b.startswith("unix:")]
+    stop = asyncio.Event()
+    server = asyncio.create_task(
+        serve(app.fastapi_instance, config, shutdown_trigger=stop.wait)
+    )
+    transport = httpx.AsyncHTTPTransport(uds=socket_path)
+    async with httpx.AsyncClient(base_url="http://game", transport=transport) as client:
+        for _ in range(100):
+            try:
+                await client.get("/docs")
+                break
+            except httpx.TransportError:
+                await asyncio.sleep(0.05)
+        yield client, logins
+    stop.set()
+    await server
+
+
+@pytest.mark.anyio
+async def test_login_over_unix_socket(unix_game):
+    client, logins = unix_game
+    response = await client.post(
+        "/auth/login", data={"username": "someone@example.com", "password": "x"}
+    )
+    assert response.status_code == 200, response.text
+    assert "access_token" in response.json()
+    assert logins == ["127.0.0.1"]
+
+
+@pytest.mark.anyio
+async def test_unix_socket_peer_is_a_trusted_proxy(unix_game):
+    client, logins = unix_game
+    response = await client.post(
+        "/auth/login",
+        data={"username": "someone@example.com", "password": "x"},
+        headers={"X-Forwarded-For": "203.0.113.7, 10.0.0.1"},
+    )
+    assert response.status_code == 200, response.text
+    assert logins == ["203.0.113.7"]